@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Requests per second on /api/auth/me with the old BaseHTTPMiddleware auth versus the
+pure ASGI middleware. Both verify the same locally signed token through the token
+cache, so the difference is the middleware plumbing itself.
+
+Runs offline: python benchmarks/bench_auth_middleware.py [requests] [concurrency]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from jose import jwt
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from controllers import auth_controller
+from middleware import BearerAuthMiddleware
+from services.jwks_store import jwks_store
+from services.jwt_service import JwtService
+from services.token_cache import token_cache
+from test_jwks_store import KEYS, FakeJwksEndpoint
+
+
+class LegacyBearerAuthMiddleware(BaseHTTPMiddleware):
+    # BearerAuthMiddleware before it became plain ASGI
+    async def dispatch(self, request: Request, call_next):
+        if not request.url.path.startswith("/api/"):
+            return await call_next(request)
+        if request.method == "OPTIONS":
+            return await call_next(request)
+        if request.url.path in ["/api/auth/login", "/api/auth/register"]:
+            return await call_next(request)
+
+        auth_header = request.headers.get("Authorization")
+        if not auth_header or not auth_header.startswith("Bearer "):
+            return JSONResponse(status_code=401, content={"detail": "Authorization header is missing."})
+
+        token = auth_header.removeprefix("Bearer ").strip()
+        try:
+            decoded_token = token_cache.get(token)
+            if decoded_token is None:
+                decoded_token = await JwtService().decode_access_token(token)
+                token_cache.put(token, decoded_token)
+            request.state.access_token = decoded_token
+            request.state.user_id = decoded_token["username"]
+            request.state.user_role = "tutor" if "tutor" in decoded_token.get("cognito:groups", []) else "student"
+        except Exception:
+            return JSONResponse(status_code=401, content={"detail": "Token has expired."})
+
+        return await call_next(request)
+
+
+def make_app(middleware):
+    app = FastAPI()
+    app.include_router(auth_controller.router)
+    app.add_middleware(middleware)
+    return app
+
+
+async def requests_per_second(app, token, requests, concurrency):
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        assert (await client.get("/api/auth/me", headers=headers)).status_code == 200  # warm up
+
+        remaining = requests
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                await client.get("/api/auth/me", headers=headers)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - started)
+
+
+async def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    jwks_store._fetch = FakeJwksEndpoint(["k1"])
+    token = jwt.encode({"username": "00000001", "exp": int(time.time()) + 3600}, KEYS["k1"][0],
+                       algorithm="RS256", headers={"kid": "k1"})
+
+    print(f"{requests} requests, {concurrency} concurrent")
+    print(f"{'middleware':<20}{'req/s':>10}")
+    for name, middleware in [("BaseHTTPMiddleware", LegacyBearerAuthMiddleware), ("pure ASGI", BearerAuthMiddleware)]:
+        rate = await requests_per_second(make_app(middleware), token, requests, concurrency)
+        print(f"{name:<20}{rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
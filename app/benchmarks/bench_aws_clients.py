@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Per-request latency of a DynamoDB get_item with a freshly built boto3 resource
+(what every service constructor used to do) versus the cached per-thread Table,
+which wraps the shared, pooled client.
+
+Runs offline against moto: python benchmarks/bench_aws_clients.py [requests]
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+
+import boto3
+from moto import mock_aws
+
+from services.aws_clients import get_table, reset_clients
+
+
+def per_request_resource():
+    table = boto3.resource('dynamodb', region_name='us-west-2').Table('Students')
+    return table.get_item(Key={'student_id': '00000001'})
+
+
+def cached_table():
+    table = get_table('Students')
+    return table.get_item(Key={'student_id': '00000001'})
+
+
+def measure(fn, requests):
+    fn()  # warm up
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.mean(timings), timings[len(timings) // 2], timings[int(len(timings) * 0.95)]
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    with mock_aws():
+        reset_clients()
+        dynamodb = boto3.resource('dynamodb', region_name='us-west-2')
+        table = dynamodb.create_table(
+            TableName='Students',
+            KeySchema=[{'AttributeName': 'student_id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'student_id', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST',
+        )
+        table.put_item(Item={'student_id': '00000001', 'display_name': 'Student 1'})
+
+        print(f"{'variant':<24}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for name, fn in [("per-request resource", per_request_resource), ("cached table", cached_table)]:
+            mean, p50, p95 = measure(fn, requests)
+            print(f"{name:<24}{mean:>10.2f}{p50:>10.2f}{p95:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+pytest-benchmark suite for the request hot paths: matching, the availability check, the
+DynamoDB converter, the tutor chat prompt builder and PDF extraction, on synthetic
+populations from sample_data.make_population. Sizes come from BENCH_TUTORS and
+BENCH_PDF_PAGES (comma-separated).
+
+Timings only compare on the same host, so no baseline is committed. To check a change,
+benchmark the base revision and the working tree back to back on one machine (what a CI job
+should run against the target branch):
+    python benchmarks/bench_hot_paths.py --base origin/main   fails when a mean is 25% slower
+Baselines can also be kept per machine under benchmarks/baselines:
+    python benchmarks/bench_hot_paths.py --save   record a new baseline
+    python benchmarks/bench_hot_paths.py          compare against it
+Without a baseline for this machine the comparison fails instead of being skipped.
+Any other arguments are passed on to pytest. Needs pytest-benchmark (requirements-dev.txt).
+"""
+import asyncio
+import glob
+import importlib.util
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+if __name__ != "__main__":
+    # Collected by pytest; run as a script, main() says what is missing instead
+    pytest.importorskip("pytest_benchmark")
+
+from controllers.chat_controller import build_tutor_chat_prompt
+from services.dynamo_converter import convert_student_to_dynamo_format
+from services.pdf_extractor import PDF_WORKERS, extract_pdf_file
+from services.student_tutor_matcher import has_availability_overlap, match_student_to_tutor
+from services.tutor_index import TutorIndex
+from sample_data import MATERIAL_WORDS, make_pdf, make_population
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+# Mean time a benchmark may gain over the baseline before the comparison fails
+REGRESSION_THRESHOLD = "mean:25%"
+
+TUTOR_COUNTS = [int(n) for n in os.getenv("BENCH_TUTORS", "50,500").split(",")]
+PDF_PAGES = [int(n) for n in os.getenv("BENCH_PDF_PAGES", "10,100").split(",")]
+# Students matched per benchmark round, so one round covers a spread of profiles
+STUDENTS_PER_ROUND = 20
+
+QUESTIONS = [
+    "How can I help them stay focused during this lesson?",
+    "How do I check the student understood today's lesson?",
+    "What should I do if the student gets frustrated?",
+]
+
+
+@pytest.fixture(scope="module", params=TUTOR_COUNTS, ids=lambda n: f"{n}_tutors")
+def population(request):
+    students, tutors = make_population(seed=request.param, n_students=STUDENTS_PER_ROUND, n_tutors=request.param)
+    # Matching sees students in the format match_student converts them to
+    return [convert_student_to_dynamo_format(s) for s in students], tutors
+
+
+def test_match_student_to_tutor(benchmark, population):
+    students, tutors = population
+    benchmark(lambda: [match_student_to_tutor(student, tutors) for student in students])
+
+
+def test_match_with_compiled_roster(benchmark, population):
+    students, tutors = population
+    index = TutorIndex(tutors)
+    benchmark(lambda: [match_student_to_tutor(student, index) for student in students])
+
+
+def test_has_availability_overlap(benchmark, population):
+    students, tutors = population
+    pairs = [(student, tutor) for student in students[:5] for tutor in tutors]
+    benchmark(lambda: [has_availability_overlap(student, tutor) for student, tutor in pairs])
+
+
+def test_convert_student_to_dynamo_format(benchmark):
+    students, _ = make_population(seed=1, n_students=200, n_tutors=0)
+    benchmark(lambda: [convert_student_to_dynamo_format(student) for student in students])
+
+
+@pytest.mark.parametrize("with_passages", [False, True], ids=["excerpt", "passages"])
+def test_build_tutor_chat_prompt(benchmark, with_passages):
+    rng = random.Random(0)
+    students, tutors = make_population(seed=0, n_students=50, n_tutors=50)
+    cases = []
+    for i, student in enumerate(students):
+        tutor = {**tutors[i], "tutoring_style": "Patient, step by step"}
+        excerpt = " ".join(rng.choices(MATERIAL_WORDS, k=50))
+        passages = [{"text": " ".join(rng.choices(MATERIAL_WORDS, k=80))} for _ in range(3)] if with_passages else None
+        cases.append((student, tutor, QUESTIONS[i % len(QUESTIONS)], "Physics", excerpt, passages))
+    benchmark(lambda: [build_tutor_chat_prompt(*case) for case in cases])
+
+
+@pytest.mark.parametrize("pages", PDF_PAGES, ids=lambda n: f"{n}_pages")
+@pytest.mark.parametrize("workers", sorted({0, PDF_WORKERS}), ids=lambda n: f"{n}_workers")
+def test_extract_pdf_file(benchmark, tmp_path, pages, workers):
+    path = tmp_path / "pack.pdf"
+    path.write_bytes(make_pdf(pages, seed=pages))
+
+    def extract():
+        return asyncio.run(extract_pdf_file(str(path), workers=workers))
+
+    # The warmup round starts the worker processes
+    text = benchmark.pedantic(extract, rounds=5, warmup_rounds=1)
+    assert text.count("Page ") == pages
+
+
+def baseline_files(storage: str = BASELINE_DIR):
+    # pytest-benchmark's folder for this machine type, see pytest_benchmark.utils.get_machine_id
+    machine = (f"{platform.system()}-{platform.python_implementation()}-"
+               f"{'.'.join(platform.python_version_tuple()[:2])}-{platform.architecture()[0]}")
+    return sorted(glob.glob(os.path.join(storage, machine, "*.json")))
+
+
+def record_base(ref: str, storage: str):
+    """Benchmark the git revision ref from a temporary worktree, saving the results under storage"""
+    repo = subprocess.run(["git", "rev-parse", "--show-toplevel"], cwd=BENCH_DIR, check=True,
+                          capture_output=True, text=True).stdout.strip()
+    worktree = os.path.join(storage, "worktree")
+    subprocess.run(["git", "worktree", "add", "--detach", worktree, ref], cwd=repo, check=True)
+    try:
+        script = os.path.join(worktree, os.path.relpath(os.path.abspath(__file__), repo))
+        subprocess.run([sys.executable, "-m", "pytest", script, "-q", f"--benchmark-storage=file://{storage}",
+                        "--benchmark-save=base"], cwd=os.path.dirname(script), check=True)
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=repo, check=True)
+
+
+def main():
+    if importlib.util.find_spec("pytest_benchmark") is None:
+        print("bench_hot_paths.py needs pytest-benchmark: pip install -r requirements-dev.txt", file=sys.stderr)
+        return 2
+
+    args = sys.argv[1:]
+    storage = BASELINE_DIR
+    if "--base" in args:
+        position = args.index("--base")
+        ref = args[position + 1]
+        del args[position:position + 2]
+        storage = tempfile.mkdtemp(prefix="bench-base-")
+
+    options = [__file__, "-q", f"--benchmark-storage=file://{storage}", "--benchmark-columns=min,mean,median,ops"]
+    try:
+        if storage != BASELINE_DIR:
+            record_base(ref, storage)
+        if "--save" in args:
+            args.remove("--save")
+            options.append("--benchmark-save=baseline")
+        elif baseline_files(storage):
+            options += ["--benchmark-compare", f"--benchmark-compare-fail={REGRESSION_THRESHOLD}"]
+        else:
+            print(f"No baseline for this machine under {storage}; record one with --save or use --base REF",
+                  file=sys.stderr)
+            return 2
+        return pytest.main(options + args)
+    finally:
+        if storage != BASELINE_DIR:
+            shutil.rmtree(storage, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
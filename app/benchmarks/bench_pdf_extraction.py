@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+PDF upload extraction over a corpus of synthetic course packs: the old inline
+extraction (string += on the event loop) versus the page-parallel process pool.
+Reports wall time and the longest event loop stall seen while extracting.
+
+Runs offline: python benchmarks/bench_pdf_extraction.py [pages ...]
+"""
+import asyncio
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pymupdf as fitz
+from fastapi import UploadFile
+
+from services.pdf_extractor import PDF_WORKERS, extract_pdf_file, spool_upload
+from sample_data import make_pdf
+
+
+async def legacy_extract(file: UploadFile) -> str:
+    # read_pdf_file before the extractor: everything on the event loop thread
+    file_bytes = await file.read()
+    pdf_stream = io.BytesIO(file_bytes)
+    doc = fitz.open(stream=pdf_stream.read(), filetype="pdf")
+    all_text = ""
+    for page_num in range(doc.page_count):
+        page = doc.load_page(page_num)
+        all_text += page.get_text()
+    return all_text
+
+
+async def parallel_extract(file: UploadFile) -> str:
+    # The upload route: spool to disk, then extract pages in the process pool
+    path = await spool_upload(file)
+    try:
+        return await extract_pdf_file(path)
+    finally:
+        os.unlink(path)
+
+
+async def measure(extract, data: bytes):
+    """Wall time of one extraction and the worst delay of a 5 ms ticker running beside it"""
+    worst_stall = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal worst_stall
+        while not done.is_set():
+            before = time.perf_counter()
+            await asyncio.sleep(0.005)
+            worst_stall = max(worst_stall, time.perf_counter() - before - 0.005)
+
+    tick_task = asyncio.ensure_future(ticker())
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    text = await extract(UploadFile(io.BytesIO(data), filename="pack.pdf"))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await tick_task
+    return elapsed, worst_stall, len(text)
+
+
+async def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10, 100, 400]
+    corpus = {pages: make_pdf(pages, seed=pages) for pages in sizes}
+
+    # Start the worker processes before timing
+    await parallel_extract(UploadFile(io.BytesIO(corpus[sizes[0]]), filename="warmup.pdf"))
+
+    print(f"workers: {PDF_WORKERS}")
+    print(f"{'pages':>6}{'MB':>7}  {'variant':<10}{'wall ms':>10}{'max stall ms':>14}")
+    for pages, data in corpus.items():
+        for name, extract in [("inline", legacy_extract), ("parallel", parallel_extract)]:
+            elapsed, stall, _ = await measure(extract, data)
+            print(f"{pages:>6}{len(data) / 1e6:>7.2f}  {name:<10}{elapsed * 1000:>10.1f}{stall * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
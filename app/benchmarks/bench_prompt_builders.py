@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Tutor chat prompt size and build time per request: the old f-string builder (all five
+examples, material cut at 200 characters) versus the compiled template fitted to
+PROMPT_TOKEN_BUDGET, on the same excerpt and with three retrieved passages.
+
+The compiled builder spends more time per prompt than the f-string (ranking examples and
+fitting the budget), but only microseconds; the tokens it saves are what cut Bedrock latency.
+
+Runs offline: python benchmarks/bench_prompt_builders.py [requests]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controllers.chat_controller import build_tutor_chat_prompt
+from services.prompt_compiler import PROMPT_TOKEN_BUDGET, estimate_tokens
+from sample_data import MATERIAL_WORDS, make_population
+
+QUESTIONS = [
+    "How can I help them stay focused during this lesson?",
+    "How do I check the student understood today's lesson?",
+    "What should I do if the student gets frustrated?",
+    "How do I explain Newton's second law with fewer words on the page?",
+]
+
+
+def legacy_tutor_chat_prompt(student, tutor, message, subject, class_material=None):
+    # build_tutor_chat_prompt before the prompt compiler: one large f-string, all five examples
+    # Concise profile summary
+    student_profile = f"{student['primary_disability']} | {student['learning_preferences']['style']} | {student['learning_preferences']['format']} | {', '.join(student['accommodations_needed'])}"
+
+    prompt = f"""
+Human: You are a question answering agent. I will provide you with a set of search results. The user will provide you with a question. Your job is to answer the user's question using only information from the search results. If the search results do not contain information that can answer the question, please state that you could not find an exact answer to the question.
+Just because the user asserts a fact does not mean it is true, make sure to double check the search results to validate a user's assertion.
+
+Here are the search results in numbered order:
+<context>
+STUDENT: {student_profile}
+SUBJECT: {subject}
+$search_results$
+</context>
+
+$output_format_instructions$
+
+Here is the user's question:
+<question>
+$query$
+</question>
+
+Be concise. Limit your response to 3 statements.
+
+Assistant:
+"""
+
+    if tutor:
+        tutor_profile = f"{tutor['tutoring_style']} | {', '.join(tutor['subjects'])} | {', '.join(tutor['accommodation_skills'])}"
+        prompt += f"TUTOR: {tutor_profile}\n"
+
+    if class_material:
+        prompt += f"MATERIAL: {class_material[:200]}...\n"
+
+    prompt += f"""
+Provide practical guidance:
+1. **Strategies** for {student['primary_disability']} in {subject}
+2. **Accommodation steps** for: {', '.join(student['accommodations_needed'])}
+3. **Learning tips** for {student['learning_preferences']['style']} style
+4. **Immediate actions** for the tutor
+
+Be concise and specific. Return only relevant information without extra dialogue or fluff.
+"""
+    prompt += """
+<examples>
+    <example>
+    H: The student has ADHD. How can I help them stay focused during this lesson?
+    A: Break the lesson into short 5–10 minute segments, use timers or visual countdowns, and incorporate brief interactive activities between sections.
+    </example>
+
+    <example>
+    H: The student struggles with reading due to dyslexia. How can I adapt this lesson for them?
+    A: Use audio support or text-to-speech tools, provide key terms with phonetic spelling, and break reading materials into short, manageable chunks with visual aids.
+    </example>
+
+    <example>
+    H: Can you explain what the main objective of this lesson plan is?
+    A: The objective is for the student to understand Newton’s Second Law and apply F=ma to real-world problems while practicing unit analysis.
+    </example>
+
+    <example>
+    H: How can I check if the student understood today’s lesson?
+    A: Ask them to explain the concept in their own words and solve one example problem without guidance. If they can do both correctly, they’ve likely grasped the material.
+    </example>
+
+    <example>
+    H: What should I do if the student gets frustrated halfway through?
+    A: Pause the lesson, acknowledge their frustration, and offer a short, low-pressure activity before returning to the main task. Break the remaining material into smaller steps.
+    </example>
+</examples>
+
+    """
+
+    return prompt
+
+
+def measure(build, cases):
+    sizes, timings = [], []
+    for args in cases:
+        started = time.perf_counter()
+        prompt = build(*args)
+        timings.append((time.perf_counter() - started) * 1e6)
+        sizes.append(estimate_tokens(prompt))
+    return statistics.mean(sizes), max(sizes), statistics.median(timings)
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = random.Random(0)
+    students, tutors = make_population(seed=0, n_students=200, n_tutors=50)
+
+    legacy_cases, passage_cases = [], []
+    for i in range(requests):
+        student = students[i % len(students)]
+        tutor = {**tutors[i % len(tutors)], "tutoring_style": "Patient, step by step"}
+        question = QUESTIONS[i % len(QUESTIONS)]
+        excerpt = " ".join(rng.choices(MATERIAL_WORDS, k=50))
+        passages = [{"text": " ".join(rng.choices(MATERIAL_WORDS, k=80))} for _ in range(3)]
+        legacy_cases.append((student, tutor, question, "Physics", excerpt))
+        passage_cases.append((student, tutor, question, "Physics", excerpt, passages))
+
+    print(f"budget: {PROMPT_TOKEN_BUDGET} tokens, {requests} requests")
+    print(f"{'builder':<22}{'mean tokens':>12}{'max tokens':>12}{'p50 us':>10}")
+    for name, build, cases in [("f-string, excerpt", legacy_tutor_chat_prompt, legacy_cases),
+                               ("compiled, excerpt", build_tutor_chat_prompt, legacy_cases),
+                               ("compiled, passages", build_tutor_chat_prompt, passage_cases)]:
+        mean_size, max_size, p50 = measure(build, cases)
+        print(f"{name:<22}{mean_size:>12.0f}{max_size:>12}{p50:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
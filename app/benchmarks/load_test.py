@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test of the FastAPI app with every AWS dependency replaced locally:
+DynamoDB by moto (or DynamoDB Local with --dynamodb-endpoint), Cognito by a fake issuer
+on a local port that signs test tokens and serves their JWKS, and Bedrock by
+FakeBedrockAgentRuntime with a configurable latency distribution.
+
+Virtual users log in, then send a weighted mix of profile PUTs, matches, tutor chats and
+uploads for the given duration. Reports throughput and p50/p95/p99 per route, plus the
+server-side stage timings. DynamoDB latency is the stand-in's, so compare runs with each
+other rather than with production.
+
+Runs offline: python benchmarks/load_test.py --users 50 --duration 30 --bedrock-latency lognormal:1.5:0.4
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+# Everything the app reads at import time, pointed at the stand-ins
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ["BEDROCK_FAKE"] = "1"
+os.environ["COGNITO_CLIENT_ID"] = "load-test-client"
+os.environ["COGNITO_CLIENT_SECRET"] = ""
+os.environ["COGNITO_USER_POOL_ID"] = "us-west-2_loadtest"
+
+import boto3
+import httpx
+import uvicorn
+from fastapi import FastAPI, Form, HTTPException
+from jose import jwt
+from moto import mock_aws
+
+from sample_data import MATERIAL_WORDS, STUDY_PLAN, make_population, make_signing_key
+
+# Share of each request kind in the traffic mix
+DEFAULT_MIX = "login=5,put_profile=20,match=20,chat=40,upload=15"
+# Request kinds tutors send; students send the others
+TUTOR_ACTIONS = {"login", "chat"}
+# Files a virtual student keeps; the oldest is deleted before uploading more
+FILES_PER_STUDENT = 10
+QUESTIONS = [
+    "How can I help them stay focused during this lesson?",
+    "How do I check the student understood today's lesson?",
+    "What should I do if the student gets frustrated?",
+    "How do I explain Newton's second law with fewer words on the page?",
+]
+TABLES = [("Students", "student_id"), ("Tutors", "tutor_id"), ("StudentFiles", "student_id"),
+          ("StudyPlans", "student_id"), ("MaterialContents", "content_hash")]
+
+
+def parse_latency(spec: str):
+    """
+    Bedrock latency distribution in seconds: fixed:S, uniform:LOW:HIGH or
+    lognormal:MEDIAN:SIGMA (long right tail, like model calls)
+    """
+    kind, *params = spec.split(":")
+    params = [float(p) for p in params]
+    if kind == "fixed":
+        return lambda: params[0]
+    if kind == "uniform":
+        return lambda: random.uniform(*params)
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(math.log(params[0]), params[1])
+    raise ValueError(f"Unknown latency distribution {spec!r}")
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {name.strip(): float(weight) for name, weight in (item.split("=") for item in spec.split(","))}
+    unknown = set(mix) - set(ACTIONS)
+    if unknown:
+        raise ValueError(f"Unknown request kinds {sorted(unknown)}")
+    return mix
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+class FakeCognito:
+    """
+    The two Cognito endpoints the app calls: the OAuth token endpoint, which exchanges a
+    code (here just the user id) for signed id and access tokens, and the pool's JWKS.
+    """
+
+    def __init__(self, client_id: str, users: dict):
+        self.client_id = client_id
+        self.users = users
+        self.private_key, self.public_jwk = make_signing_key("load-test")
+        self.app = FastAPI()
+        self.app.post("/oauth2/token")(self.token)
+        self.app.get("/.well-known/jwks.json")(self.jwks)
+
+    def sign(self, claims: dict) -> str:
+        now = int(time.time())
+        return jwt.encode({**claims, "aud": self.client_id, "iat": now, "exp": now + 3600},
+                          self.private_key, algorithm="RS256", headers={"kid": "load-test"})
+
+    def tokens_for(self, user_id: str) -> dict:
+        role = self.users[user_id]
+        return {
+            "id_token": self.sign({"cognito:username": user_id, "email": f"{user_id}@example.org",
+                                   "name": user_id, "custom:role": role}),
+            "access_token": self.sign({"username": user_id, "cognito:groups": [role]}),
+            "token_type": "Bearer",
+            "expires_in": 3600,
+        }
+
+    async def token(self, code: str = Form(...)):
+        if code not in self.users:
+            raise HTTPException(status_code=400, detail="invalid_grant")
+        return self.tokens_for(code)
+
+    async def jwks(self):
+        return {"keys": [self.public_jwk]}
+
+    def serve(self) -> str:
+        """Start serving on a free local port in a daemon thread; returns the base URL"""
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=port, log_level="warning"))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.01)
+        return f"http://127.0.0.1:{port}"
+
+
+def create_tables(students, tutors):
+    dynamodb = boto3.resource("dynamodb", region_name="us-west-2")
+    existing = {table.name for table in dynamodb.tables.all()}
+    for name, key in TABLES:
+        if name not in existing:
+            dynamodb.create_table(
+                TableName=name,
+                KeySchema=[{"AttributeName": key, "KeyType": "HASH"}],
+                AttributeDefinitions=[{"AttributeName": key, "AttributeType": "S"}],
+                BillingMode="PAY_PER_REQUEST",
+            )
+    if "StudentFileChunks" not in existing:
+        dynamodb.create_table(
+            TableName="StudentFileChunks",
+            KeySchema=[{"AttributeName": "file_id", "KeyType": "HASH"},
+                       {"AttributeName": "chunk", "KeyType": "RANGE"}],
+            AttributeDefinitions=[{"AttributeName": "file_id", "AttributeType": "S"},
+                                  {"AttributeName": "chunk", "AttributeType": "N"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+
+    from models import StudentProfile
+    with dynamodb.Table("Tutors").batch_writer() as batch:
+        for tutor in tutors:
+            batch.put_item(Item=tutor)
+    with dynamodb.Table("Students").batch_writer() as batch:
+        for student in students:
+            batch.put_item(Item=StudentProfile(**student).model_dump())
+
+
+class VirtualUser:
+    def __init__(self, user_id: str, role: str, profile: dict):
+        self.user_id = user_id
+        self.role = role
+        self.profile = profile
+        self.headers = {}
+        self.file_ids = []
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, students, tutors, mix: dict, seed: int = 0):
+        self.client = client
+        self.students = students
+        self.tutors = tutors
+        self.mix = mix
+        self.rng = random.Random(seed)
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    async def request(self, route: str, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            response, status = None, type(e).__name__
+        self.latencies[route].append(time.perf_counter() - started)
+        self.statuses[route][status] += 1
+        return response
+
+    async def login(self, user: VirtualUser):
+        response = await self.request("POST /api/auth/login", "POST", "/api/auth/login",
+                                      json={"code": user.user_id, "redirect_uri": "http://localhost:3000"})
+        if response is not None and response.status_code == 200:
+            user.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def put_profile(self, user: VirtualUser):
+        profile = {**user.profile, "additional_info": f"Update {self.rng.randint(0, 10 ** 6)}"}
+        await self.request("PUT /api/students/{student_id}", "PUT", f"/api/students/{user.user_id}",
+                           json=profile, headers=user.headers)
+
+    async def match(self, user: VirtualUser):
+        await self.request("POST /api/students/{student_id}/match", "POST", f"/api/students/{user.user_id}/match",
+                           headers=user.headers)
+
+    async def chat(self, user: VirtualUser):
+        student = self.rng.choice(self.students)
+        await self.request("POST /api/chat/{student_id}/chat", "POST", f"/api/chat/{student['student_id']}/chat",
+                           json={"message": self.rng.choice(QUESTIONS), "subject": "Physics"}, headers=user.headers)
+
+    async def upload(self, user: VirtualUser):
+        if len(user.file_ids) >= FILES_PER_STUDENT:
+            file_id = user.file_ids.pop(0)
+            await self.request("DELETE /api/file/{file_id}", "DELETE", f"/api/file/{file_id}", headers=user.headers)
+        # A few shared course packs, so the content store sees duplicates as well as new material
+        pack = self.rng.randint(0, 20)
+        text = f"Course pack {pack}\n" + " ".join(random.Random(pack).choices(MATERIAL_WORDS, k=3000))
+        response = await self.request("POST /api/file/upload", "POST", "/api/file/upload", headers=user.headers,
+                                      files={"file": (f"pack{pack}.txt", io.BytesIO(text.encode()), "text/plain")})
+        if response is not None and response.status_code == 200:
+            user.file_ids.append(response.json()["file_id"])
+
+    async def virtual_user(self, user: VirtualUser, deadline: float):
+        await self.login(user)
+        kinds = [kind for kind in self.mix if (kind in TUTOR_ACTIONS) == (user.role == "tutor") or kind == "login"]
+        weights = [self.mix[kind] for kind in kinds]
+        while time.perf_counter() < deadline:
+            kind = self.rng.choices(kinds, weights)[0]
+            await ACTIONS[kind](self, user)
+
+    async def run(self, users, duration: float) -> float:
+        started = time.perf_counter()
+        await asyncio.gather(*(self.virtual_user(user, started + duration) for user in users))
+        return time.perf_counter() - started
+
+    def report(self, elapsed: float):
+        total = sum(len(values) for values in self.latencies.values())
+        print(f"{total} requests in {elapsed:.1f}s: {total / elapsed:.1f} req/s")
+        print(f"{'route':<46}{'count':>7}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  statuses")
+        for route, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            statuses = ", ".join(f"{status}: {count}" for status, count in sorted(self.statuses[route].items(), key=str))
+            print(f"{route:<46}{len(values):>7}{len(values) / elapsed:>8.1f}{percentile(values, 0.5) * 1000:>9.1f}"
+                  f"{percentile(values, 0.95) * 1000:>9.1f}{percentile(values, 0.99) * 1000:>9.1f}  {statuses}")
+
+
+ACTIONS = {
+    "login": LoadTest.login,
+    "put_profile": LoadTest.put_profile,
+    "match": LoadTest.match,
+    "chat": LoadTest.chat,
+    "upload": LoadTest.upload,
+}
+
+
+async def drive(args, students, tutors, users):
+    import main
+    from services.metrics import metrics
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=120) as client:
+        load_test = LoadTest(client, students, tutors, parse_mix(args.mix), seed=args.seed)
+        elapsed = await load_test.run(users, args.duration)
+    load_test.report(elapsed)
+
+    print(f"\n{'server stage':<46}{'count':>7}{'mean ms':>9}{'max ms':>9}")
+    for key, timing in sorted(metrics.snapshot()["observations"].items()):
+        if key.startswith("stage_seconds"):
+            print(f"{key:<46}{timing['count']:>7}{timing['mean'] * 1000:>9.1f}{timing['max'] * 1000:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test against local AWS stand-ins")
+    parser.add_argument("--users", type=int, default=40, help="concurrent virtual users")
+    parser.add_argument("--tutor-share", type=float, default=0.25, help="share of virtual users that are tutors")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of traffic")
+    parser.add_argument("--students", type=int, default=500, help="students in the seeded table")
+    parser.add_argument("--tutors", type=int, default=100, help="tutors in the seeded table")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="request kinds and weights, e.g. chat=1,upload=1")
+    parser.add_argument("--bedrock-latency", default="lognormal:1.0:0.5",
+                        help="fixed:S, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA seconds")
+    parser.add_argument("--dynamodb-endpoint", help="DynamoDB Local URL; moto in-process when omitted")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.chdir(APP_DIR)  # the app serves ./static
+    issuer = FakeCognito(os.environ["COGNITO_CLIENT_ID"], {})
+    os.environ["COGNITO_DOMAIN"] = issuer.serve()
+    if args.dynamodb_endpoint:
+        os.environ["AWS_ENDPOINT_URL_DYNAMODB"] = args.dynamodb_endpoint
+
+    students, tutors = make_population(args.seed, args.students, args.tutors)
+    tutors = [{**tutor, "tutoring_style": "Patient, step by step"} for tutor in tutors]
+    n_tutors = max(1, round(args.users * args.tutor_share))
+    users = ([VirtualUser(tutor["tutor_id"], "tutor", tutor) for tutor in tutors[:n_tutors]] +
+             [VirtualUser(student["student_id"], "student", student)
+              for student in students[:args.users - n_tutors]])
+    issuer.users.update({user.user_id: user.role for user in users})
+
+    import dependencies
+    from services.fake_bedrock import FakeBedrockAgentRuntime
+    from services.aws_clients import reset_clients
+    from services.jwks_store import fetch_jwks, jwks_store
+    # Study plans parse the answer as JSON, and chat answers may be anything
+    dependencies.fake_bedrock = FakeBedrockAgentRuntime(answer=json.dumps(STUDY_PLAN),
+                                                        first_token_delay=parse_latency(args.bedrock_latency))
+    jwks_store._fetch = lambda: fetch_jwks(f"{os.environ['COGNITO_DOMAIN']}/.well-known/jwks.json")
+
+    print(f"{len(users)} virtual users ({n_tutors} tutors), {args.duration:.0f}s, "
+          f"Bedrock latency {args.bedrock_latency}, DynamoDB {args.dynamodb_endpoint or 'moto'}")
+    if args.dynamodb_endpoint:
+        create_tables(students, tutors)
+        asyncio.run(drive(args, students, tutors, users))
+    else:
+        with mock_aws():
+            reset_clients()
+            create_tables(students, tutors)
+            asyncio.run(drive(args, students, tutors, users))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,9 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel, EmailStr, constr
 import logging
 import os
 import httpx
 from enum import Enum
-import boto3
 from botocore.exceptions import ClientError
 
 from services.jwt_service import JwtService
@@ -12,6 +11,9 @@ from models.student_profile import LearningPreferences, StudentProfile
 from models.tutor_profile import TutorProfile
 from services.student_service import StudentService
 from services.tutor_service import TutorService
+from services.dynamo_executor import run_blocking
+from services.background_jobs import enqueue_match_student
+from dependencies import get_cognito_client, get_student_service, get_tutor_service, get_users_table
 
 logger = logging.getLogger(__name__)
 
@@ -35,13 +37,10 @@ class LoginResponse(BaseModel):
 
 @router.post("/login")
 async def login(request: LoginRequest):
-    logger.debug(request)
-
     tokens = await get_jwk_tokens(request)
-    logger.debug(tokens)
 
     jwt_decoded = await JwtService().decode_id_token(tokens)
-    logger.debug(jwt_decoded)
+    logger.debug("Logged in %s", jwt_decoded["cognito:username"])
 
     response = LoginResponse(
         user_id=jwt_decoded["cognito:username"],
@@ -68,8 +67,6 @@ async def get_jwk_tokens(request: LoginRequest):
     # If using client secret, add Basic Auth header
     auth = (COGNITO_CLIENT_ID, COGNITO_CLIENT_SECRET) if COGNITO_CLIENT_SECRET else None
 
-    logger.debug(data)
-
     async with httpx.AsyncClient() as client:
         response = await client.post(
             f"{COGNITO_DOMAIN}/oauth2/token",
@@ -88,8 +85,6 @@ async def get_jwk_tokens(request: LoginRequest):
         raise Exception("Failed to get JWK keys. " + response.text)
 
     tokens = response.json()
-
-    logger.debug(tokens)
     return tokens
 
 class Role(str, Enum):
@@ -108,12 +103,15 @@ class UserProfile(BaseModel):
     role: Role
 
 @router.post("/register")
-async def register(request: RegisterRequest):
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table('Users')
+async def register(request: RegisterRequest,
+                   table = Depends(get_users_table),
+                   cognito_client = Depends(get_cognito_client),
+                   student_service: StudentService = Depends(get_student_service),
+                   tutor_service: TutorService = Depends(get_tutor_service)):
 
     # Replace with your actual primary key and value
-    response = table.get_item(
+    response = await run_blocking(
+        table.get_item,
         Key={
             'user_id': request.user_id
         }
@@ -131,10 +129,9 @@ async def register(request: RegisterRequest):
                        display_name=request.display_name,
                        role=request.role)
 
-    cognito_client = boto3.client('cognito-idp')
-
     try:
-        response = cognito_client.admin_create_user(
+        response = await run_blocking(
+            cognito_client.admin_create_user,
             UserPoolId=COGNITO_USER_POOL_ID,
             Username=request.user_id,
             UserAttributes=[
@@ -149,18 +146,20 @@ async def register(request: RegisterRequest):
 
 
     try:
-        response = cognito_client.admin_add_user_to_group(
+        response = await run_blocking(
+            cognito_client.admin_add_user_to_group,
             UserPoolId=COGNITO_USER_POOL_ID,
             Username=request.user_id,
             GroupName=user.role
         )
-        logger.info(f"User {request.user_id} added to group {user.role}")
+        logger.info("User %s added to group %s", request.user_id, user.role)
 
     except ClientError as e:
         print(f"Error adding user to group: {e}")
 
     # Replace with your actual primary key and value
-    response = table.put_item(
+    response = await run_blocking(
+        table.put_item,
         Item = user.model_dump()
     )
 
@@ -181,7 +180,8 @@ async def register(request: RegisterRequest):
             tutor_id="none"
         )
 
-        StudentService().add_student(student_profile)
+        await student_service.save_student_async(student_profile.model_dump())
+        enqueue_match_student(request.user_id)
     else:
         tutor_profile = TutorProfile(
             tutor_id=request.user_id,
@@ -192,7 +192,7 @@ async def register(request: RegisterRequest):
             accommodation_skills=[],
             additional_info="")
 
-        TutorService().add_tutor(tutor_profile)
+        await tutor_service.add_tutor_async(tutor_profile)
 
     return {"detail": "User was created."}
 
@@ -1,20 +1,31 @@
 from typing import Optional
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 import os
 import logging
 from services.student_file_service import StudentFileService
 from services.student_service import StudentService
+from services.study_plan_service import StudyPlanService
 from services.tutor_service import TutorService
-from prompts import summary_plan_prompt
+from services.background_jobs import enqueue_study_plan
+from services.bedrock_gateway import bedrock_gateway
+from services.dynamo_executor import run_blocking
+from services.material_index import material_index
+from services.prompt_compiler import (PROMPT_TOKEN_BUDGET, CompiledPrompt, PromptBudget, estimate_tokens,
+                                      fit_examples, key_words, rank_by_overlap)
+from services.response_cache import request_signature, response_cache
+from services.tracing import stage
+from services.bedrock_service import (SSE_HEADERS, build_retrieve_and_generate_request, record_token_usage,
+                                      sse_events, stream_answer)
+from dependencies import (get_bedrock_agent_runtime, get_student_file_service, get_student_service,
+                          get_study_plan_service, get_tutor_service)
 
 KNOWLEDGE_BASE_ID = os.getenv("KNOWLEDGE_BASE_ID")
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
-student_service = StudentService()
-tutor_service = TutorService()
 
 class ChatRequest(BaseModel):
     message: str
@@ -22,146 +33,129 @@ class ChatRequest(BaseModel):
     session_id: Optional[str] = None
 
 @router.get("/{student_id}/summary")
-def get_summary_plan(student_id: str):
+async def get_summary_plan(student_id: str, web_request: Request,
+                           study_plan_service: StudyPlanService = Depends(get_study_plan_service)):
     try:
-        # Get real data from DynamoDB
-        student = student_service.get_student(student_id)
-        if not student:
-            raise HTTPException(status_code=404, detail="Student not found")
-
-        class_material = StudentFileService().get_file(student_id)
-
-        prompt = build_prompt(student, tutor, class_material)
-
-        response = bedrock.retrieve_and_generate(
-            input={
-                'text': prompt
-            },
-            retrieveAndGenerateConfiguration={
-                'type': 'KNOWLEDGE_BASE',
-                'knowledgeBaseConfiguration': {
-                    'knowledgeBaseId': KNOWLEDGE_BASE_ID,
-                    'modelArn': 'arn:aws:bedrock:us-west-2::foundation-model/anthropic.claude-3-5-sonnet-20241022-v2:0',
-                    'generationConfiguration': {
-                        'promptTemplate': {
-                            'textPromptTemplate': summary_plan_prompt.kb_prompt
-                        }
-                    },
-                }
-
-            }
-        )
-
-        return json.loads(response['output']['text'])
-
+        # Served from the StudyPlans table unless the profile, tutor or material changed
+        plan = await study_plan_service.get_cached_plan_async(student_id)
+        if plan is not None:
+            return plan
+
+        # Otherwise hand back the generation job to poll at /api/jobs/{job_id}; a
+        # generation that is already running counts, since the inputs did not change
+        job = enqueue_study_plan(student_id, join_running=True)
+        return JSONResponse(status_code=202, content={"job_id": job.job_id, "status": job.status})
+
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error generating summary: {e}")
-        logger.error(f"Error type: {type(e).__name__}")
-        logger.error(f"Error details: {str(e)}")
+        logger.error("Error generating summary: %s", e, exc_info=e)
         raise HTTPException(status_code=500, detail=f"Failed to generate summary: {str(e)}")
 
-@router.post("/{student_id}/chat")
-def get_next_chat_message(student_id: str, request: ChatRequest, web_request: Request):
-    try:
-        logger.info(f"Chat request for student_id: {student_id}")
-        logger.info(f"KNOWLEDGE_BASE_ID: {KNOWLEDGE_BASE_ID}")
+def prepare_tutor_chat(student_id: str, request: ChatRequest, tutor_id: str,
+                       student_service: StudentService, tutor_service: TutorService,
+                       student_file_service: StudentFileService):
+    """
+    Load the student, tutor and material and build the retrieve_and_generate parameters,
+    returned with the response cache signature for the student's profile and the subject
+    """
+    logger.debug("Chat request for student_id: %s", student_id)
 
-        # Get student data from DynamoDB
+    # Get student data from DynamoDB
+    with stage("get_student"):
         student = student_service.get_student(student_id)
-        logger.info(f"Student found: {student is not None}")
-        if not student:
-            raise HTTPException(status_code=404, detail="Student not found")
-
-        # Get tutor data
-        tutor = tutor_service.get_tutor(web_request.state.user_id)
-        logger.info(f"Tutor found: {tutor is not None}")
-
-        class_material = StudentFileService().get_file(student_id)
-
-        # Build chat-specific prompt for tutor assistance
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+
+    # Get tutor data
+    with stage("get_tutor"):
+        tutor = tutor_service.get_tutor(tutor_id)
+    logger.debug("Tutor found: %s", tutor is not None)
+
+    # Passages of the student's own files that best match the question, from the in-process
+    # index; the latest file's excerpt is the fallback when nothing matches
+    with stage("get_files"):
+        manifests = student_file_service.list_files(student_id)
+    with stage("material_search"):
+        passages = material_index.search(student_id, request.message, manifests, student_file_service.read_file)
+    class_material = manifests[-1]['excerpt'] if manifests else None
+
+    # Build chat-specific prompt for tutor assistance
+    with stage("build_prompt"):
         generation_prompt = build_tutor_chat_prompt(
             student,
             tutor,
             request.message,
             request.subject,
-            class_material
+            class_material,
+            passages
         )
-        logger.info(f"Generated generation_prompt length: {len(generation_prompt)}")
-
-        # Create a base dictionary with the required parameters
-        request_params = {
-            "input": {
-                "text": request.message
-            },
-            "retrieveAndGenerateConfiguration": {
-                "type": "KNOWLEDGE_BASE",
-                "knowledgeBaseConfiguration": {
-                    "knowledgeBaseId": KNOWLEDGE_BASE_ID,
-                    "modelArn": f'arn:aws:bedrock:us-west-2::foundation-model/{os.getenv("BEDROCK_MODEL_ID")}',
-                    'generationConfiguration': {
-                        'promptTemplate': {
-                            'textPromptTemplate': generation_prompt
-                        }
-                    }
-                }
-            }
-        }
+    logger.debug("Generated generation_prompt length: %d", len(generation_prompt))
 
-        # Conditionally add sessionId if it's not None
-        if request.session_id:
-            request_params["sessionId"] = request.session_id
+    request_params = build_retrieve_and_generate_request(request.message, generation_prompt, request.session_id)
+    return request_params, request_signature(request_params, student, request.subject)
 
-        logger.info("Calling Bedrock...")
+@router.post("/{student_id}/chat")
+async def get_next_chat_message(student_id: str, request: ChatRequest, web_request: Request,
+                                student_service: StudentService = Depends(get_student_service),
+                                tutor_service: TutorService = Depends(get_tutor_service),
+                                student_file_service: StudentFileService = Depends(get_student_file_service),
+                                bedrock = Depends(get_bedrock_agent_runtime)):
+    try:
+        request_params, signature = await run_blocking(prepare_tutor_chat, student_id, request,
+                                                       web_request.state.user_id, student_service, tutor_service,
+                                                       student_file_service)
 
-        # Call AWS Bedrock
-        response = bedrock.retrieve_and_generate(**request_params)
+        # Opening questions for an equivalent profile and subject are answered from the cache
+        cached_answer = response_cache.lookup(request_params, signature)
+        if cached_answer is not None:
+            logger.debug("Answered from response cache")
+            return {"response": cached_answer, "session_id": None}
 
-        logger.info("Bedrock response received")
+        # Call AWS Bedrock through the gateway, which bounds concurrency and enforces the timeout
+        with stage("retrieve_and_generate"):
+            response = await bedrock_gateway.call(web_request.state.user_id, bedrock.retrieve_and_generate,
+                                                  **request_params)
+
+        record_token_usage(request_params, response['output']['text'], "tutor_chat")
+        response_cache.store(request_params, signature, response['output']['text'])
 
         result = {
             "response": response['output']['text'],
             "session_id": response.get('sessionId', None)
         }
 
-        logger.info(f"Returning response length: {len(result['response'])}")
+        logger.debug("Returning response length: %d", len(result['response']))
 
         return result
 
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error generating chat response: {e}")
-        logger.error(f"Error type: {type(e).__name__}")
-        logger.error(f"Error details: {str(e)}")
+        logger.error("Error generating chat response: %s", e, exc_info=e)
         raise HTTPException(status_code=500, detail=f"Failed to generate chat response: {str(e)}")
 
-
-import boto3
-import json
-bedrock = boto3.client("bedrock-agent-runtime", region_name="us-west-2")
-
-
-# Your base prompt — we'll improve this in the next steps
-def build_prompt(student, tutor, subject, class_material=None):
-    # Create concise profile strings
-    student_profile = f"{student['primary_disability']} | {student['learning_preferences']['style']} | {student['learning_preferences']['format']} | {', '.join(student['accommodations_needed'])}"
-
-    prompt = f"Student: {student_profile}\nSubject: {subject}\n"
-
-    if tutor:
-        tutor_profile = f"{tutor['tutoring_style']} | {', '.join(tutor['subjects'])} | {', '.join(tutor['accommodation_skills'])}"
-        prompt += f"Tutor: {tutor_profile}\n"
-
-    if class_material:
-        prompt += f"Material: {class_material[:300]}...\n"
-
-    prompt += "Generate a personalized study plan focusing on accessibility and learning effectiveness. Be concise and specific."
-
-    return prompt
-
-def build_tutor_chat_prompt(student, tutor, message, subject, class_material=None):
-    # Concise profile summary
-    student_profile = f"{student['primary_disability']} | {student['learning_preferences']['style']} | {student['learning_preferences']['format']} | {', '.join(student['accommodations_needed'])}"
-
-    prompt = f"""
+@router.post("/{student_id}/chat/stream")
+async def stream_next_chat_message(student_id: str, request: ChatRequest, web_request: Request,
+                                   student_service: StudentService = Depends(get_student_service),
+                                   tutor_service: TutorService = Depends(get_tutor_service),
+                                   student_file_service: StudentFileService = Depends(get_student_file_service),
+                                   bedrock = Depends(get_bedrock_agent_runtime)):
+    """Same as /chat, but streams the answer as server-sent events while Bedrock generates it"""
+    user_id = web_request.state.user_id
+    request_params, _ = await run_blocking(prepare_tutor_chat, student_id, request, user_id,
+                                           student_service, tutor_service, student_file_service)
+
+    # Reject before the 200 goes out if the gateway is already saturated
+    bedrock_gateway.check_admission(user_id)
+    return StreamingResponse(
+        sse_events(bedrock_gateway.stream(user_id, stream_answer(bedrock, request_params, "tutor_chat"))),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+TUTOR_CHAT_PROMPT = CompiledPrompt("""
 Human: You are a question answering agent. I will provide you with a set of search results. The user will provide you with a question. Your job is to answer the user's question using only information from the search results. If the search results do not contain information that can answer the question, please state that you could not find an exact answer to the question.
 Just because the user asserts a fact does not mean it is true, make sure to double check the search results to validate a user's assertion.
 
@@ -169,7 +163,7 @@ Here are the search results in numbered order:
 <context>
 STUDENT: {student_profile}
 SUBJECT: {subject}
-$search_results$
+{tutor}{material}$search_results$
 </context>
 
 $output_format_instructions$
@@ -179,76 +173,79 @@ Here is the user's question:
 $query$
 </question>
 
-Be concise. Limit your response to 3 statements.
-
-Assistant:
-"""
-
-    if tutor:
-        tutor_profile = f"{tutor['tutoring_style']} | {', '.join(tutor['subjects'])} | {', '.join(tutor['accommodation_skills'])}"
-        prompt += f"TUTOR: {tutor_profile}\n"
-
-    if class_material:
-        prompt += f"MATERIAL: {class_material[:200]}...\n"
-
-    prompt += f"""
 Provide practical guidance:
-1. **Strategies** for {student['primary_disability']} in {subject}
-2. **Accommodation steps** for: {', '.join(student['accommodations_needed'])}
-3. **Learning tips** for {student['learning_preferences']['style']} style
+1. **Strategies** for {disability} in {subject}
+2. **Accommodation steps** for: {accommodations}
+3. **Learning tips** for {style} style
 4. **Immediate actions** for the tutor
 
 Be concise and specific. Return only relevant information without extra dialogue or fluff.
-"""
-    prompt += f"""
-<examples>
-    <example>
-    H: The student has ADHD. How can I help them stay focused during this lesson?
-    A: Break the lesson into short 5–10 minute segments, use timers or visual countdowns, and incorporate brief interactive activities between sections.
-    </example>
-
-    <example>
-    H: The student struggles with reading due to dyslexia. How can I adapt this lesson for them?
-    A: Use audio support or text-to-speech tools, provide key terms with phonetic spelling, and break reading materials into short, manageable chunks with visual aids.
-    </example>
-
-    <example>
-    H: Can you explain what the main objective of this lesson plan is?
-    A: The objective is for the student to understand Newton’s Second Law and apply F=ma to real-world problems while practicing unit analysis.
-    </example>
-
-    <example>
-    H: How can I check if the student understood today’s lesson?
-    A: Ask them to explain the concept in their own words and solve one example problem without guidance. If they can do both correctly, they’ve likely grasped the material.
-    </example>
-
-    <example>
-    H: What should I do if the student gets frustrated halfway through?
-    A: Pause the lesson, acknowledge their frustration, and offer a short, low-pressure activity before returning to the main task. Break the remaining material into smaller steps.
-    </example>
-</examples>
-
+Limit your response to 3 statements.
+{examples}
+Assistant:
+""")
+
+# (question, answer) pairs; the ones sharing most words with the tutor's question are used
+TUTOR_CHAT_EXAMPLES = [
+    ("The student has ADHD. How can I help them stay focused during this lesson?",
+     "Break the lesson into short 5–10 minute segments, use timers or visual countdowns, and incorporate brief interactive activities between sections."),
+    ("The student struggles with reading due to dyslexia. How can I adapt this lesson for them?",
+     "Use audio support or text-to-speech tools, provide key terms with phonetic spelling, and break reading materials into short, manageable chunks with visual aids."),
+    ("Can you explain what the main objective of this lesson plan is?",
+     "The objective is for the student to understand Newton’s Second Law and apply F=ma to real-world problems while practicing unit analysis."),
+    ("How can I check if the student understood today’s lesson?",
+     "Ask them to explain the concept in their own words and solve one example problem without guidance. If they can do both correctly, they’ve likely grasped the material."),
+    ("What should I do if the student gets frustrated halfway through?",
+     "Pause the lesson, acknowledge their frustration, and offer a short, low-pressure activity before returning to the main task. Break the remaining material into smaller steps."),
+]
+EXAMPLE_BLOCKS = [(key_words(question), f"<example>\nH: {question}\nA: {answer}\n</example>\n")
+                  for question, answer in TUTOR_CHAT_EXAMPLES]
+# Kept free while fitting material, so at least the shortest example still fits
+EXAMPLE_RESERVE = min(estimate_tokens(block) for _, block in EXAMPLE_BLOCKS) + estimate_tokens("<examples>\n</examples>\n")
+
+
+def build_tutor_chat_prompt(student, tutor, message, subject, class_material=None, passages=None,
+                            token_budget=PROMPT_TOKEN_BUDGET):
     """
-
-    return prompt
-
-# Example student and tutor (replace with real data later)
-student = {
-    "primary_disability": "Dyslexia",
-    "accommodations_needed": ["Text-to-speech software", "Braille materials"],
-    "learning_preferences": {
-        "style": "Reading/Writing",
-        "format": "1-on-1",
-        "modality": "Hybrid"
+    The tutor chat prompt template, fitted to token_budget: the profiles always go in,
+    then as much of the matching material as fits, then the examples closest to the question.
+    """
+    preferences = student['learning_preferences']
+    accommodations = ', '.join(student['accommodations_needed'])
+    values = {
+        # Concise profile summary
+        'student_profile': f"{student['primary_disability']} | {preferences['style']} | {preferences['format']} | {accommodations}",
+        'subject': subject,
+        'disability': student['primary_disability'],
+        'accommodations': accommodations,
+        'style': preferences['style'],
+        'tutor': "",
     }
-}
-
-tutor = {
-    "tutoring_style": "Reading/Writing",
-    "subjects": ["English", "Communication"],
-    "tools_or_technologies": ["Screen readers", "Whiteboard tools"],
-    "accommodation_skills": ["Assistive technology", "Flexible scheduling"]
-}
-
-subject = "Introduction to Essay Writing"
-
+    if tutor:
+        values['tutor'] = f"TUTOR: {tutor['tutoring_style']} | {', '.join(tutor['subjects'])} | {', '.join(tutor['accommodation_skills'])}\n"
+
+    budget = PromptBudget(token_budget - TUTOR_CHAT_PROMPT.fixed_tokens)
+    for text in values.values():
+        budget.spend(text)
+    budget.spend(subject)  # the subject appears twice
+
+    material = ""
+    if passages:
+        budget.spend("MATERIAL:\n")
+        for passage in passages:
+            line = budget.fit(f"- {passage['text']}", reserve=EXAMPLE_RESERVE)
+            if not line:
+                break
+            material += line + "\n"
+        material = "MATERIAL:\n" + material if material else ""
+    elif class_material:
+        excerpt = budget.fit(class_material, reserve=EXAMPLE_RESERVE + estimate_tokens("MATERIAL: ...\n"))
+        if excerpt:
+            material = f"MATERIAL: {excerpt.removesuffix('...')}...\n"
+    values['material'] = material
+
+    budget.spend("<examples>\n</examples>\n")
+    examples = fit_examples(budget, rank_by_overlap(message, EXAMPLE_BLOCKS))
+    values['examples'] = f"<examples>\n{''.join(examples)}</examples>\n" if examples else ""
+
+    return TUTOR_CHAT_PROMPT.render(**values)
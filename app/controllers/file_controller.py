@@ -1,41 +1,96 @@
-from io import BytesIO
-from fastapi import APIRouter, FastAPI, File, HTTPException, Request, UploadFile
-from fastapi.responses import JSONResponse
-import pymupdf as fitz
+import hashlib
+import os
+from typing import Awaitable, Callable, Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile
 
 from models.student_file import StudentFile
-from services.student_file_service import StudentFileService
+from services.pdf_extractor import extract_pdf_file, spool_upload
+from services.student_file_service import StudentFileConflict, StudentFileNotFound, StudentFileService
+from services.background_jobs import enqueue_study_plan
+from dependencies import get_student_file_service
 
 router = APIRouter(prefix="/api/file", tags=["file"])
 
 @router.post("/upload")
-async def upload_file(web_request: Request, file: UploadFile = File(...)):
+async def upload_file(web_request: Request, file: UploadFile = File(...),
+                      student_file_service: StudentFileService = Depends(get_student_file_service)):
     if web_request.state.user_role != "student" or not web_request.state.user_id:
         raise HTTPException(status_code=403, detail="Access denied")
 
+    student_id = web_request.state.user_id
     if file.content_type == "text/plain":
-        content = await read_text_file(file)
+        data = await file.read()
+        manifest = await save_upload(student_file_service, student_id, file, hashlib.sha256(data).hexdigest(),
+                                     lambda: decode_text(data))
     elif file.content_type == "application/pdf":
-        content = await read_pdf_file(file)
+        # Hashed while it is spooled to disk; 413 for oversized documents
+        digest = hashlib.sha256()
+        path = await spool_upload(file, digest=digest)
+        try:
+            manifest = await save_upload(student_file_service, student_id, file, digest.hexdigest(),
+                                         lambda: extract_pdf_file(path))
+        finally:
+            os.unlink(path)
     else:
         raise HTTPException(status_code=400, detail="Unsupported file type")
 
-    student_file = StudentFile(
-        student_id=web_request.state.user_id,
-        filename=file.filename,
-        content_type=file.content_type,
-        content=content,
-        size_bytes=file.size
-    )
+    # New material changes the study plan; regenerate it in the background
+    job = enqueue_study_plan(web_request.state.user_id)
+
+    return {"detail":"File uploaded.", "file_id": manifest["file_id"], "job_id": job.job_id}
+
+@router.get("/")
+async def list_files(web_request: Request,
+                     student_file_service: StudentFileService = Depends(get_student_file_service)):
+    if web_request.state.user_role != "student" or not web_request.state.user_id:
+        raise HTTPException(status_code=403, detail="Access denied")
 
-    StudentFileService().save_file(student_file)
+    files = await student_file_service.list_files_async(web_request.state.user_id)
+    return [{key: manifest.get(key) for key in ("file_id", "filename", "content_type", "size_bytes")}
+            for manifest in files]
 
-    return {"detail":"File uploaded."}
+@router.delete("/{file_id}")
+async def delete_file(file_id: str, web_request: Request,
+                      student_file_service: StudentFileService = Depends(get_student_file_service)):
+    if web_request.state.user_role != "student" or not web_request.state.user_id:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    try:
+        await student_file_service.delete_file_async(web_request.state.user_id, file_id)
+    except StudentFileNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except StudentFileConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    job = enqueue_study_plan(web_request.state.user_id)
 
-async def read_text_file(file: UploadFile):
-    # Read entire content into memory
-    content = await file.read()
+    return {"detail": "File deleted.", "job_id": job.job_id}
 
+async def save_upload(student_file_service: StudentFileService, student_id: str, file: UploadFile,
+                      content_hash: str, extract: Callable[[], Awaitable[Optional[str]]]) -> dict:
+    """
+    Reference the stored text when the same bytes were uploaded before (by anyone); only
+    new documents are extracted (page-parallel for PDFs) and stored. 409 when the student
+    already has as many files as allowed.
+    """
+    try:
+        manifest = await student_file_service.add_reference_async(student_id, content_hash, file.filename,
+                                                                  file.content_type, file.size)
+        if manifest is not None:
+            return manifest
+
+        student_file = StudentFile(
+            student_id=student_id,
+            filename=file.filename,
+            content_type=file.content_type,
+            content=await extract(),
+            size_bytes=file.size
+        )
+        return await student_file_service.save_file_async(student_file, content_hash)
+    except StudentFileConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+async def decode_text(content: bytes):
     # You can decode if it's text
     try:
         text_content = content.decode("utf-8")
@@ -43,21 +98,3 @@ async def read_text_file(file: UploadFile):
         text_content = None  # Not a UTF-8 text file
 
     return text_content
-
-async def read_pdf_file(file: UploadFile):
-    # Read the uploaded file into memory as bytes
-    file_bytes = await file.read()
-
-    # Use BytesIO to create a file-like object from bytes
-    pdf_stream = BytesIO(file_bytes)
-
-    # Open PDF from the byte stream using fitz
-    doc = fitz.open(stream=pdf_stream.read(), filetype="pdf")
-
-    # Extract text from all pages
-    all_text = ""
-    for page_num in range(doc.page_count):
-        page = doc.load_page(page_num)
-        all_text += page.get_text()
-
-    return all_text
\ No newline at end of file
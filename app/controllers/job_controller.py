@@ -0,0 +1,20 @@
+from fastapi import APIRouter, HTTPException, Request
+import logging
+from services.job_queue import job_queue
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+@router.get("/{job_id}")
+def get_job(job_id: str, web_request: Request):
+    """Status of a background job: queued, running, retrying, succeeded or failed"""
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    # Jobs are keyed by student id; students may only follow their own
+    if web_request.state.user_role == 'student' and job.key != web_request.state.user_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job.to_dict()
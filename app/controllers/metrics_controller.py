@@ -0,0 +1,25 @@
+import hmac
+import os
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+from services.metrics import metrics
+
+# METRICS_ENABLED=1 serves /metrics; off by default, since it exposes routes, volumes and cache rates
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "") == "1"
+# Bearer token scrapers must send when set; leave empty only where just Prometheus can reach the app
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Outside /api/, so scrapers do not need a user's token; METRICS_TOKEN guards it instead
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(request: Request):
+    """Counters, cache hit ratios and latency histograms in the Prometheus text format"""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if METRICS_TOKEN and not hmac.compare_digest(request.headers.get("authorization", "").encode(),
+                                                 f"Bearer {METRICS_TOKEN}".encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.prometheus(), media_type="text/plain; version=0.0.4")
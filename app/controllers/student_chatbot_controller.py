@@ -1,95 +1,98 @@
 from typing import Optional
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import os
 import logging
-import boto3
+from services.bedrock_gateway import bedrock_gateway
+from services.dynamo_executor import run_blocking
+from services.bedrock_service import (SSE_HEADERS, build_retrieve_and_generate_request, record_token_usage,
+                                      sse_events, stream_answer)
+from services.prompt_compiler import CompiledPrompt
+from services.tracing import stage
 from services.student_service import StudentService
-
-# Load environment variables
-KNOWLEDGE_BASE_ID = os.getenv("KNOWLEDGE_BASE_ID")
+from dependencies import get_bedrock_agent_runtime, get_student_service
 
 logger = logging.getLogger(__name__)
 
 # Create separate router for student chatbot
 router = APIRouter(prefix="/api/student-chat", tags=["student-chatbot"])
-student_service = StudentService()
-
-# Initialize Bedrock client
-bedrock = boto3.client("bedrock-agent-runtime", region_name="us-west-2")
 
 class ChatbotRequest(BaseModel):
     message: str
     subject: str = "General"
     session_id: Optional[str] = None
 
+def prepare_student_chat(student_id: str, request: ChatbotRequest, web_request: Request,
+                         student_service: StudentService) -> dict:
+    """Check access, load the student and build the retrieve_and_generate parameters"""
+    # Verify the requesting user is the same student
+    if web_request.state.user_role != "student" or web_request.state.user_id != student_id:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    # Get student data
+    with stage("get_student"):
+        student = student_service.get_student(student_id)
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+
+    # Build chatbot context prompt
+    generation_prompt = build_chatbot_prompt(student, request.message)
+
+    return build_retrieve_and_generate_request(request.message, generation_prompt, request.session_id)
+
 @router.post("/{student_id}/chatbot")
-def student_chatbot_message(student_id: str, request: ChatbotRequest, web_request: Request):
+async def student_chatbot_message(student_id: str, request: ChatbotRequest, web_request: Request,
+                                  student_service: StudentService = Depends(get_student_service),
+                                  bedrock = Depends(get_bedrock_agent_runtime)):
     """
     Student chatbot endpoint for interactive Q&A about tutoring experience
     """
     try:
-        # Verify the requesting user is the same student
-        if web_request.state.user_role != "student" or web_request.state.user_id != student_id:
-            raise HTTPException(status_code=403, detail="Access denied")
-
-        # Get student data
-        student = student_service.get_student(student_id)
-        if not student:
-            raise HTTPException(status_code=404, detail="Student not found")
-
-        # Build chatbot context prompt
-        generation_prompt = build_chatbot_prompt(student, request.message)
-
-        # Create a base dictionary with the required parameters
-        request_params = {
-            "input": {
-                "text": request.message
-            },
-            "retrieveAndGenerateConfiguration": {
-                "type": "KNOWLEDGE_BASE",
-                "knowledgeBaseConfiguration": {
-                    "knowledgeBaseId": KNOWLEDGE_BASE_ID,
-                    "modelArn": f'arn:aws:bedrock:us-west-2::foundation-model/{os.getenv("BEDROCK_MODEL_ID")}',
-                    'generationConfiguration': {
-                        'promptTemplate': {
-                            'textPromptTemplate': generation_prompt
-                        }
-                    }
-                }
-            }
-        }
+        request_params = await run_blocking(prepare_student_chat, student_id, request, web_request, student_service)
 
-        # Conditionally add sessionId if it's not None
-        if request.session_id:
-            request_params["sessionId"] = request.session_id
+        # Call AWS Bedrock through the gateway, which bounds concurrency and enforces the timeout
+        with stage("retrieve_and_generate"):
+            response = await bedrock_gateway.call(student_id, bedrock.retrieve_and_generate, **request_params)
+        record_token_usage(request_params, response['output']['text'], "student_chat")
 
-        # Call AWS Bedrock
-        response = bedrock.retrieve_and_generate(**request_params)
-
-        logger.debug("Bedrock session id " + response.get('sessionId', None))
+        logger.debug("Bedrock session id %s", response.get('sessionId'))
         return {
             "response": response['output']['text'],
             "session_id": response.get('sessionId', None)
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error generating chatbot response: {e}")
+        logger.error("Error generating chatbot response: %s", e, exc_info=e)
         raise HTTPException(status_code=500, detail="Failed to generate chatbot response")
 
-def build_chatbot_prompt(student, user_message):
+@router.post("/{student_id}/chatbot/stream")
+async def stream_student_chatbot_message(student_id: str, request: ChatbotRequest, web_request: Request,
+                                         student_service: StudentService = Depends(get_student_service),
+                                         bedrock = Depends(get_bedrock_agent_runtime)):
     """
-    Build a student-focused chatbot prompt with disability context and support guidance
+    Same as /chatbot, but streams the answer as server-sent events while Bedrock generates it
     """
-    prompt = f"""
+    request_params = await run_blocking(prepare_student_chat, student_id, request, web_request, student_service)
+
+    # Reject before the 200 goes out if the gateway is already saturated
+    bedrock_gateway.check_admission(student_id)
+    return StreamingResponse(
+        sse_events(bedrock_gateway.stream(student_id, stream_answer(bedrock, request_params, "student_chat"))),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+CHATBOT_PROMPT = CompiledPrompt("""
 Human: You are a friendly, helpful student support chatbot for a disability tutoring service. You help students with questions about their tutoring experience, accommodations, scheduling, and general academic support.
 
 <Student Context>
-- Primary Disability: {student["primary_disability"]}
-- Learning Style: {student["learning_preferences"]["style"]}
-- Preferred Format: {student["learning_preferences"]["format"]}
-- Modality: {student["learning_preferences"]["modality"]}
-- Accommodations: {', '.join(student["accommodations_needed"])}
+- Primary Disability: {disability}
+- Learning Style: {style}
+- Preferred Format: {format}
+- Modality: {modality}
+- Accommodations: {accommodations}
 $search_results$
 </Student Context>
 
@@ -109,5 +112,17 @@ $query$
 
 Provide a helpful response. Be concise. Limit your response to 3 statements.
 Assistant:
-"""
-    return prompt
\ No newline at end of file
+""")
+
+def build_chatbot_prompt(student, user_message):
+    """
+    Build a student-focused chatbot prompt with disability context and support guidance
+    """
+    preferences = student["learning_preferences"]
+    return CHATBOT_PROMPT.render(
+        disability=student["primary_disability"],
+        style=preferences["style"],
+        format=preferences["format"],
+        modality=preferences["modality"],
+        accommodations=', '.join(student["accommodations_needed"]),
+    )
@@ -1,76 +1,131 @@
-from typing import List
-from fastapi import APIRouter, HTTPException, Request
+from typing import List, Optional
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 import logging
-import boto3
 from models import StudentProfile
 from services import StudentService
 from services.student_tutor_matcher import match_student_to_tutor
+from services.dynamo_scan import scan_items, scan_page
+from dependencies import get_student_service
+from services.dynamo_executor import run_blocking
+from services.student_service import MATCHING_MODE
+from services.background_jobs import enqueue_match_student, enqueue_study_plan
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/students", tags=["students"])
 
 @router.get("/{student_id}", response_model=StudentProfile)
-async def get_student(student_id: str, web_request: Request):
+async def get_student(student_id: str, web_request: Request,
+                      student_service: StudentService = Depends(get_student_service)):
     if web_request.state.user_role == 'student' and student_id != web_request.state.user_id:
         raise HTTPException(status_code=403, detail="Student ID does not match user ID.")
 
-    student_service = StudentService()
-    return student_service.get_student(student_id)
+    return await student_service.get_student_async(student_id)
 
 @router.put("/{student_id}")
-async def create_or_update_student(student: StudentProfile, student_id: str, web_request: Request):
+async def create_or_update_student(student: StudentProfile, student_id: str, web_request: Request,
+                                   student_service: StudentService = Depends(get_student_service)):
     if web_request.state.user_role == 'student' and student.student_id != web_request.state.user_id:
         raise HTTPException(status_code=403, detail="Student ID does not match user ID.")
 
     student.student_id = student_id
 
-    student_service = StudentService()
+    await student_service.save_student_async(student.model_dump())
+
+    # Matching scans and solves, so it runs as a job; the job refreshes the study plan afterwards.
+    # Students who keep their tutor only need the study plan brought up to date.
+    if student.tutor_id in (None, "none"):
+        job = enqueue_match_student(student_id)
+    else:
+        job = enqueue_study_plan(student_id)
 
-    student_service.add_student(student)
     return {
         "tutor_id": student.tutor_id,
         "tutor_name": student.tutor_name,
+        "job_id": job.job_id,
         "detail": "Student was created/updated."
     }
 
 @router.get("/")
-def get_all_students(web_request: Request, response_model=List[StudentProfile]):
+def get_all_students(web_request: Request, limit: Optional[int] = Query(None, ge=1, le=1000),
+                     cursor: Optional[str] = None, response_model=List[StudentProfile],
+                     student_service: StudentService = Depends(get_student_service)):
     if web_request.state.user_role == 'student':
         raise HTTPException(status_code=403, detail="This endpoint is for tutors only.")
 
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table('Students')  # replace with your table name
+    table = student_service.table
+
+    # Cursor pagination: one page plus the cursor to pass back for the next one
+    if limit is not None or cursor is not None:
+        try:
+            items, next_cursor = scan_page(table, limit or 100, cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor.")
+        return {"items": items, "next_cursor": next_cursor}
+
+    # Newline-delimited JSON, one student per line, streamed while the scan runs
+    if "application/x-ndjson" in web_request.headers.get("accept", ""):
+        lines = (json.dumps(jsonable_encoder(item)) + "\n" for item in scan_items(table))
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+
+    return StreamingResponse(stream_json_array(scan_items(table)), media_type="application/json")
+
+def stream_json_array(items):
+    yield "["
+    for i, item in enumerate(items):
+        yield ("," if i else "") + json.dumps(jsonable_encoder(item))
+    yield "]"
+
+@router.post("/rematch")
+def rematch_all_students(web_request: Request, only_unmatched: bool = True, dry_run: bool = False,
+                         mode: Optional[str] = None,
+                         student_service: StudentService = Depends(get_student_service)):
+    if web_request.state.user_role == 'student':
+        raise HTTPException(status_code=403, detail="This endpoint is for tutors only.")
 
-    response = table.scan()
-    items = response.get('Items', [])
+    if mode not in (None, "greedy", "global"):
+        raise HTTPException(status_code=400, detail="Mode must be 'greedy' or 'global'.")
 
-    return items
+    return student_service.rematch_all(only_unmatched=only_unmatched, dry_run=dry_run, mode=mode)
 
 @router.post("/{student_id}/match")
-async def match_student_with_tutor(student_id: str, web_request: Request):
+async def match_student_with_tutor(student_id: str, web_request: Request,
+                                   student_service: StudentService = Depends(get_student_service)):
     if web_request.state.user_role == 'student' and student_id != web_request.state.user_id:
         raise HTTPException(status_code=403, detail="Student ID does not match user ID.")
 
     try:
         # Get student data
-        student_service = StudentService()
-        student = student_service.get_student(student_id)
+        student = await student_service.get_student_async(student_id)
         
         if not student:
             raise HTTPException(status_code=404, detail="Student not found")
 
-        # Get all tutors from database
-        dynamodb = boto3.resource('dynamodb')
-        tutors_table = dynamodb.Table('Tutors')
-        tutors_response = tutors_table.scan()
-        tutors = tutors_response.get('Items', [])
+        # Get all tutors from the cached roster
+        tutor_index = await student_service.get_tutor_index_async()
+        tutors = tutor_index.tutors()
 
         if not tutors:
             raise HTTPException(status_code=404, detail="No tutors available")
 
+        if MATCHING_MODE == "global":
+            # Capacity-aware: may move neighbouring students to free a seat
+            profile = StudentProfile(**student)
+            await run_blocking(student_service.assign_with_capacity, profile, tutors)
+            if profile.tutor_id in (None, "none"):
+                raise HTTPException(status_code=404, detail="No suitable tutor matches found")
+
+            return {
+                "tutor": next(t for t in tutors if t['tutor_id'] == profile.tutor_id),
+                "match_found": True,
+                "message": "Successfully matched with a tutor!"
+            }
+
         # Find best tutor matches
-        matched_tutors = match_student_to_tutor(student, tutors)
+        matched_tutors = match_student_to_tutor(student, tutor_index)
         
         if not matched_tutors:
             raise HTTPException(status_code=404, detail="No suitable tutor matches found")
@@ -78,16 +133,14 @@ async def match_student_with_tutor(student_id: str, web_request: Request):
         # Return the best match (first in sorted list)
         best_tutor = matched_tutors[0]
         
-        # Update student record with matched tutor info
-        student_dict = student if isinstance(student, dict) else student.__dict__
-        student_dict['tutor_id'] = best_tutor.get('tutor_id')
-        student_dict['tutor_name'] = best_tutor.get('name', best_tutor.get('tutor_name'))
-        
-        # Save the updated student record
-        students_table = dynamodb.Table('Students')
-        students_table.put_item(Item=student_dict)
+        # Write only the tutor fields, so profile edits saved since the read above are kept
+        try:
+            await run_blocking(student_service.set_tutor, student_id, best_tutor.get('tutor_id'),
+                               best_tutor.get('display_name', best_tutor.get('tutor_name')))
+        except LookupError:
+            raise HTTPException(status_code=404, detail="Student not found")
         
-        logger.info(f"Student {student_id} matched with tutor {best_tutor.get('tutor_id')}")
+        logger.info("Student %s matched with tutor %s", student_id, best_tutor.get('tutor_id'))
         
         return {
             "tutor": best_tutor,
@@ -95,6 +148,8 @@ async def match_student_with_tutor(student_id: str, web_request: Request):
             "message": "Successfully matched with a tutor!"
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error matching student {student_id}: {str(e)}")
+        logger.error("Error matching student %s: %s", student_id, e, exc_info=e)
         raise HTTPException(status_code=500, detail=f"Error finding tutor match: {str(e)}")
\ No newline at end of file
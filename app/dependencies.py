@@ -0,0 +1,46 @@
+import os
+
+from services.aws_clients import ThreadLocalTable, get_client
+from services.fake_bedrock import FakeBedrockAgentRuntime
+from services.student_file_service import StudentFileService
+from services.student_service import StudentService
+from services.study_plan_service import StudyPlanService
+from services.tutor_service import TutorService
+
+# FastAPI dependencies handing out services. Services hold no AWS objects themselves:
+# tables come from the calling thread's resource, so they are cheap to build per request.
+
+
+def get_student_service() -> StudentService:
+    return StudentService()
+
+
+def get_tutor_service() -> TutorService:
+    return TutorService()
+
+
+def get_student_file_service() -> StudentFileService:
+    return StudentFileService()
+
+
+def get_study_plan_service() -> StudyPlanService:
+    return StudyPlanService()
+
+
+def get_users_table():
+    return ThreadLocalTable('Users')
+
+
+def get_cognito_client():
+    return get_client('cognito-idp')
+
+
+# BEDROCK_FAKE=1 swaps Bedrock for an offline stand-in (local development, load tests)
+BEDROCK_FAKE = os.getenv("BEDROCK_FAKE", "") == "1"
+fake_bedrock = FakeBedrockAgentRuntime()
+
+
+def get_bedrock_agent_runtime():
+    if BEDROCK_FAKE:
+        return fake_bedrock
+    return get_client('bedrock-agent-runtime')
@@ -8,11 +8,14 @@ from controllers import student_controller
 from controllers import chat_controller
 from controllers import student_chatbot_controller
 from controllers import file_controller
-import logging
+from controllers import job_controller
+from controllers import metrics_controller
 from fastapi.middleware.cors import CORSMiddleware
-from middleware import BearerAuthMiddleware
+from middleware import BearerAuthMiddleware, RequestMetricsMiddleware
+from services.logging_config import configure_logging
 
-logging.basicConfig(level=logging.DEBUG)
+# JSON lines written by a background thread; levels come from LOG_LEVEL and LOG_LEVELS
+configure_logging()
 
 app = FastAPI()
 app.include_router(auth_controller.router)
@@ -20,6 +23,8 @@ app.include_router(student_controller.router)
 app.include_router(chat_controller.router)
 app.include_router(student_chatbot_controller.router)
 app.include_router(file_controller.router)
+app.include_router(job_controller.router)
+app.include_router(metrics_controller.router)
 
 # Mount the 'static' directory at the '/static' URL path
 app.mount("/", StaticFiles(directory="static", html=True), name="static")
@@ -41,3 +46,6 @@ app.add_middleware(
 )
 
 app.add_middleware(BearerAuthMiddleware)
+
+# Outermost, so request latency includes authentication
+app.add_middleware(RequestMetricsMiddleware)
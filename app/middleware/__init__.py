@@ -1 +1,2 @@
-from .authorization_middleware import BearerAuthMiddleware
\ No newline at end of file
+from .authorization_middleware import BearerAuthMiddleware
+from .request_metrics_middleware import RequestMetricsMiddleware
@@ -1,53 +1,76 @@
-from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.status import HTTP_401_UNAUTHORIZED
+from starlette.types import ASGIApp, Receive, Scope, Send
 import logging
-import os
 
 from services.jwt_service import JwtService
+from services.token_cache import token_cache
+from services.tracing import stage
 
 logger = logging.getLogger(__name__)
 
-# 👇 Define your middleware class
-class BearerAuthMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        if not request.url.path.startswith("/api/"):
-            return await call_next(request)
+# Paths under /api/ that are reachable without a token
+PUBLIC_PATHS = frozenset(["/api/auth/login", "/api/auth/register"])
+
+
+class BearerAuthMiddleware:
+    """
+    Verifies the bearer token of /api/ requests and sets request.state.user_id and
+    request.state.user_role. Plain ASGI rather than BaseHTTPMiddleware: the request and
+    response pass straight through, so streamed answers are not buffered through extra
+    tasks, and static files skip everything but the path check.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            return await self.app(scope, receive, send)
 
         # 👇 Skip middleware logic for OPTIONS requests (CORS preflight)
-        if request.method == "OPTIONS":
-            return await call_next(request)
+        if scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
 
         # Exclude specific paths from authentication
-        if request.url.path in ["/api/auth/login", "/api/auth/register"]:
-            return await call_next(request)
+        if scope["path"] in PUBLIC_PATHS:
+            return await self.app(scope, receive, send)
 
-        auth_header = request.headers.get("Authorization")
+        auth_header = next((value.decode("latin-1") for name, value in scope["headers"]
+                            if name == b"authorization"), None)
         if not auth_header or not auth_header.startswith("Bearer "):
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=401,
                 content={"detail": "Authorization header is missing."},
             )
+            return await response(scope, receive, send)
 
         token = auth_header.removeprefix("Bearer ").strip()
 
         try:
-            decoded_token = await JwtService().decode_access_token(token)
-            request.state.access_token = decoded_token
-            request.state.user_id = decoded_token["username"]
+            with stage("auth"):
+                # Tokens seen before were already verified; only new ones pay for the RS256 check
+                decoded_token = token_cache.get(token)
+                if decoded_token is None:
+                    decoded_token = await JwtService().decode_access_token(token)
+                    token_cache.put(token, decoded_token)
+
+            # request.state reads this dict
+            state = scope.setdefault("state", {})
+            state["access_token"] = decoded_token
+            state["user_id"] = decoded_token["username"]
 
             if "tutor" in decoded_token.get("cognito:groups", []):
-                request.state.user_role = "tutor"
+                state["user_role"] = "tutor"
             else:
-                request.state.user_role = "student"
+                state["user_role"] = "student"
 
             # TODO: Check routes for student and tutor.
         except Exception as e:
             logger.error("Failed to verify JWT token", exc_info=e)
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=401,
                 content={"detail": "Token has expired."},
             )
+            return await response(scope, receive, send)
 
-        return await call_next(request)
+        return await self.app(scope, receive, send)
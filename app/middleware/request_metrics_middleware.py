@@ -0,0 +1,45 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import time
+from contextlib import nullcontext
+
+from services.metrics import metrics
+from services.tracing import tracer
+
+
+class RequestMetricsMiddleware:
+    """
+    Records http_request_seconds{method, route, status} for every request, labelled with
+    the route template (/api/chat/{student_id}/chat) rather than the concrete path so the
+    number of series stays bounded. Streamed responses are timed until their last chunk.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        # The request span is current while the app runs, so stage spans nest under it
+        span_context = tracer.start_as_current_span(scope["path"]) if tracer is not None else nullcontext()
+        with span_context as span:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                # FastAPI puts the matched route on the scope; everything else is static files or a 404
+                route = scope.get("route")
+                route_path = route.path if route is not None else ("static" if status < 400 else "unmatched")
+                metrics.observe("http_request_seconds", time.perf_counter() - started,
+                                method=scope["method"], route=route_path, status=status)
+                if span is not None:
+                    span.update_name(f"{scope['method']} {route_path}")
+                    span.set_attribute("http.status_code", status)
@@ -1,3 +1,3 @@
 from .student_profile import StudentProfile
 from .tutor_profile import TutorProfile
-from .student_file import StudentFile
\ No newline at end of file
+from .student_file import StudentFile, StudentFileManifest
\ No newline at end of file
@@ -0,0 +1,88 @@
+from typing import List, Optional, Tuple
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+DAY_INDEX = {day: index for index, day in enumerate(DAYS)}
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+def parse_time(value) -> Optional[int]:
+    """Convert an "HH:MM" string to minutes since midnight, or None if it is not a valid time"""
+    if not isinstance(value, str):
+        return None
+    hours, sep, minutes = value.partition(":")
+    if not sep or not hours.isdigit() or not minutes.isdigit():
+        return None
+    hours, minutes = int(hours), int(minutes)
+    if hours > 24 or minutes > 59 or hours * 60 + minutes > MINUTES_PER_DAY:
+        return None
+    return hours * 60 + minutes
+
+
+def get_slots(item):
+    """Return the availability slots of a student or tutor in either DynamoDB or regular format"""
+    availability = item.get("availability")
+    if isinstance(availability, dict) and "L" in availability:
+        return availability["L"]
+    return availability or []
+
+
+def get_slot_values(slot):
+    """Return (day, start_time, end_time) of a slot in either DynamoDB or regular format"""
+    if isinstance(slot, dict) and "M" in slot:
+        values = slot["M"]
+        return values["day"]["S"], values["start_time"]["S"], values["end_time"]["S"]
+    return slot.get("day", ""), slot.get("start_time", ""), slot.get("end_time", "")
+
+
+def slot_interval(day, start_time, end_time) -> Optional[Tuple[int, int]]:
+    """(start, end) in minutes since Monday 00:00, or None for an invalid or empty slot"""
+    day_index = DAY_INDEX.get(getattr(day, "value", day))
+    start = parse_time(start_time)
+    end = parse_time(end_time)
+    if day_index is None or start is None or end is None or end <= start:
+        return None
+    offset = day_index * MINUTES_PER_DAY
+    return offset + start, offset + end
+
+
+def week_intervals(slots) -> List[List[int]]:
+    """Sorted, merged [start, end) week-minute intervals covered by availability slots"""
+    intervals = sorted(filter(None, (slot_interval(*get_slot_values(slot)) for slot in slots)))
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def intervals_mask(intervals) -> int:
+    """Bitmask with one bit per minute of the week covered by the intervals"""
+    mask = 0
+    for start, end in intervals:
+        start, end = int(start), int(end)
+        mask |= ((1 << (end - start)) - 1) << start
+    return mask
+
+
+def get_intervals(item):
+    """Precomputed availability_intervals of a student or tutor, or None for records saved without them"""
+    intervals = item.get("availability_intervals")
+    if isinstance(intervals, dict) and "L" in intervals:
+        return [[value["N"] for value in interval["L"]] for interval in intervals["L"]]
+    return intervals
+
+
+def availability_mask(item) -> int:
+    """Weekly minute bitmask of all availability slots of a student or tutor"""
+    intervals = get_intervals(item)
+    if intervals is not None:
+        return intervals_mask(intervals)
+    return intervals_mask(week_intervals(get_slots(item)))
+
+
+def overlap_minutes(mask1: int, mask2: int) -> int:
+    """Number of minutes per week two availability masks have in common"""
+    return (mask1 & mask2).bit_count()
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 class StudentFile(BaseModel):
@@ -6,4 +8,19 @@ class StudentFile(BaseModel):
     filename: str
     content_type: str
     content: str
-    size_bytes: int
\ No newline at end of file
+    size_bytes: int
+
+class StudentFileManifest(BaseModel):
+    """What the StudentFiles table holds for an upload; the text itself lives in StudentFileChunks"""
+    student_id: str
+    file_id: str
+    filename: str
+    content_type: str
+    size_bytes: int
+    text_bytes: int
+    chunk_count: int
+    excerpt: str
+    compression: str = "zlib"
+    # SHA-256 of the uploaded bytes and the chunks of the shared copy of its text (see MaterialContents)
+    content_hash: Optional[str] = None
+    chunks_id: Optional[str] = None
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, computed_field
 from typing import List, Optional
 from enum import Enum
 
+from models.availability import week_intervals
+
 
 class Day(str, Enum):
     Monday = "Monday"
@@ -37,3 +39,9 @@ class StudentProfile(BaseModel):
     additional_info: Optional[str] = ""
     tutor_id: Optional[str] = None
     tutor_name: Optional[str] = None
+
+    @computed_field
+    @property
+    def availability_intervals(self) -> List[List[int]]:
+        """Availability as sorted [start, end) minutes since Monday 00:00, stored with the item for matching"""
+        return week_intervals([item.model_dump() for item in self.availability])
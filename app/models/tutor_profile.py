@@ -1,6 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, computed_field
 from typing import List, Optional
 
+from models.student_profile import AvailabilityItem
+from models.availability import week_intervals
+
 class TutorProfile(BaseModel):
     tutor_id: str
     display_name: str
@@ -8,4 +11,11 @@ class TutorProfile(BaseModel):
     subjects: List[str]
     tools_or_technologies: List[str]
     accommodation_skills: List[str]
-    additional_info: Optional[str] = ""
\ No newline at end of file
+    additional_info: Optional[str] = ""
+    availability: List[AvailabilityItem] = []
+
+    @computed_field
+    @property
+    def availability_intervals(self) -> List[List[int]]:
+        """Availability as sorted [start, end) minutes since Monday 00:00, stored with the item for matching"""
+        return week_intervals([item.model_dump() for item in self.availability])
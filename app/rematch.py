@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Re-match students against the current tutor pool in one batch.
+
+Usage: python rematch.py [--all] [--mode greedy|global] [--dry-run]
+"""
+import argparse
+import json
+import logging
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from services.student_service import StudentService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-match students against the current tutor pool")
+    parser.add_argument("--all", action="store_true", help="re-match students that already have a tutor too")
+    parser.add_argument("--mode", choices=["greedy", "global"], help="greedy best match or capacity-aware assignment")
+    parser.add_argument("--dry-run", action="store_true", help="print the new matches without saving them")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    result = StudentService().rematch_all(only_unmatched=not args.all, dry_run=args.dry_run, mode=args.mode)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
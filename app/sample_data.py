@@ -0,0 +1,101 @@
+"""
+Synthetic data shared by the tests and the benchmarks: student and tutor populations,
+course-pack PDFs, words for material text, a study plan and JWT signing keys. Nothing
+here talks to AWS.
+"""
+import random
+
+import pymupdf as fitz
+import rsa
+from jose import jwk
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+SUBJECTS = ["Math", "English", "Physics", "Chemistry", "Biology", "History", "Communication"]
+ACCOMMODATIONS = ["Extra time", "Note taker", "Braille materials", "Text-to-speech software", "Frequent breaks"]
+DISABILITIES = ["ADHD", "Autism", "Dyslexia", "Visual impairment", "None"]
+FORMATS = ["1-on-1", "Small group", ""]
+MODALITIES = ["Online", "In-person", "Hybrid"]
+TIMES = [f"{h:02d}:{m:02d}" for h in range(7, 22) for m in (0, 15, 30, 45)]
+
+# Words of the course packs make_pdf writes
+PDF_WORDS = ["accommodation", "assessment", "lecture", "notes", "equation", "reading", "timer", "summary",
+             "diagram", "practice", "student", "tutor", "chapter", "exercise", "review", "focus"]
+# Words for uploaded material, excerpts and retrieved passages
+MATERIAL_WORDS = ["force", "mass", "acceleration", "vector", "friction", "energy", "momentum", "graph", "unit",
+                  "example"]
+
+# A study plan in the shape Bedrock is asked to answer with
+STUDY_PLAN = {
+    "overview": "Short, structured sessions.",
+    "strategies": ["Chunking", "Timers", "Check-ins", "Movement breaks"],
+    "activities": ["Flash cards", "Worked examples", "Mini quizzes", "Peer explanation"],
+    "subjectAdaptations": [{"subject": "Math", "recommendation": "One step per line"}],
+    "accommodations": ["Extra time on quizzes"],
+}
+
+
+def random_slot(rng):
+    start, end = sorted(rng.sample(TIMES, 2))
+    return {"day": rng.choice(DAYS), "start_time": start, "end_time": end}
+
+
+def random_student(rng, i):
+    return {
+        "student_id": f"{i:08d}",
+        "display_name": f"Student {i}",
+        "primary_disability": rng.choice(DISABILITIES),
+        "preferred_subjects": rng.sample(SUBJECTS, rng.randint(0, 3)),
+        "accommodations_needed": rng.sample(ACCOMMODATIONS, rng.randint(0, 3)),
+        "availability": [random_slot(rng) for _ in range(rng.randint(0, 4))],
+        "learning_preferences": {
+            "format": rng.choice(FORMATS),
+            "style": "Visual",
+            "modality": rng.choice(MODALITIES),
+        },
+        "additional_info": "",
+    }
+
+
+def random_tutor(rng, i):
+    tutor = {
+        "tutor_id": f"t{i:07d}",
+        "display_name": f"Tutor {i}",
+        "subjects": rng.sample(SUBJECTS, rng.randint(0, 3)),
+        "accommodation_skills": rng.sample(ACCOMMODATIONS, rng.randint(0, 4)),
+        "availability": [random_slot(rng) for _ in range(rng.randint(0, 5))],
+    }
+    if rng.random() < 0.7:
+        tutor["experience_with_disabilities"] = rng.sample(DISABILITIES, rng.randint(1, 3))
+    if rng.random() < 0.7:
+        tutor["preferred_format"] = rng.choice(FORMATS)
+    if rng.random() < 0.7:
+        tutor["supported_modalities"] = rng.sample(MODALITIES, rng.randint(1, 2))
+    return tutor
+
+
+def make_population(seed, n_students, n_tutors):
+    """(students, tutors) as plain dicts, the same for the same seed"""
+    rng = random.Random(seed)
+    students = [random_student(rng, i) for i in range(n_students)]
+    tutors = [random_tutor(rng, i) for i in range(n_tutors)]
+    return students, tutors
+
+
+def make_pdf(pages, lines_per_page=40, seed=0) -> bytes:
+    """Synthetic course pack: pages of pseudo-random sentences"""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        lines = [f"Page {page_num + 1}"] + [" ".join(rng.choices(PDF_WORDS, k=10)) for _ in range(lines_per_page)]
+        page.insert_text((40, 40), "\n".join(lines), fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def make_signing_key(kid):
+    """(private key PEM, public JWK) for signing test tokens"""
+    public, private = rsa.newkeys(1024)
+    public_jwk = jwk.construct(public.save_pkcs1().decode(), "RS256").to_dict()
+    return private.save_pkcs1().decode(), {**public_jwk, "kid": kid, "use": "sig"}
@@ -0,0 +1,143 @@
+import os
+from typing import Iterable, List, Optional
+import logging
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+from services.batch_matcher import score_matrix
+
+logger = logging.getLogger(__name__)
+
+# How many students a tutor takes unless the tutor item sets max_students
+TUTOR_CAPACITY = int(os.getenv("TUTOR_CAPACITY", "5"))
+
+UNASSIGNED = -1
+
+
+def tutor_capacity(tutor) -> int:
+    value = tutor.get("max_students")
+    return TUTOR_CAPACITY if value in (None, "") else int(value)
+
+
+def solve_assignment(scores: np.ndarray, capacities, preferred=None) -> np.ndarray:
+    """
+    Assign every student (row) to at most one tutor (column) maximizing the total
+    compatibility score, with no tutor getting more students than its capacity.
+    Only pairs with a positive score are eligible. Among equally good assignments the
+    one keeping most students on their `preferred` tutor column wins. Returns the tutor
+    column per student, or UNASSIGNED.
+
+    Solved as a min-cost bipartite matching: each tutor is expanded into one column
+    per free seat and every student gets a private "unassigned" column, so a full
+    matching always exists.
+    """
+    scores = np.asarray(scores)
+    n_students, n_tutors = scores.shape
+    assignment = np.full(n_students, UNASSIGNED, dtype=np.int64)
+
+    student_idx, tutor_idx = np.nonzero(scores > 0)
+    if not len(student_idx):
+        return assignment
+
+    # A tutor never needs more seats than it has viable students
+    demand = np.bincount(tutor_idx, minlength=n_tutors)
+    seats = np.clip(np.minimum(np.asarray(capacities, dtype=np.int64), demand), 0, None)
+
+    eligible = seats[tutor_idx] > 0
+    student_idx, tutor_idx = student_idx[eligible], tutor_idx[eligible]
+    if not len(student_idx):
+        return assignment
+
+    # Scale scores so the stability bonus (at most one per student) only breaks ties
+    weights = scores[student_idx, tutor_idx].astype(np.float64) * (n_students + 1)
+    if preferred is not None:
+        weights += np.asarray(preferred)[student_idx] == tutor_idx
+    unassigned_cost = weights.max() + 1
+
+    # One edge per (student, tutor seat)
+    repeats = seats[tutor_idx]
+    first_seat = np.concatenate(([0], np.cumsum(seats)))[:-1]
+    edge_start = np.cumsum(repeats) - repeats
+    seat_offset = np.arange(repeats.sum()) - np.repeat(edge_start, repeats)
+
+    n_seats = int(seats.sum())
+    rows = np.concatenate((np.repeat(student_idx, repeats), np.arange(n_students)))
+    cols = np.concatenate((np.repeat(first_seat[tutor_idx], repeats) + seat_offset, n_seats + np.arange(n_students)))
+    costs = np.concatenate((np.repeat(unassigned_cost - weights, repeats), np.full(n_students, unassigned_cost)))
+
+    graph = csr_matrix((costs, (rows, cols)), shape=(n_students, n_seats + n_students))
+    matched_rows, matched_cols = min_weight_full_bipartite_matching(graph)
+
+    seat_tutor = np.repeat(np.arange(n_tutors), seats)
+    seated = matched_cols < n_seats
+    assignment[matched_rows[seated]] = seat_tutor[matched_cols[seated]]
+    return assignment
+
+
+def assign_students(students, tutors, load=None, preferred=None) -> List[Optional[dict]]:
+    """
+    Capacity-aware assignment of a batch of students. `load` counts students already
+    holding a seat with each tutor outside this batch; `preferred` is the current tutor
+    column per student, kept whenever that costs nothing.
+    """
+    if not students:
+        return []
+
+    capacities = np.array([tutor_capacity(t) for t in tutors], dtype=np.int64)
+    if load is not None:
+        capacities -= np.asarray(load, dtype=np.int64)
+
+    assignment = solve_assignment(score_matrix(students, tutors), capacities, preferred)
+    return [tutors[j] if j != UNASSIGNED else None for j in assignment]
+
+
+def current_assignment(students, tutors) -> np.ndarray:
+    """Tutor column per student from the stored tutor_id, UNASSIGNED when unknown"""
+    columns = {t.get("tutor_id"): j for j, t in enumerate(tutors)}
+    return np.array([columns.get(s.get("tutor_id"), UNASSIGNED) for s in students], dtype=np.int64)
+
+
+def reassign_neighborhood(students, tutors, assignment, changed_students: Iterable[int] = (),
+                          changed_tutors: Iterable[int] = ()) -> np.ndarray:
+    """
+    Re-optimize only around the students/tutors (given as indices) that changed.
+
+    The neighborhood is the changed students, every tutor they could work with plus the
+    changed tutors, and all students currently seated with one of those tutors (or able
+    to use a changed tutor while unassigned). Everyone else keeps their tutor and their
+    seat counts against the capacities given to the sub-problem.
+    """
+    assignment = np.array(assignment, dtype=np.int64)
+    changed_students = sorted(set(changed_students))
+    changed_tutors = sorted(set(changed_tutors))
+    if not changed_students and not changed_tutors:
+        return assignment
+
+    tutor_set = set(changed_tutors)
+    if changed_students:
+        rows = score_matrix([students[i] for i in changed_students], tutors)
+        tutor_set.update(np.flatnonzero((rows > 0).any(axis=0)).tolist())
+
+    student_set = set(changed_students)
+    student_set.update(np.flatnonzero(np.isin(assignment, list(tutor_set))).tolist())
+    if changed_tutors:
+        unassigned = np.flatnonzero(assignment == UNASSIGNED)
+        if len(unassigned):
+            columns = score_matrix([students[i] for i in unassigned], [tutors[j] for j in changed_tutors])
+            student_set.update(unassigned[(columns > 0).any(axis=1)].tolist())
+
+    neighborhood = sorted(student_set)
+    fixed = np.ones(len(students), dtype=bool)
+    fixed[neighborhood] = False
+    seated = assignment[fixed]
+    load = np.bincount(seated[seated != UNASSIGNED], minlength=len(tutors))
+    capacities = np.array([tutor_capacity(t) for t in tutors], dtype=np.int64) - load
+
+    sub_assignment = solve_assignment(score_matrix([students[i] for i in neighborhood], tutors), capacities,
+                                      preferred=assignment[neighborhood])
+    assignment[neighborhood] = sub_assignment
+
+    logger.debug("Re-optimized %d students around %d tutors", len(neighborhood), len(tutor_set))
+    return assignment
@@ -0,0 +1,128 @@
+import os
+import threading
+import logging
+
+import boto3
+from botocore.config import Config
+
+logger = logging.getLogger(__name__)
+
+AWS_REGION = os.getenv("AWS_REGION", "us-west-2")
+
+# Connections kept open per client; should cover the threadpool size plus background work
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "50"))
+AWS_MAX_ATTEMPTS = int(os.getenv("AWS_MAX_ATTEMPTS", "3"))
+AWS_RETRY_MODE = os.getenv("AWS_RETRY_MODE", "standard")
+AWS_CONNECT_TIMEOUT = float(os.getenv("AWS_CONNECT_TIMEOUT", "5"))
+AWS_READ_TIMEOUT = float(os.getenv("AWS_READ_TIMEOUT", "60"))
+
+client_config = Config(
+    region_name=AWS_REGION,
+    max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+    tcp_keepalive=True,
+    connect_timeout=AWS_CONNECT_TIMEOUT,
+    read_timeout=AWS_READ_TIMEOUT,
+    retries={"max_attempts": AWS_MAX_ATTEMPTS, "mode": AWS_RETRY_MODE},
+)
+
+_lock = threading.Lock()
+_session = None
+_clients = {}
+_resource_classes = {}
+# Resources and their Table objects, per thread; bumping the generation drops them all
+_local = threading.local()
+_generation = 0
+
+
+def _get_session() -> boto3.session.Session:
+    global _session
+    if _session is None:
+        _session = boto3.session.Session(region_name=AWS_REGION)
+    return _session
+
+
+def get_client(service_name: str):
+    """
+    Process-wide boto3 client for a service. Clients are thread-safe, so one client
+    (and its connection pool) serves every request; credentials are resolved once.
+    """
+    client = _clients.get(service_name)
+    if client is None:
+        with _lock:
+            client = _clients.get(service_name)
+            if client is None:
+                client = _get_session().client(service_name, config=client_config)
+                _clients[service_name] = client
+    return client
+
+
+def _thread_cache() -> dict:
+    if getattr(_local, "generation", None) != _generation:
+        _local.cache = {}
+        _local.generation = _generation
+    return _local.cache
+
+
+def get_resource(service_name: str):
+    """
+    boto3 resource for a service, one per thread: unlike clients, resources are not
+    thread-safe. Each wraps the process-wide client, so threads still share its
+    connection pool and building one is cheap.
+    """
+    cache = _thread_cache()
+    resource = cache.get(service_name)
+    if resource is None:
+        resource_class = _resource_classes.get(service_name)
+        if resource_class is None:
+            # Creating resources from one session is not thread-safe either
+            with _lock:
+                resource_class = _resource_classes.get(service_name)
+                if resource_class is None:
+                    # The first resource's client becomes the shared one, so no second client is built
+                    resource = _get_session().resource(service_name, config=client_config)
+                    resource_class = _resource_classes[service_name] = type(resource)
+                    _clients.setdefault(service_name, resource.meta.client)
+        if resource is None or resource.meta.client is not get_client(service_name):
+            resource = resource_class(client=get_client(service_name))
+        cache[service_name] = resource
+    return resource
+
+
+def get_dynamodb():
+    """The calling thread's DynamoDB resource"""
+    return get_resource("dynamodb")
+
+
+def get_table(name: str):
+    """The calling thread's Table object for a DynamoDB table"""
+    cache = _thread_cache()
+    table = cache.get(("table", name))
+    if table is None:
+        table = cache[("table", name)] = get_dynamodb().Table(name)
+    return table
+
+
+class ThreadLocalTable:
+    """
+    A Table that may be handed across threads, e.g. to run_blocking(table.get_item, ...):
+    its methods look up the calling thread's Table when they are called, not when they
+    are fetched.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __getattr__(self, attribute: str):
+        def call(*args, **kwargs):
+            return getattr(get_table(self.name), attribute)(*args, **kwargs)
+        return call
+
+
+def reset_clients():
+    """Drop cached clients, e.g. after changing credentials or in tests using a mocked AWS"""
+    global _session, _generation
+    with _lock:
+        _session = None
+        _clients.clear()
+        _resource_classes.clear()
+        _generation += 1
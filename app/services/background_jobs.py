@@ -0,0 +1,44 @@
+import logging
+
+import dependencies
+from models.student_profile import StudentProfile
+from services.dynamo_executor import run_blocking
+from services.job_queue import job_queue
+from services.student_service import StudentService
+from services.study_plan_service import StudyPlanService
+
+logger = logging.getLogger(__name__)
+
+MATCH_STUDENT = "match_student"
+STUDY_PLAN = "study_plan"
+
+
+async def match_student_job(student_id: str) -> dict:
+    """Match a saved student with a tutor, then refresh the study plan for the new tutor"""
+    student_service = StudentService()
+    item = await student_service.get_student_async(student_id)
+    if not item:
+        raise LookupError(f"Student {student_id} not found")
+
+    result = await run_blocking(student_service.match_student, StudentProfile(**item))
+    enqueue_study_plan(student_id)
+    return result
+
+
+async def study_plan_job(student_id: str) -> dict:
+    """Generate the student's study plan if the stored one is out of date"""
+    study_plan_service = StudyPlanService()
+    refreshed = await study_plan_service.refresh_plan_async(student_id, dependencies.get_bedrock_agent_runtime())
+    return {"refreshed": refreshed}
+
+
+def enqueue_match_student(student_id: str):
+    return job_queue.enqueue(MATCH_STUDENT, student_id, student_id)
+
+
+def enqueue_study_plan(student_id: str, join_running: bool = False):
+    return job_queue.enqueue(STUDY_PLAN, student_id, student_id, join_running=join_running)
+
+
+job_queue.register(MATCH_STUDENT, match_student_job)
+job_queue.register(STUDY_PLAN, study_plan_job)
@@ -0,0 +1,131 @@
+from typing import Dict, List, Optional
+import logging
+
+import numpy as np
+
+from models.availability import MINUTES_PER_WEEK
+from services.tutor_index import CompiledStudent, CompiledTutor
+
+logger = logging.getLogger(__name__)
+
+# One spare bit so a slot ending at Sunday midnight still produces a boundary
+AVAILABILITY_BYTES = MINUTES_PER_WEEK // 8 + 1
+
+
+def _vocabulary(*groups) -> Dict[str, int]:
+    vocabulary = {}
+    for group in groups:
+        for values in group:
+            for value in values:
+                vocabulary.setdefault(value, len(vocabulary))
+    return vocabulary
+
+
+def _one_hot(rows, vocabulary, dtype=np.float32) -> np.ndarray:
+    """Row-per-item matrix of value counts (duplicates count twice, like the scalar scorer)"""
+    matrix = np.zeros((len(rows), max(len(vocabulary), 1)), dtype=dtype)
+    for i, values in enumerate(rows):
+        for value in values:
+            matrix[i, vocabulary[value]] += 1
+    return matrix
+
+
+def _availability_segments(student_masks, tutor_masks):
+    """
+    Split the week at every slot boundary found in the population and return, per item,
+    the minutes it has in each of those segments. Student and tutor rows are 0/1 and the
+    student rows are weighted by segment length, so the product of the two is the weekly
+    overlap in minutes of every pair, with no bitmap AND per pair.
+    """
+    boundaries = 0
+    for mask in student_masks + tutor_masks:
+        boundaries |= mask ^ (mask << 1)
+
+    def bits(masks):
+        buffer = b"".join(mask.to_bytes(AVAILABILITY_BYTES, "little") for mask in masks)
+        return np.unpackbits(np.frombuffer(buffer, dtype=np.uint8), bitorder="little").reshape(len(masks), -1)
+
+    starts = np.flatnonzero(bits([boundaries])[0])
+    lengths = np.diff(np.append(starts, AVAILABILITY_BYTES * 8)).astype(np.float32)
+    return bits(student_masks)[:, starts] * lengths, bits(tutor_masks)[:, starts].astype(np.float32)
+
+
+def compile_population(students, tutors):
+    compiled_students = [CompiledStudent.compile(s) for s in students]
+    compiled_tutors = [CompiledTutor.compile(t, position) for position, t in enumerate(tutors)]
+    return compiled_students, compiled_tutors
+
+
+def score_matrix(students, tutors) -> np.ndarray:
+    """
+    Compatibility scores of every student against every tutor in one vectorized pass.
+    Uses the same weights as calculate_compatibility_score; entry [i, j] equals
+    calculate_compatibility_score(students[i], tutors[j]).
+    """
+    return score_compiled_matrix(*compile_population(students, tutors))
+
+
+def score_compiled_matrix(students: List[CompiledStudent], tutors: List[CompiledTutor]) -> np.ndarray:
+    return score_and_overlap(students, tutors)[0]
+
+
+def score_and_overlap(students: List[CompiledStudent], tutors: List[CompiledTutor]):
+    """Score matrix plus the weekly availability overlap in minutes of every pair"""
+    scores = np.zeros((len(students), len(tutors)), dtype=np.int32)
+    if not students or not tutors:
+        return scores, np.zeros_like(scores)
+
+    # Subject match (required)
+    subjects = _vocabulary([s.subjects for s in students])
+    tutor_subjects = [[v for v in t.subjects if v in subjects] for t in tutors]
+    subject_match = (_one_hot([s.subjects for s in students], subjects)
+                     @ _one_hot(tutor_subjects, subjects).T) > 0
+
+    # Availability overlap (required)
+    student_segments, tutor_segments = _availability_segments(
+        [s.availability for s in students], [t.availability for t in tutors])
+    overlap = (student_segments @ tutor_segments.T).astype(np.int32)
+    viable = subject_match & (overlap > 0)
+
+    # Accommodation compatibility
+    accommodations = _vocabulary([s.accommodations for s in students])
+    tutor_skills = [[v for v in t.accommodation_skills if v in accommodations] for t in tutors]
+    score = (_one_hot([s.accommodations for s in students], accommodations)
+             @ _one_hot(tutor_skills, accommodations).T).astype(np.int32) * 10
+
+    # Disability experience
+    disabilities = _vocabulary([[s.primary_disability] for s in students])
+    tutor_experience = [[v for v in t.disability_experience if v in disabilities] for t in tutors]
+    experience = _one_hot(tutor_experience, disabilities, dtype=bool)
+    score += experience[:, [disabilities[s.primary_disability] for s in students]].T * 15
+
+    # Learning format compatibility
+    formats = _vocabulary([[s.learning_format] for s in students], [[t.preferred_format] for t in tutors])
+    student_formats = np.array([formats[s.learning_format] for s in students])
+    tutor_formats = np.array([formats[t.preferred_format] for t in tutors])
+    score += (student_formats[:, None] == tutor_formats[None, :]) * 5
+
+    # Modality compatibility
+    modalities = _vocabulary([[s.modality] for s in students])
+    tutor_modalities = [[v for v in t.modalities if v in modalities] for t in tutors]
+    supported = _one_hot(tutor_modalities, modalities, dtype=bool)
+    hybrid = np.array(["Hybrid" in t.modalities for t in tutors])
+    score += (supported[:, [modalities[s.modality] for s in students]].T | hybrid[None, :]) * 5
+
+    np.copyto(scores, score, where=viable)
+    return scores, overlap
+
+
+def best_matches(students, tutors) -> List[Optional[dict]]:
+    """
+    Best tutor for every student, or None when no tutor is viable.
+    Ties go to the tutor with more overlapping availability, then to the earlier
+    tutor, same as match_student_to_tutor(...)[0].
+    """
+    if not students:
+        return []
+    if not len(tutors):
+        return [None] * len(students)
+    scores, overlap = score_and_overlap(*compile_population(students, tutors))
+    best = (scores.astype(np.int64) * (MINUTES_PER_WEEK + 1) + overlap).argmax(axis=1)
+    return [tutors[j] if scores[i, j] > 0 else None for i, j in enumerate(best)]
@@ -0,0 +1,174 @@
+import asyncio
+import functools
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterator, Optional
+import logging
+
+from fastapi import HTTPException
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Bedrock calls running at once across the process
+BEDROCK_MAX_CONCURRENCY = int(os.getenv("BEDROCK_MAX_CONCURRENCY", "8"))
+# Calls allowed to wait for a free slot before new ones are turned away with 429
+BEDROCK_MAX_QUEUE = int(os.getenv("BEDROCK_MAX_QUEUE", "32"))
+# Calls one user may have running or waiting at once
+BEDROCK_MAX_PER_USER = int(os.getenv("BEDROCK_MAX_PER_USER", "2"))
+# Seconds a call may take, including its wait for a slot, before answering 504
+BEDROCK_TIMEOUT = float(os.getenv("BEDROCK_TIMEOUT", "60"))
+
+_DONE = object()
+
+
+class _Lease:
+    """A slot taken by slot(); pending is a timed-out call still running on its thread"""
+
+    def __init__(self):
+        self.acquired = False
+        self.pending: Optional[Future] = None
+
+
+class BedrockGateway:
+    """
+    Runs blocking Bedrock calls off the event loop on a dedicated thread pool, so slow
+    LLM calls never occupy Starlette's threadpool. Concurrency is capped by a semaphore;
+    when too many calls are already waiting, or one user already has too many in flight,
+    new calls are rejected right away with 429 instead of piling up. Calls that do not
+    finish within the timeout get a 504, but keep their slot until the thread returns.
+    """
+
+    def __init__(self, max_concurrency: int = BEDROCK_MAX_CONCURRENCY, max_queue: int = BEDROCK_MAX_QUEUE,
+                 max_per_user: int = BEDROCK_MAX_PER_USER, timeout: float = BEDROCK_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="bedrock")
+        self._semaphore = None
+        self._loop = None
+        self._admitted = 0
+        self._running = 0
+        self._waiting = 0
+        self._per_user = defaultdict(int)
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # asyncio primitives belong to one event loop; rebuild if the app runs on a new one
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def check_admission(self, user_id: Optional[str]):
+        """Raise 429 if a call for this user would be rejected right now"""
+        if user_id is not None and self._per_user.get(user_id, 0) >= self.max_per_user:
+            metrics.increment("bedrock_rejected_user")
+            raise HTTPException(status_code=429, detail="Too many requests in progress, please wait for the current answer")
+        # Counted at admission, before the slot is awaited, so a burst arriving in one tick is bounded too
+        if self._admitted >= self.max_concurrency + self.max_queue:
+            metrics.increment("bedrock_rejected_queue")
+            raise HTTPException(status_code=429, detail="The assistant is busy, please try again shortly")
+
+    @asynccontextmanager
+    async def slot(self, user_id: Optional[str], deadline: Optional[float] = None):
+        """
+        Hold one of the concurrency slots for the duration of the block. A call abandoned
+        in it (see _in_executor) keeps the slot until its thread actually returns.
+        """
+        self.check_admission(user_id)
+        semaphore = self._get_semaphore()
+        deadline = deadline or time.monotonic() + self.timeout
+
+        self._admitted += 1
+        self._per_user[user_id] += 1
+        lease = _Lease()
+        try:
+            self._waiting += 1
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(semaphore.acquire(), max(deadline - time.monotonic(), 0))
+            except asyncio.TimeoutError:
+                metrics.increment("bedrock_timeouts")
+                raise HTTPException(status_code=504, detail="Timed out waiting for the assistant")
+            finally:
+                self._waiting -= 1
+            metrics.observe("bedrock_queue_wait_seconds", time.monotonic() - started)
+
+            lease.acquired = True
+            self._running += 1
+            yield lease
+        finally:
+            if lease.pending is None:
+                self._release(semaphore, user_id, lease.acquired)
+            else:
+                self._release_when_done(lease.pending, semaphore, user_id)
+
+    def _release(self, semaphore: asyncio.Semaphore, user_id: Optional[str], acquired: bool = True):
+        if acquired:
+            self._running -= 1
+            semaphore.release()
+        self._admitted -= 1
+        self._per_user[user_id] -= 1
+        if not self._per_user[user_id]:
+            del self._per_user[user_id]
+
+    def _release_when_done(self, future: Future, semaphore: asyncio.Semaphore, user_id: Optional[str]):
+        loop = asyncio.get_running_loop()
+
+        def done(_):
+            try:
+                loop.call_soon_threadsafe(self._release, semaphore, user_id)
+            except RuntimeError:
+                # The loop has closed, and its semaphore has no waiters left to wake
+                self._release(semaphore, user_id)
+
+        future.add_done_callback(done)
+
+    async def _in_executor(self, fn, deadline: float, lease: "_Lease"):
+        future = self._executor.submit(fn)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            metrics.increment("bedrock_timeouts")
+            raise HTTPException(status_code=504, detail="The assistant took too long to respond")
+        finally:
+            if not future.done():
+                # The thread cannot be interrupted, so the slot stays taken until the call returns;
+                # otherwise the pool would run more calls than max_concurrency
+                lease.pending = future
+
+    async def call(self, user_id: Optional[str], fn, *args, **kwargs):
+        """Run a blocking Bedrock call, e.g. call(user_id, bedrock.retrieve_and_generate, **params)"""
+        deadline = time.monotonic() + self.timeout
+        async with self.slot(user_id, deadline) as lease:
+            return await self._in_executor(functools.partial(fn, *args, **kwargs), deadline, lease)
+
+    async def stream(self, user_id: Optional[str], events: Iterator) -> AsyncIterator:
+        """
+        Iterate a blocking generator (such as bedrock_service.stream_answer) while holding
+        a slot. The timeout applies to the wait for each next item, not the whole stream.
+        """
+        async with self.slot(user_id) as lease:
+            while True:
+                item = await self._in_executor(lambda: next(events, _DONE), time.monotonic() + self.timeout, lease)
+                if item is _DONE:
+                    return
+                yield item
+
+    def stats(self) -> dict:
+        return {
+            "running": self._running,
+            "waiting": self._waiting,
+            "users": len(self._per_user),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+        }
+
+
+bedrock_gateway = BedrockGateway()
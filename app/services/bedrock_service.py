@@ -0,0 +1,107 @@
+import json
+import os
+import time
+from typing import AsyncIterator, Iterator, Optional
+import logging
+
+from fastapi import HTTPException
+
+from services.metrics import metrics
+from services.prompt_compiler import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_BASE_ID = os.getenv("KNOWLEDGE_BASE_ID")
+BEDROCK_MODEL_ID = os.getenv("BEDROCK_MODEL_ID")
+
+# Keep proxies from buffering server-sent events
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def build_retrieve_and_generate_request(message: str, prompt_template: str, session_id: Optional[str] = None) -> dict:
+    """Parameters for a knowledge base retrieve_and_generate(_stream) call"""
+    request_params = {
+        "input": {
+            "text": message
+        },
+        "retrieveAndGenerateConfiguration": {
+            "type": "KNOWLEDGE_BASE",
+            "knowledgeBaseConfiguration": {
+                "knowledgeBaseId": KNOWLEDGE_BASE_ID,
+                "modelArn": f'arn:aws:bedrock:us-west-2::foundation-model/{BEDROCK_MODEL_ID}',
+                'generationConfiguration': {
+                    'promptTemplate': {
+                        'textPromptTemplate': prompt_template
+                    }
+                }
+            }
+        }
+    }
+
+    # Conditionally add sessionId if it's not None
+    if session_id:
+        request_params["sessionId"] = session_id
+
+    return request_params
+
+
+def record_token_usage(request_params: dict, answer: str, route: str):
+    """
+    Count estimated input and output tokens as bedrock_input_tokens{route} and
+    bedrock_output_tokens{route}. retrieve_and_generate reports no usage, so these are
+    estimates; retrieved passages are not included in the input.
+    """
+    generation = request_params["retrieveAndGenerateConfiguration"]["knowledgeBaseConfiguration"][
+        "generationConfiguration"]
+    prompt = generation["promptTemplate"]["textPromptTemplate"]
+    metrics.increment("bedrock_input_tokens", estimate_tokens(prompt) + estimate_tokens(request_params["input"]["text"]),
+                      route=route)
+    metrics.increment("bedrock_output_tokens", estimate_tokens(answer), route=route)
+
+
+def stream_answer(bedrock, request_params: dict, metric_prefix: str) -> Iterator[dict]:
+    """
+    Call retrieve_and_generate_stream and yield {"session_id": ...} followed by one
+    {"text": ...} per generated chunk. Time to first token and total time are
+    recorded as <metric_prefix>_ttft_seconds and <metric_prefix>_stream_seconds, and
+    estimated token counts under route=<metric_prefix>.
+    """
+    started = time.perf_counter()
+    response = bedrock.retrieve_and_generate_stream(**request_params)
+    yield {"session_id": response.get("sessionId")}
+
+    first_token = None
+    chunks = []
+    for event in response["stream"]:
+        text = event.get("output", {}).get("text")
+        if not text:
+            continue
+        if first_token is None:
+            first_token = time.perf_counter() - started
+            metrics.observe(f"{metric_prefix}_ttft_seconds", first_token)
+            logger.info("First token after %.3fs", first_token)
+        chunks.append(text)
+        yield {"text": text}
+
+    metrics.observe(f"{metric_prefix}_stream_seconds", time.perf_counter() - started)
+    record_token_usage(request_params, "".join(chunks), metric_prefix)
+
+
+async def sse_events(events: AsyncIterator[dict]) -> AsyncIterator[str]:
+    """
+    Format stream_answer events as server-sent events: one "session" event, "token"
+    events with text chunks, then "done" (or "error" if Bedrock fails mid-stream).
+    """
+    try:
+        async for event in events:
+            if "session_id" in event:
+                yield f"event: session\ndata: {json.dumps({'session_id': event['session_id']})}\n\n"
+            else:
+                yield f"event: token\ndata: {json.dumps({'text': event['text']})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    except HTTPException as e:
+        # Rejected or timed out by the gateway after the response already started
+        yield f"event: error\ndata: {json.dumps({'detail': e.detail, 'status': e.status_code})}\n\n"
+    except Exception as e:
+        logger.error("Error while streaming response: %s", e, exc_info=e)
+        yield f"event: error\ndata: {json.dumps({'detail': 'Failed to generate response'})}\n\n"
@@ -1,6 +1,6 @@
 def convert_student_to_dynamo_format(student_dict):
     """Convert Pydantic student model to DynamoDB format"""
-    return {
+    item = {
         "student_id": {"S": student_dict["student_id"]},
         "display_name": {"S": student_dict["display_name"]},
         "primary_disability": {"S": student_dict["primary_disability"]},
@@ -30,4 +30,32 @@ def convert_student_to_dynamo_format(student_dict):
             ]
         },
         "additional_info": {"S": student_dict.get("additional_info", "")}
-    }
\ No newline at end of file
+    }
+
+    if student_dict.get("availability_intervals") is not None:
+        item["availability_intervals"] = {
+            "L": [
+                {"L": [{"N": str(int(start))}, {"N": str(int(end))}]}
+                for start, end in student_dict["availability_intervals"]
+            ]
+        }
+
+    return item
+
+def get_list_values(item, key):
+    """Read a list of strings from an item in either DynamoDB or regular format"""
+    if isinstance(item.get(key), dict) and "L" in item[key]:
+        return [s["S"] for s in item[key]["L"]]
+    return item.get(key, [])
+
+
+def get_string_value(item, key):
+    """Read a string from an item in either DynamoDB or regular format"""
+    if isinstance(item.get(key), dict) and "S" in item[key]:
+        return item[key]["S"]
+    return item.get(key, "")
+
+
+def get_learning_preference(student, key):
+    """Read a learning preference from a student in DynamoDB format"""
+    return student.get("learning_preferences", {}).get("M", {}).get(key, {}).get("S", "")
@@ -0,0 +1,24 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Threads doing blocking DynamoDB calls for async handlers; keep it at or below
+# AWS_MAX_POOL_CONNECTIONS so every worker has a pooled connection. Each worker
+# uses its own boto3 resource (see aws_clients.get_resource) over the shared client.
+DYNAMO_MAX_WORKERS = int(os.getenv("DYNAMO_MAX_WORKERS", "32"))
+
+_executor = ThreadPoolExecutor(max_workers=DYNAMO_MAX_WORKERS, thread_name_prefix="dynamo")
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """
+    Run a blocking boto3 call on the DynamoDB thread pool so the event loop keeps
+    serving other requests. The pool is separate from Starlette's, so slow DynamoDB
+    calls cannot starve sync route handlers and vice versa.
+
+    fn must not use a boto3 resource or Table built on another thread; look tables up
+    with aws_clients.get_table inside it, as the services do.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
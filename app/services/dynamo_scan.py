@@ -0,0 +1,160 @@
+import base64
+import json
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Sequence, Tuple
+import logging
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+# Parallel scan segments used for full-table reads
+SCAN_SEGMENTS = int(os.getenv("DYNAMO_SCAN_SEGMENTS", "4"))
+
+# Items buffered between the segment workers and the consumer
+SCAN_BUFFER_SIZE = 1000
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+_DONE = object()
+
+
+def _scan_kwargs(table, projection: Optional[Sequence[str]], page_size: Optional[int]) -> dict:
+    kwargs = {"TableName": table.name}
+    if projection:
+        names = {f"#p{i}": name for i, name in enumerate(projection)}
+        kwargs["ProjectionExpression"] = ", ".join(names)
+        kwargs["ExpressionAttributeNames"] = names
+    if page_size:
+        kwargs["Limit"] = page_size
+    return kwargs
+
+
+def scan_pages(table, projection: Optional[Sequence[str]] = None, page_size: Optional[int] = None,
+               segment: Optional[int] = None, total_segments: Optional[int] = None,
+               start_key: Optional[dict] = None) -> Iterator[Tuple[List[dict], Optional[dict]]]:
+    """
+    Yield (items, last_evaluated_key) for every page of a scan, following LastEvaluatedKey
+    until the table (or segment) is exhausted. Goes through the resource's client, which
+    unlike the resource is safe to share between threads and still returns plain Python items.
+    """
+    client = table.meta.client
+    kwargs = _scan_kwargs(table, projection, page_size)
+    if total_segments and total_segments > 1:
+        kwargs["Segment"] = segment
+        kwargs["TotalSegments"] = total_segments
+    if start_key:
+        kwargs["ExclusiveStartKey"] = start_key
+
+    while True:
+        response = client.scan(**kwargs)
+        last_key = response.get("LastEvaluatedKey")
+        yield response.get("Items", []), last_key
+        if not last_key:
+            return
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def scan_items(table, segments: int = None, projection: Optional[Sequence[str]] = None,
+               page_size: Optional[int] = None) -> Iterator[dict]:
+    """
+    Stream every item of a table. With more than one segment the scan runs as a parallel
+    Segment/TotalSegments scan on a thread pool; items arrive in no particular order.
+    """
+    segments = segments or SCAN_SEGMENTS
+    if segments <= 1:
+        for items, _ in scan_pages(table, projection, page_size):
+            yield from items
+        return
+
+    buffer = queue.Queue(maxsize=SCAN_BUFFER_SIZE)
+    cancelled = threading.Event()
+
+    def scan_segment(segment):
+        try:
+            for items, _ in scan_pages(table, projection, page_size, segment, segments):
+                for item in items:
+                    while not cancelled.is_set():
+                        try:
+                            buffer.put(item, timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+                if cancelled.is_set():
+                    return
+        except Exception as e:
+            buffer.put(e)
+        finally:
+            buffer.put(_DONE)
+
+    with ThreadPoolExecutor(max_workers=segments, thread_name_prefix="dynamo-scan") as executor:
+        for segment in range(segments):
+            executor.submit(scan_segment, segment)
+
+        remaining = segments
+        try:
+            while remaining:
+                item = buffer.get()
+                if item is _DONE:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            cancelled.set()
+            # Unblock workers waiting on a full buffer so the pool can shut down
+            while remaining:
+                if buffer.get() is _DONE:
+                    remaining -= 1
+
+
+def scan_all(table, segments: int = None, projection: Optional[Sequence[str]] = None) -> List[dict]:
+    """Every item of a table as a list (no 1 MB truncation)"""
+    return list(scan_items(table, segments, projection))
+
+
+def encode_cursor(key: Optional[dict]) -> Optional[str]:
+    """Opaque, URL-safe cursor for a LastEvaluatedKey"""
+    if not key:
+        return None
+    serialized = {name: _serializer.serialize(value) for name, value in key.items()}
+    return base64.urlsafe_b64encode(json.dumps(serialized).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[dict]:
+    """The LastEvaluatedKey behind a cursor; ValueError for anything encode_cursor could not have made"""
+    if not cursor:
+        return None
+    serialized = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if not isinstance(serialized, dict):
+        raise ValueError("Invalid cursor")
+    try:
+        return {name: _deserializer.deserialize(value) for name, value in serialized.items()}
+    except (TypeError, AttributeError, KeyError) as e:
+        # Well-formed JSON whose values are not DynamoDB attribute values
+        raise ValueError("Invalid cursor") from e
+
+
+def scan_page(table, limit: int, cursor: Optional[str] = None,
+              projection: Optional[Sequence[str]] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of about `limit` items and the cursor for the next page (None at the end).
+    """
+    items = []
+    start_key = decode_cursor(cursor)
+    try:
+        for page, last_key in scan_pages(table, projection, limit, start_key=start_key):
+            items.extend(page)
+            if len(items) >= limit or not last_key:
+                return items, encode_cursor(last_key)
+    except ClientError as e:
+        # A decodable cursor can still name the wrong key attributes or types
+        if start_key and e.response["Error"]["Code"] == "ValidationException":
+            raise ValueError("Invalid cursor") from e
+        raise
+    return items, None
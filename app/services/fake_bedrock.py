@@ -0,0 +1,58 @@
+import time
+import uuid
+from typing import Callable, Optional, Union
+
+# Canned answer returned by the stand-in, split into word chunks when streaming
+FAKE_ANSWER = ("Break the lesson into short segments, check understanding after each one, "
+               "and use the student's accommodations such as extra time and visual aids.")
+
+
+# Seconds, or a function drawing seconds from a distribution on every call
+Delay = Union[float, Callable[[], float]]
+
+
+def draw(delay: Delay) -> float:
+    return delay() if callable(delay) else delay
+
+
+class FakeBedrockAgentRuntime:
+    """
+    Offline stand-in for the bedrock-agent-runtime client, covering the calls the
+    chat endpoints make. Enable with BEDROCK_FAKE=1 or pass it as a dependency override.
+    Delays may be functions, so load tests can simulate a latency distribution.
+    """
+
+    def __init__(self, answer: str = FAKE_ANSWER, first_token_delay: Delay = 0.0, chunk_delay: Delay = 0.0):
+        self.answer = answer
+        self.first_token_delay = first_token_delay
+        self.chunk_delay = chunk_delay
+        self.requests = []
+
+    def retrieve_and_generate(self, **request_params):
+        self.requests.append(request_params)
+        time.sleep(draw(self.first_token_delay) + sum(draw(self.chunk_delay) for _ in self._chunks()))
+        return {
+            "output": {"text": self.answer},
+            "sessionId": self._session_id(request_params),
+        }
+
+    def retrieve_and_generate_stream(self, **request_params):
+        self.requests.append(request_params)
+        return {
+            "stream": self._stream(),
+            "sessionId": self._session_id(request_params),
+        }
+
+    def _stream(self):
+        time.sleep(draw(self.first_token_delay))
+        for chunk in self._chunks():
+            time.sleep(draw(self.chunk_delay))
+            yield {"output": {"text": chunk}}
+
+    def _chunks(self):
+        words = self.answer.split(" ")
+        return [word + (" " if i < len(words) - 1 else "") for i, word in enumerate(words)]
+
+    @staticmethod
+    def _session_id(request_params) -> Optional[str]:
+        return request_params.get("sessionId") or str(uuid.uuid4())
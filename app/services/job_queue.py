@@ -0,0 +1,240 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import logging
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Jobs processed at once
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Attempts per job before it is marked failed
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Delay before the first retry; doubles on every further attempt
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "2"))
+# Seconds finished jobs stay queryable
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", "3600"))
+
+QUEUED = "queued"
+RUNNING = "running"
+RETRYING = "retrying"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+@dataclass
+class Job:
+    kind: str
+    key: str
+    args: tuple = ()
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = QUEUED
+    attempts: int = 0
+    result: Any = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    @property
+    def pending(self) -> bool:
+        return self.status in (QUEUED, RETRYING)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def to_dict(self) -> dict:
+        job = asdict(self)
+        del job["args"]
+        return job
+
+
+class JobStore(ABC):
+    """
+    Where job state lives. The in-memory store serves a single process; a shared store
+    (e.g. Redis) can be plugged in by implementing these three methods.
+    """
+
+    @abstractmethod
+    def save(self, job: Job):
+        """Insert or replace the job, keeping find_latest up to date"""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Job]:
+        """The job with this id, or None once it has expired"""
+
+    @abstractmethod
+    def find_latest(self, kind: str, key: str) -> Optional[Job]:
+        """The most recently created unfinished job of this kind and key, if any"""
+
+
+class InMemoryJobStore(JobStore):
+    def __init__(self, retention: float = JOB_RETENTION):
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._latest: Dict[Tuple[str, str], str] = {}
+
+    def save(self, job: Job):
+        job.updated_at = time.time()
+        slot = (job.kind, job.key)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            latest = self._jobs.get(self._latest.get(slot))
+            if not job.finished:
+                if latest is None or latest.finished or latest.created_at <= job.created_at:
+                    self._latest[slot] = job.job_id
+            elif latest is job:
+                del self._latest[slot]
+            self._expire()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def find_latest(self, kind: str, key: str) -> Optional[Job]:
+        job_id = self._latest.get((kind, key))
+        return self._jobs.get(job_id) if job_id else None
+
+    def _expire(self):
+        cutoff = time.time() - self.retention
+        for job_id in [j.job_id for j in self._jobs.values() if j.finished and j.updated_at < cutoff]:
+            del self._jobs[job_id]
+
+
+class JobQueue:
+    """
+    In-process background jobs on the event loop: a pool of worker tasks runs registered
+    async handlers, retrying failures with exponential backoff.
+
+    Jobs are deduplicated by (kind, key), e.g. one pending study plan per student: enqueuing
+    while a job for the same key is still waiting returns that job. A running job is only
+    reused with join_running=True, since it may have read its inputs before they changed.
+    Jobs for the same key never run concurrently; one enqueued while another runs starts after it.
+    """
+
+    def __init__(self, store: JobStore = None, workers: int = JOB_WORKERS,
+                 max_attempts: int = JOB_MAX_ATTEMPTS, backoff: float = JOB_RETRY_BACKOFF):
+        self.store = store or InMemoryJobStore()
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._handlers: Dict[str, Callable[..., Awaitable[Any]]] = {}
+        self._loop = None
+        self._queue = None
+        self._tasks = []
+        self._running_keys = set()
+        self._deferred: Dict[Tuple[str, str], str] = {}
+        self._retries_scheduled = 0
+
+    def register(self, kind: str, handler: Callable[..., Awaitable[Any]]):
+        self._handlers[kind] = handler
+
+    def _ensure_started(self):
+        # Workers belong to the running event loop; (re)start them on first use
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._running_keys.clear()
+        self._deferred.clear()
+        self._retries_scheduled = 0
+        self._tasks = [loop.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+
+    def enqueue(self, kind: str, key: str, *args, join_running: bool = False) -> Job:
+        """Queue a job and return it at once; must be called from the event loop"""
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        self._ensure_started()
+
+        job = self.store.find_latest(kind, key)
+        if job is not None and (job.pending or (join_running and job.status == RUNNING)):
+            metrics.increment("jobs_deduplicated")
+            return job
+
+        job = Job(kind, key, args)
+        self.store.save(job)
+        metrics.increment("jobs_enqueued")
+        self._queue.put_nowait(job.job_id)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.store.get(job_id)
+
+    async def _worker(self, number: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = self.store.get(job_id)
+                if job is None or not job.pending:
+                    continue
+                if (job.kind, job.key) in self._running_keys:
+                    # Picked up again when the running job for this key finishes
+                    self._deferred[(job.kind, job.key)] = job_id
+                    continue
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job):
+        slot = (job.kind, job.key)
+        self._running_keys.add(slot)
+        job.status = RUNNING
+        job.attempts += 1
+        self.store.save(job)
+
+        started = time.perf_counter()
+        try:
+            job.result = await self._handlers[job.kind](*job.args)
+            job.status = SUCCEEDED
+            job.error = None
+            metrics.increment("jobs_succeeded")
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            if job.attempts < self.max_attempts:
+                job.status = RETRYING
+                delay = self.backoff * 2 ** (job.attempts - 1)
+                logger.warning("Job %s:%s failed (attempt %d), retrying in %.1fs: %s", job.kind, job.key, job.attempts, delay, e)
+                self._retries_scheduled += 1
+                self._loop.call_later(delay, self._retry, job.job_id)
+                metrics.increment("jobs_retried")
+            else:
+                job.status = FAILED
+                logger.error("Job %s:%s failed after %d attempts: %s", job.kind, job.key, job.attempts, e, exc_info=e)
+                metrics.increment("jobs_failed")
+        finally:
+            metrics.observe(f"job_{job.kind}_seconds", time.perf_counter() - started)
+            self._running_keys.discard(slot)
+            self.store.save(job)
+            deferred = self._deferred.pop(slot, None)
+            if deferred:
+                self._queue.put_nowait(deferred)
+
+    def _retry(self, job_id: str):
+        self._retries_scheduled -= 1
+        self._queue.put_nowait(job_id)
+
+    async def join(self):
+        """Wait until every queued job, including retries not yet due, has finished; for tests and tooling"""
+        self._ensure_started()
+        while True:
+            await self._queue.join()
+            if not self._deferred and not self._retries_scheduled:
+                return
+            await asyncio.sleep(0.01)
+
+
+job_queue = JobQueue()
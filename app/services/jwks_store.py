@@ -0,0 +1,125 @@
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+import logging
+
+import httpx
+from jose import jwk
+from jose.exceptions import JWTError
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+COGNITO_REGION = os.getenv("COGNITO_REGION", "us-west-2")
+COGNITO_USER_POOL_ID = os.getenv("COGNITO_USER_POOL_ID")
+JWKS_URL = f"https://cognito-idp.{COGNITO_REGION}.amazonaws.com/{COGNITO_USER_POOL_ID}/.well-known/jwks.json"
+
+# Seconds the fetched keys are used before they must be fetched again
+JWKS_TTL = float(os.getenv("JWKS_TTL", "3600"))
+# Seconds before expiry at which a request triggers a background refresh
+JWKS_REFRESH_AHEAD = float(os.getenv("JWKS_REFRESH_AHEAD", "300"))
+# Minimum seconds between fetches once keys are loaded (failed refreshes, unknown kids)
+JWKS_MIN_REFRESH_INTERVAL = float(os.getenv("JWKS_MIN_REFRESH_INTERVAL", "30"))
+# Seconds to wait for the JWKS endpoint
+JWKS_FETCH_TIMEOUT = float(os.getenv("JWKS_FETCH_TIMEOUT", "5"))
+
+
+async def fetch_jwks(url: str = JWKS_URL) -> List[dict]:
+    async with httpx.AsyncClient(timeout=JWKS_FETCH_TIMEOUT) as client:
+        response = await client.get(url)
+        response.raise_for_status()
+        return response.json()["keys"]
+
+
+class JwksStore:
+    """
+    Process-wide signing keys of the user pool, indexed by kid and parsed once per fetch.
+
+    Keys are fetched on first use and refreshed in the background shortly before they
+    expire, so requests normally never wait on the network. Concurrent requests share a
+    single fetch, and a token signed with a kid we have not seen (a key rotation) triggers
+    a refresh. Fetches are at most once every JWKS_MIN_REFRESH_INTERVAL seconds once keys
+    are loaded, and if a refresh fails the previous keys stay in use.
+    """
+
+    def __init__(self, fetch: Callable[[], Awaitable[List[dict]]] = fetch_jwks, ttl: float = JWKS_TTL,
+                 refresh_ahead: float = JWKS_REFRESH_AHEAD,
+                 min_refresh_interval: float = JWKS_MIN_REFRESH_INTERVAL):
+        self._fetch = fetch
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.min_refresh_interval = min_refresh_interval
+        self._keys: Dict[str, jwk.Key] = {}
+        self._fetched_at: Optional[float] = None
+        self._attempted_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def get_key(self, kid: str) -> jwk.Key:
+        """The parsed public key for kid; raises JWTError if the user pool has no such key"""
+        if not self._keys:
+            await self.refresh()
+        elif not self._recently_attempted():
+            age = time.monotonic() - self._fetched_at
+            if age >= self.ttl:
+                await self.refresh()
+            elif age >= self.ttl - self.refresh_ahead:
+                # Refresh ahead: this request goes on with the current keys while the fetch runs
+                self._start_refresh()
+
+        key = self._keys.get(kid)
+        if key is None and not self._recently_attempted():
+            metrics.increment("jwks_unknown_kid_refreshes")
+            await self.refresh()
+            key = self._keys.get(kid)
+        if key is None:
+            raise JWTError(f"Unknown signing key {kid!r}")
+        return key
+
+    async def refresh(self):
+        """Fetch the keys, joining a fetch that is already in flight"""
+        task = self._start_refresh()
+        # Shielded, so a request that is cancelled does not cancel the fetch other requests wait on
+        await asyncio.shield(task)
+
+    def _start_refresh(self) -> asyncio.Task:
+        task = self._refresh_task
+        loop = asyncio.get_running_loop()
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = self._refresh_task = loop.create_task(self._load())
+        return task
+
+    async def _load(self):
+        self._attempted_at = time.monotonic()
+        metrics.increment("jwks_fetches")
+        try:
+            keys = await self._fetch()
+            parsed = {key["kid"]: jwk.construct(key, key.get("alg", "RS256")) for key in keys}
+        except Exception as e:
+            metrics.increment("jwks_fetch_failures")
+            if not self._keys:
+                raise
+            logger.warning("JWKS refresh failed, keeping %d cached keys", len(self._keys), exc_info=e)
+            return
+
+        self._keys = parsed
+        self._fetched_at = time.monotonic()
+        logger.info("Loaded %d JWKS keys", len(parsed))
+
+    def _recently_attempted(self) -> bool:
+        # Bounds fetches after failures, and for tokens with made-up kids that would otherwise fetch on every request
+        return self._attempted_at is not None and time.monotonic() - self._attempted_at < self.min_refresh_interval
+
+    def clear(self):
+        self._keys = {}
+        self._fetched_at = None
+        self._attempted_at = None
+        self._refresh_task = None
+
+    def stats(self) -> dict:
+        return {"keys": len(self._keys),
+                "age_seconds": None if self._fetched_at is None else time.monotonic() - self._fetched_at}
+
+
+jwks_store = JwksStore()
@@ -1,32 +1,23 @@
 import os
 from typing import Optional
-from asyncache import cached
-from cachetools import TTLCache
-import httpx
 from jose import jwt
 import logging
 
+from services.jwks_store import jwks_store
+
 logger = logging.getLogger(__name__)
 
-COGNITO_USER_POOL_ID = os.getenv("COGNITO_USER_POOL_ID")
 COGNITO_CLIENT_ID = os.getenv("COGNITO_CLIENT_ID")
 
-cache = TTLCache(maxsize=100, ttl=300) # 5 minutes TTL
-
 class JwtService:
-    @cached(cache)
-    async def _get_jwk_keys(self):
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"https://cognito-idp.us-west-2.amazonaws.com/{COGNITO_USER_POOL_ID}/.well-known/jwks.json")
-            return response.json()["keys"]
+    async def _get_signing_key(self, token: str):
+        # Process-wide key store: a dict lookup unless the keys are missing, stale or rotated
+        unverified_header = jwt.get_unverified_header(token)
+        return await jwks_store.get_key(unverified_header["kid"])
 
     async def decode_id_token(self, tokens: dict) -> Optional[dict]:
         try:
-            keys = await self._get_jwk_keys()
-            logger.debug(keys)
-
-            unverified_header = jwt.get_unverified_header(tokens["id_token"])
-            key = next(k for k in keys if k["kid"] == unverified_header["kid"])
+            key = await self._get_signing_key(tokens["id_token"])
             return jwt.decode(tokens["id_token"], key, algorithms=["RS256"],
                             audience=COGNITO_CLIENT_ID,
                             access_token=tokens["access_token"])
@@ -34,12 +25,8 @@ class JwtService:
             logger.error("Failed to verify JWT token", exc_info=e)
             return None
 
-    async def decode_access_token(self, token: str) -> bool:
-        keys = await self._get_jwk_keys()
-
-        unverified_header = jwt.get_unverified_header(token)
-        key = next(k for k in keys if k["kid"] == unverified_header["kid"])
+    async def decode_access_token(self, token: str) -> dict:
+        key = await self._get_signing_key(token)
         jwt_decoded = jwt.decode(token, key, algorithms=["RS256"],
                             audience=COGNITO_CLIENT_ID)
-        logger.debug(jwt_decoded)
-        return jwt_decoded
\ No newline at end of file
+        return jwt_decoded
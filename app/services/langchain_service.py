@@ -1,13 +1,14 @@
-import boto3
 from langchain.prompts import PromptTemplate
 from langchain_aws import ChatBedrock
 from langchain_core.output_parsers import StrOutputParser
 from fastapi import HTTPException
 import botocore.exceptions
+from services.aws_clients import get_client
+from services.bedrock_gateway import bedrock_gateway
 
 class LangChainService:
     def __init__(self):
-        self._bedrock_client = boto3.client("bedrock-runtime", region_name="us-west-2")
+        self._bedrock_client = get_client("bedrock-runtime")
 
         model_id = "anthropic.claude-3-5-sonnet-20241022-v2:0"
         model_kwargs = {
@@ -35,3 +36,7 @@ class LangChainService:
         except botocore.exceptions.ClientError as error:
             error_code = error.response['Error']['Code']
             raise HTTPException(status_code=500, detail=f"Error invoking model: {error_code}") from error
+
+    async def ainvoke_model(self, prompt, user_id=None):
+        """invoke_model for async handlers, bounded by the shared Bedrock gateway"""
+        return await bedrock_gateway.call(user_id, self.invoke_model, prompt)
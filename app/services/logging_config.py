@@ -0,0 +1,167 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from services.metrics import metrics
+
+# Level of every logger without its own entry in LOG_LEVELS
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Per-module levels, e.g. "services.jwks_store=DEBUG,botocore=WARNING"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# Keep 1 in N records below WARNING from high-volume loggers, e.g. "services.student_tutor_matcher=100"
+LOG_SAMPLE = os.getenv("LOG_SAMPLE", "services.student_tutor_matcher=100")
+# Records waiting for the writer thread; more are dropped rather than blocking the request
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Chatty third-party loggers, unless LOG_LEVELS says otherwise
+DEFAULT_LEVELS = {"botocore": "WARNING", "boto3": "WARNING", "urllib3": "WARNING", "httpcore": "WARNING",
+                  "httpx": "WARNING", "multipart": "WARNING"}
+
+# JWTs, bearer headers and secret-looking key/value pairs
+REDACTIONS = [
+    (re.compile(r"eyJ[\w-]*\.[\w-]+\.[\w-]*"), "[REDACTED_JWT]"),
+    (re.compile(r"(?i)(bearer\s+)[\w.~+/=-]+"), r"\1[REDACTED]"),
+    (re.compile(r"(?i)(['\"]?\b(?:access_token|id_token|refresh_token|client_secret|password|code)['\"]?\s*[:=]\s*)"
+                r"(['\"]?)[^'\",\s}]+\2"), r"\1\2[REDACTED]\2"),
+]
+
+# LogRecord attributes that are not extra fields
+RECORD_FIELDS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def redact(text: str) -> str:
+    for pattern, replacement in REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """"a=DEBUG,b=100" -> {"a": "DEBUG", "b": "100"}"""
+    pairs = (item.split("=", 1) for item in spec.split(",") if "=" in item)
+    return {name.strip(): value.strip() for name, value in pairs}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, exception and any extra= fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            record.exc_text = record.exc_text or self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Pass 1 in `every` records below WARNING; warnings and errors always pass"""
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._seen = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        with self._lock:
+            self._seen += 1
+            keep = self._seen % self.every == 1 or self.every == 1
+        if not keep:
+            metrics.increment("log_records_sampled_out")
+        return keep
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the writer thread. The message is merged and redacted here, since
+    its arguments may change once the caller moves on; JSON encoding and the write
+    happen on the writer thread. A full queue drops the record instead of waiting.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = redact(record.getMessage())
+        record.args = None
+        if record.exc_info:
+            record.exc_text = redact(logging.Formatter().formatException(record.exc_info))
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.increment("log_records_dropped")
+
+
+class QueueWriter(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room, so stopping never loses the sentinel to a full queue
+        self.queue.put(self._sentinel)
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging(stream=None, level: str = LOG_LEVEL, levels: str = LOG_LEVELS, sample: str = LOG_SAMPLE,
+                      queue_size: int = LOG_QUEUE_SIZE) -> logging.handlers.QueueListener:
+    """
+    Route all logging through a bounded queue to a writer thread that prints JSON lines
+    to stream (stderr by default). Safe to call again; the previous writer is stopped.
+    """
+    global _listener
+    stop_logging()
+
+    writer = logging.StreamHandler(stream or sys.stderr)
+    writer.setFormatter(JsonFormatter())
+    records = queue.Queue(maxsize=queue_size)
+    _listener = QueueWriter(records, writer, respect_handler_level=False)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(NonBlockingQueueHandler(records))
+    root.setLevel(level.upper())
+
+    for name, module_level in {**DEFAULT_LEVELS, **parse_levels(levels)}.items():
+        logging.getLogger(name).setLevel(module_level.upper())
+    for name, every in parse_levels(sample).items():
+        logger = logging.getLogger(name)
+        for existing in [f for f in logger.filters if isinstance(f, SamplingFilter)]:
+            logger.removeFilter(existing)
+        logger.addFilter(SamplingFilter(int(every)))
+
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records, stop the writer thread and detach its queue from the root logger"""
+    global _listener
+    if _listener is not None:
+        root = logging.getLogger()
+        for handler in [h for h in root.handlers if isinstance(h, NonBlockingQueueHandler)]:
+            root.removeHandler(handler)
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
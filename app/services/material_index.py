@@ -0,0 +1,185 @@
+import heapq
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from typing import Callable, Dict, List, Optional
+import logging
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Passages returned per question
+MATERIAL_TOP_K = int(os.getenv("MATERIAL_TOP_K", "3"))
+# Words per passage; consecutive passages overlap by a quarter
+MATERIAL_PASSAGE_WORDS = int(os.getenv("MATERIAL_PASSAGE_WORDS", "80"))
+# Students whose indexes are kept in memory (least recently used ones are dropped)
+MATERIAL_INDEX_STUDENTS = int(os.getenv("MATERIAL_INDEX_STUDENTS", "500"))
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+WORD_PATTERN = re.compile(r"[^\W_]+")
+
+STOP_WORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it my of on or so that the this to "
+    "was what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [word for word in WORD_PATTERN.findall(text.lower()) if word not in STOP_WORDS]
+
+
+def split_passages(text: str, passage_words: int = MATERIAL_PASSAGE_WORDS) -> List[str]:
+    """Overlapping windows of words, so an answer straddling a boundary still lands in one passage"""
+    words = text.split()
+    if not words:
+        return []
+    step = max(1, passage_words - passage_words // 4)
+    return [" ".join(words[start:start + passage_words])
+            for start in range(0, max(1, len(words) - passage_words + step), step)]
+
+
+class PassageIndex:
+    """BM25 over one student's passages. Files are added and removed one at a time, so an
+    upload only tokenizes the new file instead of rebuilding the index."""
+
+    def __init__(self):
+        self._passages: Dict[int, tuple] = {}  # id -> (file_id, text, length)
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)  # term -> {passage id: term frequency}
+        self._file_passages: Dict[str, List[int]] = {}
+        self._total_length = 0
+        self._next_id = 0
+
+    def file_ids(self) -> set:
+        return set(self._file_passages)
+
+    def add_file(self, file_id: str, text: str):
+        if file_id in self._file_passages:
+            return
+        ids = []
+        for passage in split_passages(text):
+            terms = Counter(tokenize(passage))
+            passage_id = self._next_id
+            self._next_id += 1
+            length = sum(terms.values())
+            self._passages[passage_id] = (file_id, passage, length)
+            self._total_length += length
+            for term, count in terms.items():
+                self._postings[term][passage_id] = count
+            ids.append(passage_id)
+        self._file_passages[file_id] = ids
+
+    def remove_file(self, file_id: str):
+        for passage_id in self._file_passages.pop(file_id, []):
+            _, passage, length = self._passages.pop(passage_id)
+            self._total_length -= length
+            for term in set(tokenize(passage)):
+                postings = self._postings[term]
+                postings.pop(passage_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def search(self, query: str, k: int = MATERIAL_TOP_K) -> List[dict]:
+        """The k best passages for the query as {file_id, text, score}; passages sharing no terms are left out"""
+        if not self._passages:
+            return []
+        count = len(self._passages)
+        average_length = self._total_length / count or 1
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for passage_id, frequency in postings.items():
+                length = self._passages[passage_id][2]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                scores[passage_id] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+        best = heapq.nlargest(k, scores.items(), key=lambda entry: entry[1])
+        return [{"file_id": self._passages[passage_id][0], "text": self._passages[passage_id][1], "score": score}
+                for passage_id, score in best]
+
+    def __len__(self):
+        return len(self._passages)
+
+
+class MaterialIndex:
+    """
+    Per-student passage indexes kept in process memory.
+
+    Uploads handled by this process are added straight to the student's index. Before a
+    search the index is compared with the student's manifests, so files uploaded or deleted
+    through another process are picked up by reading just those files.
+    """
+
+    def __init__(self, max_students: int = MATERIAL_INDEX_STUDENTS):
+        self.max_students = max_students
+        self._indexes: "OrderedDict[str, PassageIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def search(self, student_id: str, query: str, manifests: List[dict],
+               read_file: Callable[[dict], Optional[str]], k: int = MATERIAL_TOP_K) -> List[dict]:
+        """Top-k passages of the student's files for the query; read_file loads a manifest's text"""
+        started = time.perf_counter()
+        wanted = {manifest['file_id'] or "legacy": manifest for manifest in manifests}
+        with self._lock:
+            index = self._get_index(student_id)
+            for file_id in index.file_ids() - set(wanted):
+                index.remove_file(file_id)
+            missing = set(wanted) - index.file_ids()
+
+        if missing:
+            # Read outside the lock so other students' searches are not held up by DynamoDB
+            metrics.increment("material_index_loads", len(missing))
+            texts = {file_id: read_file(wanted[file_id]) or "" for file_id in missing}
+            with self._lock:
+                index = self._get_index(student_id)
+                for file_id, text in texts.items():
+                    index.add_file(file_id, text)
+
+        with self._lock:
+            passages = self._get_index(student_id).search(query, k)
+        metrics.observe("material_search_seconds", time.perf_counter() - started)
+        return passages
+
+    def add_file(self, student_id: str, file_id: str, text: str):
+        """Write-through for an upload saved by this process; students not in memory are indexed on their next search"""
+        with self._lock:
+            index = self._indexes.get(student_id)
+            if index is not None:
+                index.add_file(file_id, text)
+
+    def remove_file(self, student_id: str, file_id: str):
+        with self._lock:
+            index = self._indexes.get(student_id)
+            if index is not None:
+                index.remove_file(file_id)
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+    def _get_index(self, student_id: str) -> PassageIndex:
+        index = self._indexes.get(student_id)
+        if index is None:
+            index = self._indexes[student_id] = PassageIndex()
+            while len(self._indexes) > self.max_students:
+                self._indexes.popitem(last=False)
+        else:
+            self._indexes.move_to_end(student_id)
+        return index
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"students": len(self._indexes),
+                    "passages": sum(len(index) for index in self._indexes.values())}
+
+
+material_index = MaterialIndex()
@@ -0,0 +1,129 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Tuple, Union
+
+# Upper bounds, in seconds, of the histogram buckets every observation is counted into
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+MetricKey = Union[str, Tuple[str, Tuple[Tuple[str, str], ...]]]
+
+
+def metric_key(name: str, labels: Dict[str, str]) -> MetricKey:
+    return (name, tuple(sorted((key, str(value)) for key, value in labels.items()))) if labels else name
+
+
+def family(key: MetricKey):
+    return (key, ()) if isinstance(key, str) else key
+
+
+def format_key(key: MetricKey, suffix: str = "", extra: str = "") -> str:
+    """Prometheus series name, e.g. stage_seconds_bucket{stage="auth",le="0.01"}"""
+    name, labels = family(key)
+    pairs = [f"{label}={quote(value)}" for label, value in labels]
+    if extra:
+        pairs.append(extra)
+    return f"{name}{suffix}{{{','.join(pairs)}}}" if pairs else f"{name}{suffix}"
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def quote(value) -> str:
+    return f'"{escape_label(str(value))}"'
+
+
+class Metrics:
+    """
+    Process-wide counters and measurements for cache hit rates, latencies and similar
+    operational numbers. Both take optional labels (metrics.observe("stage_seconds", 0.2,
+    stage="auth")); measurements are also counted into LATENCY_BUCKETS so they can be
+    exported as Prometheus histograms.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = defaultdict(int)
+        self._observations = {}
+
+    def increment(self, name: str, amount: int = 1, **labels):
+        key = metric_key(name, labels)
+        with self._lock:
+            self._counters[key] += amount
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one measurement, e.g. a latency in seconds"""
+        key = metric_key(name, labels)
+        with self._lock:
+            observation = self._observations.get(key)
+            if observation is None:
+                observation = self._observations[key] = {
+                    "count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * len(self.buckets)}
+            observation["count"] += 1
+            observation["sum"] += value
+            observation["max"] = max(observation["max"], value)
+            bucket = bisect_left(self.buckets, value)
+            if bucket < len(self.buckets):
+                observation["buckets"][bucket] += 1
+
+    def get(self, name: str, **labels) -> int:
+        return self._counters.get(metric_key(name, labels), 0)
+
+    def hit_rate(self, prefix: str) -> float:
+        hits, misses = self.get(f"{prefix}_hits"), self.get(f"{prefix}_misses")
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            observations = {
+                format_key(key): {"count": o["count"], "sum": o["sum"], "max": o["max"],
+                                  "mean": o["sum"] / o["count"] if o["count"] else 0.0}
+                for key, o in self._observations.items()
+            }
+            counters = {format_key(key): value for key, value in self._counters.items()}
+            return {"counters": counters, "observations": observations}
+
+    def prometheus(self) -> str:
+        """Everything in the Prometheus text exposition format"""
+        with self._lock:
+            # Sorted by name, so each metric's series are contiguous as the format requires
+            counters = sorted(self._counters.items(), key=lambda item: family(item[0]))
+            observations = sorted(((key, {**o, "buckets": list(o["buckets"])})
+                                   for key, o in self._observations.items()), key=lambda item: family(item[0]))
+
+        lines, typed = [], set()
+
+        def declare(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for key, value in counters:
+            name = family(key)[0]
+            declare(f"{name}_total", "counter")
+            lines.append(f"{format_key(key, '_total')} {value}")
+
+        # Hit ratios of the caches, from their _hits and _misses counters
+        for key, hits in counters:
+            if isinstance(key, str) and key.endswith("_hits"):
+                cache = key[:-len("_hits")]
+                declare("cache_hit_ratio", "gauge")
+                lines.append(f"{format_key(('cache_hit_ratio', (('cache', cache),)))} {self.hit_rate(cache):.6f}")
+
+        for key, o in observations:
+            name = family(key)[0]
+            declare(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(self.buckets, o["buckets"]):
+                cumulative += count
+                lines.append(f"{format_key(key, '_bucket', 'le=' + quote(bound))} {cumulative}")
+            lines.append(f"{format_key(key, '_bucket', 'le=' + quote('+Inf'))} {o['count']}")
+            lines.append(f"{format_key(key, '_sum')} {o['sum']}")
+            lines.append(f"{format_key(key, '_count')} {o['count']}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
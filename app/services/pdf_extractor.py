@@ -0,0 +1,100 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+import logging
+
+import pymupdf as fitz
+from fastapi import HTTPException, UploadFile
+
+logger = logging.getLogger(__name__)
+
+# Uploads larger than this are rejected with 413 while they are being read
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(25 * 1024 * 1024)))
+# Documents with more pages are rejected with 413 before any text is extracted
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "500"))
+# Extraction processes; 0 extracts on a thread of this process instead
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+# Pages handed to one worker at a time
+PDF_PAGES_PER_CHUNK = int(os.getenv("PDF_PAGES_PER_CHUNK", "16"))
+
+# Size of the reads used to copy an upload to disk
+READ_CHUNK_BYTES = 1024 * 1024
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # Spawned, not forked: forking a process that runs boto3 and event loop threads is unsafe
+                _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def count_pages(path: str) -> int:
+    with fitz.open(path) as doc:
+        return doc.page_count
+
+
+def extract_pages(path: str, start: int, stop: int) -> str:
+    """Text of pages [start, stop) of the PDF at `path`; runs in a worker process"""
+    with fitz.open(path) as doc:
+        return "".join(doc.load_page(page_num).get_text() for page_num in range(start, stop))
+
+
+def page_chunks(page_count: int, pages_per_chunk: int = PDF_PAGES_PER_CHUNK) -> List[Tuple[int, int]]:
+    return [(start, min(start + pages_per_chunk, page_count)) for start in range(0, page_count, pages_per_chunk)]
+
+
+async def spool_upload(file: UploadFile, max_bytes: int = PDF_MAX_BYTES, digest=None) -> str:
+    """
+    Copy an upload to a temporary file chunk by chunk, rejecting it with 413 as soon as it
+    passes max_bytes. Worker processes read the file from disk instead of a pickled copy.
+    The bytes are also fed to `digest` (a hashlib object) when one is given.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"File is larger than {max_bytes // (1024 * 1024)} MB")
+
+    handle = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+    try:
+        size = 0
+        while chunk := await file.read(READ_CHUNK_BYTES):
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413, detail=f"File is larger than {max_bytes // (1024 * 1024)} MB")
+            handle.write(chunk)
+            if digest is not None:
+                digest.update(chunk)
+        handle.close()
+        return handle.name
+    except BaseException:
+        handle.close()
+        os.unlink(handle.name)
+        raise
+
+
+async def extract_pdf_file(path: str, max_pages: int = PDF_MAX_PAGES, workers: int = PDF_WORKERS) -> str:
+    """Text of every page, extracted off the event loop in page chunks that run in parallel"""
+    loop = asyncio.get_running_loop()
+    try:
+        page_count = await loop.run_in_executor(None, count_pages, path)
+    except (fitz.FileDataError, fitz.EmptyFileError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail="File is not a readable PDF") from e
+
+    if page_count > max_pages:
+        raise HTTPException(status_code=413, detail=f"PDF has more than {max_pages} pages")
+
+    chunks = page_chunks(page_count)
+    executor = _get_pool() if workers > 0 else None
+    texts = await asyncio.gather(*(loop.run_in_executor(executor, extract_pages, path, start, stop)
+                                   for start, stop in chunks))
+    logger.info("Extracted %d PDF pages in %d chunks", page_count, len(chunks))
+    return "".join(texts)
+
@@ -0,0 +1,99 @@
+import os
+import re
+import string
+from typing import Iterable, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Input tokens a chat prompt template may use, fixed text included ($search_results$ and
+# the question are added by Bedrock on top of this)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "900"))
+# Examples included at most, the ones closest to the question first
+PROMPT_MAX_EXAMPLES = int(os.getenv("PROMPT_MAX_EXAMPLES", "2"))
+
+# Average characters per token of English text for Claude-family tokenizers
+CHARS_PER_TOKEN = 4
+
+WORD_PATTERN = re.compile(r"[^\W_]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count estimate; cheap enough to run on every section of every prompt"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, tokens: int, suffix: str = "...") -> str:
+    """text cut at a word boundary so it fits in `tokens`, suffix included when anything was cut"""
+    limit = tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    limit -= len(suffix)
+    if limit <= 0:
+        return ""
+    cut = text.rfind(" ", 0, limit + 1)
+    return text[:cut if cut > 0 else limit].rstrip() + suffix
+
+
+class CompiledPrompt:
+    """
+    A prompt template parsed once into literal text and {slots}, so the literal text's
+    token cost is known up front for budgeting. Rendering is not faster than an f-string
+    (both take microseconds); what it buys is the budget, i.e. shorter prompts.
+    """
+
+    def __init__(self, template: str):
+        self.parts: List[Tuple[str, Optional[str]]] = [
+            (literal, field) for literal, field, _, _ in string.Formatter().parse(template)]
+        self.slots = [field for _, field in self.parts if field is not None]
+        self.fixed_tokens = estimate_tokens("".join(literal for literal, _ in self.parts))
+
+    def render(self, **values: str) -> str:
+        return "".join([literal + values[field] if field is not None else literal for literal, field in self.parts])
+
+
+class PromptBudget:
+    """Tokens left for the variable sections of one prompt"""
+
+    def __init__(self, tokens: int):
+        self.remaining = tokens
+
+    def take(self, text: str) -> bool:
+        """Spend the tokens for text if it fits whole"""
+        cost = estimate_tokens(text)
+        if cost > self.remaining:
+            return False
+        self.remaining -= cost
+        return True
+
+    def spend(self, text: str):
+        """Spend text's tokens unconditionally, for sections the prompt cannot do without"""
+        self.remaining -= estimate_tokens(text)
+
+    def fit(self, text: str, reserve: int = 0) -> str:
+        """As much of text as fits while keeping `reserve` tokens for later sections"""
+        text = truncate_to_tokens(text, max(0, self.remaining - reserve))
+        self.remaining -= estimate_tokens(text)
+        return text
+
+
+def key_words(text: str) -> frozenset:
+    return frozenset(WORD_PATTERN.findall(text.lower()))
+
+
+def rank_by_overlap(query: str, candidates: Sequence[Tuple[frozenset, str]]) -> List[str]:
+    """Candidate texts ordered by words shared between the query and their key_words, stable for ties"""
+    words = key_words(query)
+    order = sorted(range(len(candidates)), key=lambda i: -len(words & candidates[i][0]))
+    return [candidates[i][1] for i in order]
+
+
+def fit_examples(budget: PromptBudget, examples: Iterable[str], limit: int = PROMPT_MAX_EXAMPLES) -> List[str]:
+    chosen = []
+    for example in examples:
+        if len(chosen) >= limit:
+            break
+        if budget.take(example):
+            chosen.append(example)
+    return chosen
+
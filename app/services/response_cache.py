@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+import logging
+
+import numpy as np
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Cached answers kept in memory; the least recently used one is dropped beyond this
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+# Seconds a cached answer may be served
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+# Cosine similarity two questions need to share an answer (1.0 = same words)
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.9"))
+
+EMBEDDING_DIM = 1024
+
+# Filler words that do not change what is being asked
+STOP_WORDS = {
+    "a", "an", "the", "i", "my", "me", "we", "our", "do", "can", "could", "should", "would",
+    "to", "of", "for", "is", "are", "be", "with", "how", "what", "in", "on", "this", "that",
+    "please", "you",
+}
+
+
+def embed_question(question: str) -> np.ndarray:
+    """
+    Unit-length hashed bag of words and character trigrams, so rewordings that share
+    most of their content words ("how can I keep my ADHD student focused") land close
+    to each other. Cheap enough to run on every request, no model call needed.
+    """
+    words = re.findall(r"[a-z0-9]+", question.lower())
+    content = [w for w in words if w not in STOP_WORDS] or words
+
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for word in content:
+        vector[zlib.crc32(word.encode()) % EMBEDDING_DIM] += 1.0
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            vector[zlib.crc32(padded[i:i + 3].encode()) % EMBEDDING_DIM] += 0.5
+
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def normalize(text) -> str:
+    return " ".join(str(text or "").lower().split())
+
+
+def request_signature(request_params: dict, student: dict, subject: str) -> str:
+    """
+    Everything an opening answer depends on besides the question: knowledge base, model,
+    the student's profile (disability, learning style, format, accommodations) and the
+    subject. The prompt text is left out on purpose: it also carries the material passages
+    and examples picked for this question, which change between rewordings of it.
+    """
+    config = request_params["retrieveAndGenerateConfiguration"]["knowledgeBaseConfiguration"]
+    preferences = student.get("learning_preferences") or {}
+    key = {
+        "knowledge_base": config.get("knowledgeBaseId"),
+        "model": config.get("modelArn"),
+        "disability": normalize(student.get("primary_disability")),
+        "style": normalize(preferences.get("style")),
+        "format": normalize(preferences.get("format")),
+        "accommodations": sorted({normalize(a) for a in student.get("accommodations_needed") or []}),
+        "subject": normalize(subject),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+@dataclass
+class CachedResponse:
+    signature: str
+    question: str
+    vector: np.ndarray
+    answer: str
+    expires_at: float
+
+
+class ResponseCache:
+    """
+    Semantic cache of chat answers. An answer is reused for a request with the same
+    signature (see request_signature) whose question embeds within `threshold` cosine
+    similarity. Entries expire after `ttl` seconds and the least recently used ones are
+    evicted beyond `max_size`.
+
+    Only first messages are cached: requests continuing a Bedrock session depend on the
+    conversation so far and always go to Bedrock.
+    """
+
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL,
+                 threshold: float = RESPONSE_CACHE_THRESHOLD):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._by_signature = {}
+        self._next_id = 0
+
+    @staticmethod
+    def cacheable(request_params: dict) -> bool:
+        return not request_params.get("sessionId")
+
+    def lookup(self, request_params: dict, signature: str) -> Optional[str]:
+        """Cached answer for the request, or None (counted as a miss)"""
+        if not self.cacheable(request_params):
+            return None
+
+        vector = embed_question(request_params["input"]["text"])
+        now = time.monotonic()
+
+        with self._lock:
+            best_id, best_similarity = None, self.threshold
+            for entry_id in list(self._by_signature.get(signature, ())):
+                entry = self._entries[entry_id]
+                if entry.expires_at <= now:
+                    self._remove(entry_id)
+                    continue
+                similarity = float(vector @ entry.vector)
+                if similarity >= best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+
+            if best_id is None:
+                metrics.increment("response_cache_misses")
+                return None
+
+            self._entries.move_to_end(best_id)
+            metrics.increment("response_cache_hits")
+            return self._entries[best_id].answer
+
+    def store(self, request_params: dict, signature: str, answer: str):
+        if not self.cacheable(request_params) or self.max_size <= 0:
+            return
+
+        question = request_params["input"]["text"]
+        entry = CachedResponse(signature, question, embed_question(question), answer, time.monotonic() + self.ttl)
+
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = entry
+            self._by_signature.setdefault(signature, set()).add(entry_id)
+
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                metrics.increment("response_cache_evictions")
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        ids = self._by_signature[entry.signature]
+        ids.discard(entry_id)
+        if not ids:
+            del self._by_signature[entry.signature]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_signature.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "signatures": len(self._by_signature),
+            "hit_rate": metrics.hit_rate("response_cache"),
+        }
+
+
+response_cache = ResponseCache()
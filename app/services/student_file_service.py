@@ -1,14 +1,401 @@
-import boto3
-from models import StudentFile
+import os
+import uuid
+import zlib
+from typing import List, Optional
+import logging
+
+from boto3.dynamodb.conditions import Key
+
+from services.aws_clients import get_dynamodb, get_table
+from models import StudentFile, StudentFileManifest
+from services.dynamo_executor import run_blocking
+from services.material_index import material_index
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Raw UTF-8 bytes of text per chunk item; compressed it stays well under DynamoDB's 400 KB item limit
+MATERIAL_CHUNK_BYTES = int(os.getenv("MATERIAL_CHUNK_BYTES", str(300 * 1024)))
+# Characters of the text kept on the manifest for prompts
+MATERIAL_EXCERPT_CHARS = int(os.getenv("MATERIAL_EXCERPT_CHARS", "300"))
+
+# Files a student can keep at once; their manifests share one StudentFiles item
+MATERIAL_MAX_FILES = int(os.getenv("MATERIAL_MAX_FILES", "20"))
+
+# Manifest attributes; reading these never pulls the text
+MANIFEST_FIELDS = list(StudentFileManifest.model_fields)
+
+
+class StudentFileNotFound(LookupError):
+    """The student has no file with this id"""
+
+
+class StudentFileConflict(Exception):
+    """The student's files cannot take this change: too many files, or a concurrent edit"""
+
+
+def split_text(text: str, chunk_bytes: int = MATERIAL_CHUNK_BYTES) -> List[bytes]:
+    """UTF-8 encoded text in pieces of at most chunk_bytes, never splitting a character"""
+    data = text.encode("utf-8")
+    pieces, start = [], 0
+    while start < len(data):
+        end = min(start + chunk_bytes, len(data))
+        # Step back off UTF-8 continuation bytes so every piece decodes on its own
+        while end < len(data) and data[end] & 0xC0 == 0x80:
+            end -= 1
+        pieces.append(data[start:end])
+        start = end
+    return pieces
+
 
 class StudentFileService:
-    def __init__(self):
-        self.dynamodb = boto3.resource('dynamodb', region_name='us-west-2')
-        self.table = self.dynamodb.Table('StudentFiles')
+    """
+    Uploaded material. Each student's StudentFiles item lists a small manifest per file
+    (filename, sizes, chunk count and an excerpt for prompts); the text is stored
+    zlib-compressed in StudentFileChunks (key file_id + chunk), so large documents fit and
+    chat requests only read the manifests.
 
-    def get_file(self, student_id: str) -> StudentFile:
-        response = self.table.get_item(Key={'student_id': student_id})
+    Text is stored once per distinct upload: MaterialContents (key content_hash, the SHA-256
+    of the uploaded bytes) points at the chunks and counts the manifests referencing them.
+    """
+
+    # Tables are resolved on every use, so each thread gets its own resource
+    @property
+    def dynamodb(self):
+        return get_dynamodb()
+
+    @property
+    def table(self):
+        return get_table('StudentFiles')
+
+    @property
+    def chunks_table(self):
+        return get_table('StudentFileChunks')
+
+    @property
+    def contents_table(self):
+        return get_table('MaterialContents')
+
+    def list_files(self, student_id: str) -> List[dict]:
+        """Manifests of the student's files (without the text), oldest first"""
+        return self._manifests(student_id, self._read_item(student_id))
+
+    def _read_item(self, student_id: str) -> Optional[dict]:
+        names = {f"#f{i}": name for i, name in enumerate(['files'] + MANIFEST_FIELDS)}
+        response = self.table.get_item(
+            Key={'student_id': student_id},
+            ProjectionExpression=", ".join(names),
+            ExpressionAttributeNames=names,
+        )
         return response.get('Item')
 
-    def save_file(self, student_file: StudentFile):
-        return self.table.put_item(Item=student_file.model_dump())
\ No newline at end of file
+    def _manifests(self, student_id: str, item: Optional[dict]) -> List[dict]:
+        if not item:
+            return []
+        if 'files' in item:
+            return item['files']
+        if 'excerpt' in item:
+            # Stored when a student had a single file: the manifest is the item
+            return [item]
+        # Stored before chunking: the text is on the item itself
+        return [self._legacy_manifest(student_id)]
+
+    def get_file(self, student_id: str, file_id: Optional[str] = None) -> Optional[dict]:
+        """The manifest of one file, by default the latest upload, or None"""
+        files = self.list_files(student_id)
+        if file_id is None:
+            return files[-1] if files else None
+        return next((manifest for manifest in files if manifest['file_id'] == file_id), None)
+
+    def get_excerpt(self, student_id: str) -> Optional[str]:
+        item = self.get_file(student_id)
+        return item['excerpt'] if item else None
+
+    def get_content(self, student_id: str, file_id: Optional[str] = None) -> Optional[str]:
+        """The full text of one file (by default the latest upload), reassembled from its chunks"""
+        manifest = self.get_file(student_id, file_id)
+        return self.read_file(manifest) if manifest else None
+
+    def read_file(self, manifest: dict) -> str:
+        if manifest['file_id'] is None:
+            return self.table.get_item(Key={'student_id': manifest['student_id']})['Item'].get('content') or ""
+        # Shared text lives under the content store's chunks id, older uploads under their own file_id
+        return self.read_chunks(manifest.get('chunks_id') or manifest['file_id'], int(manifest['chunk_count']))
+
+    def read_chunks(self, file_id: str, chunk_count: int) -> str:
+        pieces = []
+        kwargs = {'KeyConditionExpression': Key('file_id').eq(file_id), 'ConsistentRead': True}
+        while True:
+            response = self.chunks_table.query(**kwargs)
+            pieces.extend(zlib.decompress(bytes(item['data'])) for item in response['Items'])
+            if 'LastEvaluatedKey' not in response:
+                break
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        if len(pieces) != chunk_count:
+            raise ValueError(f"File {file_id} has {len(pieces)} of {chunk_count} chunks")
+        return b"".join(pieces).decode("utf-8")
+
+    def save_file(self, student_file: StudentFile, content_hash: Optional[str] = None) -> dict:
+        """
+        Store an upload next to the student's other files and return its manifest. With the
+        SHA-256 of the uploaded bytes the text goes into the shared content store, where a
+        later upload of the same document only takes a reference (see add_reference).
+        """
+        item, existing = self._check_room(student_file.student_id)
+        if content_hash:
+            content = self._store_content(content_hash, student_file.content or "")
+            manifest = self._reference_manifest(student_file, content)
+        else:
+            manifest = self._write_file(student_file)
+
+        try:
+            self._append_manifest(student_file.student_id, manifest, item, existing)
+        except Exception:
+            # Not listed anywhere, so nothing would ever free the text
+            if content_hash:
+                self._release_content(content_hash)
+            else:
+                self.delete_chunks(manifest['file_id'], manifest['chunk_count'])
+            raise
+        material_index.add_file(student_file.student_id, manifest['file_id'], student_file.content or "")
+        logger.info("Saved %d bytes of material in %d chunks", manifest['text_bytes'], manifest['chunk_count'])
+        return manifest
+
+    def add_reference(self, student_id: str, content_hash: str, filename: str, content_type: str,
+                      size_bytes: int) -> Optional[dict]:
+        """
+        Add a file whose bytes were uploaded before by pointing at the stored text, so the
+        upload is neither parsed nor stored again. None when the content store does not have it.
+        """
+        item, existing = self._check_room(student_id)
+        content = self._acquire_content(content_hash)
+        if content is None:
+            metrics.increment("material_dedupe_misses")
+            return None
+
+        metrics.increment("material_dedupe_hits")
+        manifest = self._reference_manifest(
+            StudentFile(student_id=student_id, filename=filename, content_type=content_type, content="",
+                        size_bytes=size_bytes),
+            content)
+        try:
+            self._append_manifest(student_id, manifest, item, existing)
+        except Exception:
+            self._release_content(content_hash)
+            raise
+        logger.info("Referenced %d bytes of stored material", manifest['text_bytes'])
+        return manifest
+
+    def delete_file(self, student_id: str, file_id: str):
+        item = self._read_item(student_id)
+        files = self._manifests(student_id, item)
+        position = next((i for i, manifest in enumerate(files) if manifest['file_id'] == file_id), None)
+        if position is None:
+            raise StudentFileNotFound("File not found")
+
+        try:
+            if 'files' in item:
+                # Removing by position is only safe if no other request shifted the list meanwhile
+                self.table.update_item(
+                    Key={'student_id': student_id},
+                    UpdateExpression=f"REMOVE #files[{position}]",
+                    ConditionExpression=f"#files[{position}].file_id = :file_id",
+                    ExpressionAttributeNames={'#files': 'files'},
+                    ExpressionAttributeValues={':file_id': file_id},
+                )
+            else:
+                # Stored when a student had a single file: the manifest is the item
+                self.table.delete_item(
+                    Key={'student_id': student_id},
+                    ConditionExpression="attribute_not_exists(#files) AND file_id = :file_id",
+                    ExpressionAttributeNames={'#files': 'files'},
+                    ExpressionAttributeValues={':file_id': file_id},
+                )
+        except self.dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+            raise StudentFileConflict("Files changed while deleting; try again")
+
+        manifest = files[position]
+        if manifest.get('content_hash'):
+            self._release_content(manifest['content_hash'])
+        else:
+            self.delete_chunks(file_id, int(manifest['chunk_count']))
+        material_index.remove_file(student_id, file_id)
+
+    def _check_room(self, student_id: str):
+        item = self._read_item(student_id)
+        existing = self._manifests(student_id, item)
+        if len(existing) >= MATERIAL_MAX_FILES:
+            raise StudentFileConflict(f"At most {MATERIAL_MAX_FILES} files can be uploaded; delete one first")
+        return item, existing
+
+    def _append_manifest(self, student_id: str, manifest: dict, item: Optional[dict], existing: List[dict]):
+        """
+        Add the manifest to the student's list. _check_room read the item earlier, so the
+        writes carry conditions: concurrent uploads cannot push the list past MATERIAL_MAX_FILES.
+        """
+        if existing and 'files' not in item:
+            # Item from before multiple files: move the old file into the list
+            previous = existing[0]
+            if previous['file_id'] is None:
+                previous = self._write_file(StudentFile(
+                    student_id=student_id, filename=previous['filename'],
+                    content_type=previous['content_type'], content=self.read_file(previous),
+                    size_bytes=previous['size_bytes']))
+            try:
+                # Only over the item that was read: not deleted, and not migrated by another upload
+                self.table.put_item(
+                    Item={'student_id': student_id, 'files': [previous, manifest]},
+                    ConditionExpression="attribute_exists(student_id) AND attribute_not_exists(#files)",
+                    ExpressionAttributeNames={'#files': 'files'},
+                )
+            except self.dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+                if existing[0]['file_id'] is None:
+                    self.delete_chunks(previous['file_id'], int(previous['chunk_count']))
+                raise StudentFileConflict("Files changed while uploading; try again")
+        else:
+            try:
+                self.table.update_item(
+                    Key={'student_id': student_id},
+                    UpdateExpression="SET #files = list_append(if_not_exists(#files, :empty), :new)",
+                    ConditionExpression="attribute_not_exists(#files) OR size(#files) < :max",
+                    ExpressionAttributeNames={'#files': 'files'},
+                    ExpressionAttributeValues={':empty': [], ':new': [manifest], ':max': MATERIAL_MAX_FILES},
+                )
+            except self.dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+                raise StudentFileConflict(f"At most {MATERIAL_MAX_FILES} files can be uploaded; delete one first")
+
+    def _write_file(self, student_file: StudentFile) -> dict:
+        """Write the text's chunks under the file's own id and return the manifest pointing at them"""
+        pieces = split_text(student_file.content or "")
+        manifest = StudentFileManifest(
+            student_id=student_file.student_id,
+            file_id=uuid.uuid4().hex,
+            filename=student_file.filename,
+            content_type=student_file.content_type,
+            size_bytes=student_file.size_bytes,
+            text_bytes=sum(len(piece) for piece in pieces),
+            chunk_count=len(pieces),
+            excerpt=(student_file.content or "")[:MATERIAL_EXCERPT_CHARS],
+        )
+        self._write_chunks(manifest.file_id, pieces)
+        return manifest.model_dump()
+
+    def _write_chunks(self, chunks_id: str, pieces: List[bytes]):
+        with self.chunks_table.batch_writer() as batch:
+            for i, piece in enumerate(pieces):
+                batch.put_item(Item={'file_id': chunks_id, 'chunk': i, 'data': zlib.compress(piece)})
+
+    def _reference_manifest(self, student_file: StudentFile, content: dict) -> dict:
+        return StudentFileManifest(
+            student_id=student_file.student_id,
+            file_id=uuid.uuid4().hex,
+            filename=student_file.filename,
+            content_type=student_file.content_type,
+            size_bytes=student_file.size_bytes,
+            text_bytes=int(content['text_bytes']),
+            chunk_count=int(content['chunk_count']),
+            excerpt=content['excerpt'],
+            content_hash=content['content_hash'],
+            chunks_id=content['chunks_id'],
+        ).model_dump()
+
+    def _store_content(self, content_hash: str, text: str) -> dict:
+        """Put text into the content store with one reference, or take a reference on a copy stored meanwhile"""
+        while True:
+            existing = self._acquire_content(content_hash)
+            if existing is not None:
+                return existing
+
+            pieces = split_text(text)
+            content = {
+                'content_hash': content_hash,
+                # Chunks get a fresh id, so a copy being garbage collected never shares chunk keys with this one
+                'chunks_id': uuid.uuid4().hex,
+                'text_bytes': sum(len(piece) for piece in pieces),
+                'chunk_count': len(pieces),
+                'excerpt': text[:MATERIAL_EXCERPT_CHARS],
+                'ref_count': 1,
+            }
+            # Chunks first, so the store never points at chunks that are not there yet
+            self._write_chunks(content['chunks_id'], pieces)
+            try:
+                self.contents_table.put_item(Item=content, ConditionExpression="attribute_not_exists(content_hash)")
+                return content
+            except self.dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+                # The same document was stored by a concurrent upload; use that copy
+                self.delete_chunks(content['chunks_id'], content['chunk_count'])
+
+    def _acquire_content(self, content_hash: str) -> Optional[dict]:
+        try:
+            return self.contents_table.update_item(
+                Key={'content_hash': content_hash},
+                UpdateExpression="ADD ref_count :one",
+                ConditionExpression="attribute_exists(content_hash)",
+                ExpressionAttributeValues={':one': 1},
+                ReturnValues="ALL_NEW",
+            )['Attributes']
+        except self.dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+            return None
+
+    def _release_content(self, content_hash: str):
+        """Drop a reference; the last one removes the stored text"""
+        try:
+            content = self.contents_table.update_item(
+                Key={'content_hash': content_hash},
+                UpdateExpression="ADD ref_count :minus_one",
+                ConditionExpression="attribute_exists(content_hash)",
+                ExpressionAttributeValues={':minus_one': -1},
+                ReturnValues="ALL_NEW",
+            )['Attributes']
+        except self.dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+            logger.warning("Released material %s that is not in the content store", content_hash)
+            return
+        if content['ref_count'] > 0:
+            return
+        try:
+            # Only if nobody took a new reference in the meantime
+            self.contents_table.delete_item(Key={'content_hash': content_hash},
+                                            ConditionExpression="ref_count <= :zero",
+                                            ExpressionAttributeValues={':zero': 0})
+        except self.dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+            return
+        self.delete_chunks(content['chunks_id'], int(content['chunk_count']))
+
+    def delete_chunks(self, file_id: str, chunk_count: int):
+        with self.chunks_table.batch_writer() as batch:
+            for i in range(chunk_count):
+                batch.delete_item(Key={'file_id': file_id, 'chunk': i})
+
+    def _legacy_manifest(self, student_id: str) -> dict:
+        item = self.table.get_item(Key={'student_id': student_id})['Item']
+        content = item.get('content') or ""
+        return {
+            'student_id': student_id,
+            'file_id': None,
+            'filename': item.get('filename'),
+            'content_type': item.get('content_type'),
+            'size_bytes': item.get('size_bytes'),
+            'text_bytes': len(content.encode("utf-8")),
+            'chunk_count': 0,
+            'excerpt': content[:MATERIAL_EXCERPT_CHARS],
+        }
+
+    async def get_file_async(self, student_id: str):
+        return await run_blocking(self.get_file, student_id)
+
+    async def list_files_async(self, student_id: str):
+        return await run_blocking(self.list_files, student_id)
+
+    async def get_content_async(self, student_id: str, file_id: Optional[str] = None):
+        return await run_blocking(self.get_content, student_id, file_id)
+
+    async def save_file_async(self, student_file: StudentFile, content_hash: Optional[str] = None):
+        return await run_blocking(self.save_file, student_file, content_hash)
+
+    async def add_reference_async(self, student_id: str, content_hash: str, filename: str, content_type: str,
+                                  size_bytes: int):
+        return await run_blocking(self.add_reference, student_id, content_hash, filename, content_type, size_bytes)
+
+    async def delete_file_async(self, student_id: str, file_id: str):
+        return await run_blocking(self.delete_file, student_id, file_id)
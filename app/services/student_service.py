@@ -1,41 +1,174 @@
-import boto3
+import os
+from typing import Optional
+from botocore.exceptions import ClientError
 from services.student_file_service import StudentFileService
 from models.student_profile import StudentProfile
 from services.student_tutor_matcher import match_student_to_tutor
+from services.tutor_roster import tutor_roster
 from services.dynamo_converter import convert_student_to_dynamo_format
+from services.batch_matcher import best_matches
+from services.dynamo_scan import scan_all, scan_items
+from services.aws_clients import get_table
+from services.dynamo_executor import run_blocking
+from services.assignment_solver import UNASSIGNED, assign_students, current_assignment, reassign_neighborhood
 import logging
 
 logger = logging.getLogger(__name__)
 
+# "greedy" gives every student their best tutor, "global" respects tutor capacity
+MATCHING_MODE = os.getenv("MATCHING_MODE", "greedy")
+
 class StudentService:
-    def __init__(self):
-        self.dynamodb = boto3.resource('dynamodb', region_name='us-west-2')
-        self.table = self.dynamodb.Table('Students')
+    @property
+    def table(self):
+        # Resolved on every use, so each thread (the event loop, run_blocking workers) gets its own
+        return get_table('Students')
 
     def get_student(self, student_id: str):
         response = self.table.get_item(Key={'student_id': student_id})
         return response.get('Item')
 
-    def add_student(self, student: StudentProfile):
-        self.table.put_item(Item=student.model_dump())
+    async def get_student_async(self, student_id: str):
+        return await run_blocking(self.get_student, student_id)
+
+    async def save_student_async(self, item: dict):
+        return await run_blocking(self.table.put_item, Item=item)
 
-        # Get all tutors and find best matches
-        tutors_table = self.dynamodb.Table('Tutors')
-        tutors_response = tutors_table.scan()
-        tutors = tutors_response.get('Items', [])
+    def get_tutor_index(self, refresh: bool = False):
+        """Compiled tutor roster, scanning the Tutors table only when the cache is stale"""
+        return tutor_roster.get_index(lambda: scan_all(get_table('Tutors')), refresh)
 
-        if student.tutor_id == None or student.tutor_id == "none":
+    def match_student(self, student: StudentProfile):
+        """Give a saved student without a tutor their best match (or a seat, in global mode) and save it"""
+        if (student.tutor_id == None or student.tutor_id == "none") and MATCHING_MODE == "global":
+            self.assign_with_capacity(student, self.get_tutor_index().tutors())
+        elif student.tutor_id == None or student.tutor_id == "none":
+            # Find best matches in the cached tutor roster
             student_dynamo_format = convert_student_to_dynamo_format(student.model_dump())
-            matched_tutors = match_student_to_tutor(student_dynamo_format, tutors)
+            matched_tutors = match_student_to_tutor(student_dynamo_format, self.get_tutor_index())
 
-            logger.debug(f"matched_tutors: {matched_tutors}")
+            logger.debug("Student %s: %d matched tutors", student.student_id, len(matched_tutors))
 
             if matched_tutors:
                 student.tutor_id = matched_tutors[0]['tutor_id']
                 student.tutor_name = matched_tutors[0]['display_name']
-                self.table.put_item(Item=student.model_dump())
+                self.set_tutor(student.student_id, student.tutor_id, student.tutor_name)
 
         return {
             "tutor_id": student.tutor_id,
             "tutor_name": student.tutor_name
+        }
+
+    def set_tutor(self, student_id: str, tutor_id: str, tutor_name: Optional[str]):
+        """
+        Write only the tutor fields: matching runs on a copy of the student read earlier,
+        and putting that copy back would undo edits saved in the meantime.
+        """
+        try:
+            self.table.update_item(
+                Key={'student_id': student_id},
+                UpdateExpression='SET tutor_id = :tutor_id, tutor_name = :tutor_name',
+                ConditionExpression='attribute_exists(student_id)',
+                ExpressionAttributeValues={':tutor_id': tutor_id, ':tutor_name': tutor_name},
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                # Deleted while it was being matched; do not leave a stub item behind
+                raise LookupError(f"Student {student_id} not found")
+            raise
+
+    async def get_tutor_index_async(self, refresh: bool = False):
+        return await run_blocking(self.get_tutor_index, refresh)
+
+    def assign_with_capacity(self, student: StudentProfile, tutors):
+        """
+        Seat a student with a tutor that still has capacity, re-optimizing the students
+        around that tutor instead of re-running the whole assignment.
+        """
+        students = [s for s in scan_items(self.table) if s['student_id'] != student.student_id]
+        students.append(student.model_dump())
+
+        dynamo_students = [convert_student_to_dynamo_format(s) for s in students]
+        before = current_assignment(students, tutors)
+        after = reassign_neighborhood(dynamo_students, tutors, before, changed_students=[len(students) - 1])
+
+        moved = []
+        for i in map(int, (before != after).nonzero()[0]):
+            tutor = tutors[after[i]] if after[i] != UNASSIGNED else None
+            students[i]['tutor_id'] = tutor['tutor_id'] if tutor else "none"
+            students[i]['tutor_name'] = tutor['display_name'] if tutor else None
+            moved.append(students[i])
+
+        if moved:
+            logger.info("Seating student %s moved %d students", student.student_id, len(moved))
+            for item in moved:
+                self.set_tutor(item['student_id'], item['tutor_id'], item['tutor_name'])
+
+        student.tutor_id = students[-1]['tutor_id']
+        student.tutor_name = students[-1]['tutor_name']
+
+    def rematch_all(self, only_unmatched: bool = True, dry_run: bool = False, mode: str = None):
+        """
+        Re-match the whole student population against the current tutor pool in one batch.
+        In "global" mode students are spread over tutors by capacity instead of each taking their best match.
+        """
+        mode = mode or MATCHING_MODE
+        all_students = scan_all(self.table)
+        # Re-matching usually follows tutor pool changes, so read the table fresh
+        tutors = self.get_tutor_index(refresh=True).tutors()
+
+        students, seated = all_students, []
+        if only_unmatched:
+            students = [s for s in all_students if s.get('tutor_id') in (None, "none")]
+            seated = [s for s in all_students if s.get('tutor_id') not in (None, "none")]
+
+        dynamo_students = [convert_student_to_dynamo_format(s) for s in students]
+        if mode == "global":
+            load = [0] * len(tutors)
+            for j in current_assignment(seated, tutors):
+                if j != UNASSIGNED:
+                    load[j] += 1
+            matches = assign_students(dynamo_students, tutors, load, current_assignment(students, tutors))
+        else:
+            matches = best_matches(dynamo_students, tutors)
+
+        changes = []
+        for student, tutor in zip(students, matches):
+            if tutor is None and mode == "global" and student.get('tutor_id') not in (None, "none"):
+                # No free seat left for this student, release the old one
+                student['tutor_id'] = "none"
+                student['tutor_name'] = None
+                changes.append(student)
+                continue
+
+            if tutor is None or tutor['tutor_id'] == student.get('tutor_id'):
+                continue
+
+            student['tutor_id'] = tutor['tutor_id']
+            student['tutor_name'] = tutor['display_name']
+            changes.append(student)
+
+        if not dry_run:
+            # Only the tutor fields: the scanned items are stale by now, and batch writes cannot carry conditions
+            written = []
+            for student in changes:
+                try:
+                    self.set_tutor(student['student_id'], student['tutor_id'], student['tutor_name'])
+                    written.append(student)
+                except LookupError:
+                    logger.info("Student %s was deleted during the re-match", student['student_id'])
+            changes = written
+
+        logger.info("Re-matched %d of %d students against %d tutors (%s)", len(changes), len(students), len(tutors), mode)
+
+        return {
+            "students": len(students),
+            "tutors": len(tutors),
+            "updated": len(changes),
+            "mode": mode,
+            "dry_run": dry_run,
+            "matches": [
+                {"student_id": s['student_id'], "tutor_id": s['tutor_id'], "tutor_name": s['tutor_name']}
+                for s in changes
+            ]
         }
\ No newline at end of file
@@ -1,47 +1,35 @@
 import logging
+from models.availability import availability_mask, overlap_minutes
+from services.dynamo_converter import get_learning_preference, get_list_values, get_string_value
+from services.tutor_index import TutorIndex
 
 logger = logging.getLogger(__name__)
 
 def match_student_to_tutor(student, tutors):
     """
     Find the best tutor match for a student based on accommodations, availability, and subjects.
-    Returns list of tutors sorted by compatibility score (highest first).
+    Returns list of tutors sorted by compatibility score (highest first), then by overlapping availability.
+    Pass a TutorIndex instead of a list to reuse an already compiled roster.
     """
-    scored_tutors = []
-
-    for tutor in tutors:
-        score = calculate_compatibility_score(student, tutor)
-        if score > 0:  # Only include viable matches
-            scored_tutors.append((tutor, score))
-
-    # Sort by score descending
-    return [tutor for tutor, score in sorted(scored_tutors, key=lambda x: x[1], reverse=True)]
+    index = tutors if isinstance(tutors, TutorIndex) else TutorIndex(tutors)
+    return index.match(student)
 
 def calculate_compatibility_score(student, tutor):
     """Calculate compatibility score between student and tutor"""
     score = 0
 
-    # Handle both DynamoDB format and regular format
-    def get_list_values(item, key):
-        if isinstance(item.get(key), dict) and "L" in item[key]:
-            return [s["S"] for s in item[key]["L"]]
-        return item.get(key, [])
-
-    def get_string_value(item, key):
-        if isinstance(item.get(key), dict) and "S" in item[key]:
-            return item[key]["S"]
-        return item.get(key, "")
-
     # Subject match (required)
     student_subjects = get_list_values(student, "preferred_subjects")
     tutor_subjects = get_list_values(tutor, "subjects")
     if not any(subj in tutor_subjects for subj in student_subjects):
-        logger.info(f"Student {student.get('student_id', 'unknown')} not matched to tutor {tutor.get('tutor_id', 'unknown')} due to subject mismatch")
+        logger.debug("Student %s not matched to tutor %s due to subject mismatch",
+                     student.get('student_id', 'unknown'), tutor.get('tutor_id', 'unknown'))
         return 0
 
     # Availability overlap (required)
     if not has_availability_overlap(student, tutor):
-        logger.info(f"Student {student.get('student_id', 'unknown')} not matched to tutor {tutor.get('tutor_id', 'unknown')} due to availability mismatch")
+        logger.debug("Student %s not matched to tutor %s due to availability mismatch",
+                     student.get('student_id', 'unknown'), tutor.get('tutor_id', 'unknown'))
         return 0
 
     # Accommodation compatibility
@@ -57,13 +45,13 @@ def calculate_compatibility_score(student, tutor):
         score += 15
 
     # Learning format compatibility
-    student_format = student.get("learning_preferences", {}).get("M", {}).get("format", {}).get("S", "")
+    student_format = get_learning_preference(student, "format")
     tutor_format = get_string_value(tutor, "preferred_format")
     if student_format == tutor_format:
         score += 5
 
     # Modality compatibility
-    student_modality = student.get("learning_preferences", {}).get("M", {}).get("modality", {}).get("S", "")
+    student_modality = get_learning_preference(student, "modality")
     tutor_modalities = get_list_values(tutor, "supported_modalities")
     if student_modality in tutor_modalities or "Hybrid" in tutor_modalities:
         score += 5
@@ -72,41 +60,8 @@ def calculate_compatibility_score(student, tutor):
 
 def has_availability_overlap(student, tutor):
     """Check if student and tutor have overlapping availability"""
-    # Handle both formats
-    if isinstance(student.get("availability"), dict) and "L" in student["availability"]:
-        student_slots = student["availability"]["L"]
-    else:
-        student_slots = student.get("availability", [])
-
-    if isinstance(tutor.get("availability"), dict) and "L" in tutor["availability"]:
-        tutor_slots = tutor["availability"]["L"]
-    else:
-        tutor_slots = tutor.get("availability", [])
-
-    for s_slot in student_slots:
-        if isinstance(s_slot, dict) and "M" in s_slot:
-            s_day = s_slot["M"]["day"]["S"]
-            s_start = s_slot["M"]["start_time"]["S"]
-            s_end = s_slot["M"]["end_time"]["S"]
-        else:
-            s_day = s_slot.get("day", "")
-            s_start = s_slot.get("start_time", "")
-            s_end = s_slot.get("end_time", "")
-
-        for t_slot in tutor_slots:
-            if isinstance(t_slot, dict) and "M" in t_slot:
-                t_day = t_slot["M"]["day"]["S"]
-                t_start = t_slot["M"]["start_time"]["S"]
-                t_end = t_slot["M"]["end_time"]["S"]
-            else:
-                t_day = t_slot.get("day", "")
-                t_start = t_slot.get("start_time", "")
-                t_end = t_slot.get("end_time", "")
-
-            if s_day == t_day and times_overlap(s_start, s_end, t_start, t_end):
-                return True
-    return False
+    return availability_mask(student) & availability_mask(tutor) != 0
 
-def times_overlap(start1, end1, start2, end2):
-    """Check if two time ranges overlap"""
-    return start1 < end2 and start2 < end1
\ No newline at end of file
+def availability_overlap_minutes(student, tutor):
+    """Minutes per week the student and tutor are both available"""
+    return overlap_minutes(availability_mask(student), availability_mask(tutor))
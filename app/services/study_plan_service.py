@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+import logging
+
+from fastapi import HTTPException
+
+from prompts import summary_plan_prompt
+from services.aws_clients import get_table
+from services.bedrock_gateway import bedrock_gateway
+from services.bedrock_service import build_retrieve_and_generate_request, record_token_usage
+from services.dynamo_executor import run_blocking
+from services.metrics import metrics
+from services.prompt_compiler import PromptBudget, estimate_tokens
+from services.student_file_service import StudentFileService
+from services.student_service import StudentService
+from services.tutor_service import TutorService
+
+logger = logging.getLogger(__name__)
+
+# Tokens for the generation query (profiles and material excerpt) of a study plan
+PLAN_QUERY_TOKEN_BUDGET = int(os.getenv("PLAN_QUERY_TOKEN_BUDGET", "250"))
+
+# Changes whenever the prompt does, so plans generated from an older prompt are redone
+PROMPT_VERSION = hashlib.sha256(summary_plan_prompt.kb_prompt.encode()).hexdigest()[:12]
+
+class PlanInputs(NamedTuple):
+    student: dict
+    tutor: Optional[dict]
+    class_material: Optional[str]
+    material_id: Optional[str] = None
+
+
+def build_prompt(student, tutor, subject, class_material=None, token_budget=PLAN_QUERY_TOKEN_BUDGET):
+    """The generation query: profiles, then as much of the material as the budget leaves room for"""
+    # Create concise profile strings
+    student_profile = f"{student['primary_disability']} | {student['learning_preferences']['style']} | {student['learning_preferences']['format']} | {', '.join(student['accommodations_needed'])}"
+
+    prompt = f"Student: {student_profile}\nSubject: {subject}\n"
+
+    if tutor:
+        tutor_profile = f"{tutor['tutoring_style']} | {', '.join(tutor['subjects'])} | {', '.join(tutor['accommodation_skills'])}"
+        prompt += f"Tutor: {tutor_profile}\n"
+
+    instruction = "Generate a personalized study plan focusing on accessibility and learning effectiveness. Be concise and specific."
+    if class_material:
+        budget = PromptBudget(token_budget - estimate_tokens(prompt + instruction + "Material: ...\n"))
+        excerpt = budget.fit(class_material)
+        if excerpt:
+            prompt += f"Material: {excerpt.removesuffix('...')}...\n"
+
+    prompt += instruction
+
+    return prompt
+
+
+def build_plan_template(student, subject) -> str:
+    """kb_prompt with the student's profile filled in ($search_results$ is left for Bedrock)"""
+    preferences = student['learning_preferences']
+    return (summary_plan_prompt.kb_prompt
+            .replace("{disability}", student['primary_disability'])
+            .replace("{learning_style}", preferences['style'])
+            .replace("{format}", preferences['format'])
+            .replace("{accommodations}", ', '.join(student['accommodations_needed']))
+            .replace("{subject}", subject))
+
+
+def plan_subject(student) -> str:
+    return ', '.join(student.get('preferred_subjects') or []) or "General"
+
+
+def plan_hash(inputs: PlanInputs) -> str:
+    """Content hash of everything a plan is generated from; unrelated profile edits keep the plan"""
+    student, tutor = inputs.student, inputs.tutor
+    content = {
+        "prompt": PROMPT_VERSION,
+        "student": {
+            "primary_disability": student['primary_disability'],
+            "learning_preferences": student['learning_preferences'],
+            "accommodations_needed": student['accommodations_needed'],
+            "preferred_subjects": student.get('preferred_subjects') or [],
+        },
+        "tutor": tutor and {
+            "tutoring_style": tutor.get('tutoring_style'),
+            "subjects": tutor.get('subjects'),
+            "accommodation_skills": tutor.get('accommodation_skills'),
+        },
+        "material": [inputs.material_id, inputs.class_material],
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class StudyPlanService:
+    """
+    Study plans persisted in the StudyPlans table (key student_id) together with the
+    content hash of the inputs they were generated from. A plan is served as long as
+    the hash still matches; otherwise a study_plan job generates and saves a new one.
+    """
+
+    def __init__(self):
+        self.student_service = StudentService()
+        self.tutor_service = TutorService()
+        self.student_file_service = StudentFileService()
+
+    @property
+    def table(self):
+        return get_table('StudyPlans')
+
+    def load_inputs(self, student_id: str) -> Optional[PlanInputs]:
+        student = self.student_service.get_student(student_id)
+        if not student:
+            return None
+
+        tutor = None
+        if student.get('tutor_id') not in (None, "none"):
+            tutor = self.tutor_service.get_tutor(student['tutor_id'])
+
+        # The prompt uses the opening of the material, which the manifest keeps as its excerpt
+        manifest = self.student_file_service.get_file(student_id)
+        if not manifest:
+            return PlanInputs(student, tutor, None)
+
+        return PlanInputs(student, tutor, manifest['excerpt'], manifest.get('file_id'))
+
+    def get_saved_plan(self, student_id: str):
+        response = self.table.get_item(Key={'student_id': student_id})
+        return response.get('Item')
+
+    def save_plan(self, student_id: str, content_hash: str, plan: dict):
+        self.table.put_item(Item={
+            'student_id': student_id,
+            'content_hash': content_hash,
+            'prompt_version': PROMPT_VERSION,
+            'plan': json.dumps(plan),
+            'generated_at': datetime.now(timezone.utc).isoformat(),
+        })
+
+    async def refresh_plan_async(self, student_id: str, bedrock) -> bool:
+        """Regenerate the plan ahead of the next page load if its inputs changed; True if it did"""
+        inputs = await run_blocking(self.load_inputs, student_id)
+        if inputs is None:
+            return False
+
+        content_hash = plan_hash(inputs)
+        saved = await run_blocking(self.get_saved_plan, student_id)
+        if saved and saved.get('content_hash') == content_hash:
+            return False
+
+        await self._generate(student_id, inputs, content_hash, bedrock)
+        return True
+
+    async def get_cached_plan_async(self, student_id: str) -> Optional[dict]:
+        """The stored plan if it still matches the student's inputs, without generating one"""
+        inputs = await run_blocking(self.load_inputs, student_id)
+        if inputs is None:
+            raise HTTPException(status_code=404, detail="Student not found")
+
+        saved = await run_blocking(self.get_saved_plan, student_id)
+        if saved and saved.get('content_hash') == plan_hash(inputs):
+            metrics.increment("study_plan_hits")
+            return json.loads(saved['plan'])
+
+        metrics.increment("study_plan_misses")
+        return None
+
+    async def _generate(self, student_id, inputs, content_hash, bedrock) -> dict:
+        subject = plan_subject(inputs.student)
+        request_params = build_retrieve_and_generate_request(
+            build_prompt(inputs.student, inputs.tutor, subject, inputs.class_material),
+            build_plan_template(inputs.student, subject),
+        )
+
+        started = time.perf_counter()
+        response = await bedrock_gateway.call(None, bedrock.retrieve_and_generate, **request_params)
+        metrics.observe("study_plan_generation_seconds", time.perf_counter() - started)
+        record_token_usage(request_params, response['output']['text'], "study_plan")
+
+        plan = json.loads(response['output']['text'])
+        await run_blocking(self.save_plan, student_id, content_hash, plan)
+        logger.info("Generated study plan for %s", student_id)
+        return plan
@@ -0,0 +1,72 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+import logging
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Verified tokens kept in memory; the least recently used one is dropped beyond this
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+
+def token_key(token: str) -> bytes:
+    # Only a digest is kept, so the cache never holds usable bearer tokens
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+class TokenCache:
+    """
+    Claims of access tokens whose signature was already verified, so a token presented
+    again skips the RS256 check. An entry is dropped once the token's exp passes, which
+    is the same moment jwt.decode would start rejecting it.
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE, clock=time.time):
+        self.max_size = max_size
+        self._clock = clock
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()  # key -> (claims, exp)
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = token_key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= self._clock():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                metrics.increment("token_cache_misses")
+                return None
+            self._entries.move_to_end(key)
+        metrics.increment("token_cache_hits")
+        return entry[0]
+
+    def put(self, token: str, claims: dict):
+        exp = claims.get("exp")
+        if exp is None:
+            # Without an expiry there is no safe moment to forget the token
+            return
+        key = token_key(token)
+        with self._lock:
+            self._entries[key] = (claims, float(exp))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {"size": len(self), "hit_rate": metrics.hit_rate("token_cache")}
+
+
+token_cache = TokenCache()
@@ -0,0 +1,43 @@
+import os
+import time
+from contextlib import contextmanager
+import logging
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Also emit OpenTelemetry spans for stages and requests (needs opentelemetry-api and a configured SDK)
+OTEL_ENABLED = os.getenv("OTEL_ENABLED", "") == "1"
+
+
+def _get_tracer():
+    if not OTEL_ENABLED:
+        return None
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        logger.warning("OTEL_ENABLED is set but opentelemetry is not installed; spans are off")
+        return None
+    return trace.get_tracer("customized-tutoring")
+
+
+tracer = _get_tracer()
+
+
+@contextmanager
+def stage(name: str, **attributes):
+    """
+    Time one stage of a request (a DynamoDB read, a Bedrock call, ...) into the
+    stage_seconds{stage=name} histogram, and as a span when tracing is on. Works around
+    blocking code and awaits alike; with tracing off it costs two clock reads.
+    """
+    started = time.perf_counter()
+    try:
+        if tracer is None:
+            yield
+        else:
+            with tracer.start_as_current_span(name, attributes=attributes):
+                yield
+    finally:
+        metrics.observe("stage_seconds", time.perf_counter() - started, stage=name)
@@ -0,0 +1,192 @@
+import sys
+import threading
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Set, Tuple
+import logging
+
+from models.availability import availability_mask, overlap_minutes
+from services.dynamo_converter import get_learning_preference, get_list_values, get_string_value
+
+logger = logging.getLogger(__name__)
+
+
+def _intern_set(values) -> FrozenSet[str]:
+    return frozenset(sys.intern(v) for v in values if isinstance(v, str))
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledTutor:
+    """Tutor fields used by the matcher, parsed once from the DynamoDB item"""
+    tutor_id: str
+    item: dict
+    position: int
+    subjects: FrozenSet[str]
+    accommodation_skills: FrozenSet[str]
+    disability_experience: FrozenSet[str]
+    preferred_format: str
+    modalities: FrozenSet[str]
+    availability: int
+
+    @classmethod
+    def compile(cls, tutor: dict, position: int) -> "CompiledTutor":
+        return cls(
+            tutor_id=tutor.get("tutor_id"),
+            item=tutor,
+            position=position,
+            subjects=_intern_set(get_list_values(tutor, "subjects")),
+            accommodation_skills=_intern_set(get_list_values(tutor, "accommodation_skills")),
+            disability_experience=_intern_set(get_list_values(tutor, "experience_with_disabilities")),
+            preferred_format=sys.intern(get_string_value(tutor, "preferred_format") or ""),
+            modalities=_intern_set(get_list_values(tutor, "supported_modalities")),
+            availability=availability_mask(tutor),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledStudent:
+    """Student fields used by the matcher, parsed once per match request"""
+    student_id: str
+    subjects: Tuple[str, ...]
+    accommodations: Tuple[str, ...]
+    primary_disability: str
+    learning_format: str
+    modality: str
+    availability: int
+
+    @classmethod
+    def compile(cls, student: dict) -> "CompiledStudent":
+        return cls(
+            student_id=get_string_value(student, "student_id") or "unknown",
+            subjects=tuple(get_list_values(student, "preferred_subjects")),
+            accommodations=tuple(get_list_values(student, "accommodations_needed")),
+            primary_disability=get_string_value(student, "primary_disability"),
+            learning_format=get_learning_preference(student, "format"),
+            modality=get_learning_preference(student, "modality"),
+            availability=availability_mask(student),
+        )
+
+
+def score_compiled(student: CompiledStudent, tutor: CompiledTutor) -> int:
+    """Same weights as calculate_compatibility_score, computed on compiled records"""
+    if student.availability & tutor.availability == 0:
+        return 0
+
+    score = sum(map(tutor.accommodation_skills.__contains__, student.accommodations)) * 10
+
+    if student.primary_disability in tutor.disability_experience:
+        score += 15
+
+    if student.learning_format == tutor.preferred_format:
+        score += 5
+
+    if student.modality in tutor.modalities or "Hybrid" in tutor.modalities:
+        score += 5
+
+    return score
+
+
+class TutorIndex:
+    """
+    Compiled view of the tutor roster with a subject -> tutor ids inverted index,
+    so a match only scores the tutors that teach one of the student's subjects.
+    """
+
+    def __init__(self, tutors=None):
+        self._lock = threading.Lock()
+        self._tutors: Dict[str, CompiledTutor] = {}
+        self._by_subject: Dict[str, Set[str]] = {}
+        self._next_position = 0
+        if tutors:
+            self.sync(tutors)
+
+    def __len__(self):
+        return len(self._tutors)
+
+    def tutors(self) -> List[dict]:
+        """All tutor items, in the order they were first added"""
+        with self._lock:
+            compiled = list(self._tutors.values())
+        return [t.item for t in sorted(compiled, key=lambda t: t.position)]
+
+    def upsert(self, tutor: dict):
+        """Add or replace a single tutor"""
+        with self._lock:
+            self._upsert(tutor)
+
+    def remove(self, tutor_id: str):
+        with self._lock:
+            self._remove(tutor_id)
+
+    def sync(self, tutors):
+        """Bring the index in line with a full roster, recompiling only tutors that changed"""
+        with self._lock:
+            seen = set()
+            for tutor in tutors:
+                tutor_id = tutor.get("tutor_id")
+                seen.add(tutor_id)
+                current = self._tutors.get(tutor_id)
+                if current is None or current.item != tutor:
+                    self._upsert(tutor)
+
+            for tutor_id in [t for t in self._tutors if t not in seen]:
+                self._remove(tutor_id)
+
+    def match(self, student: dict) -> List[dict]:
+        """
+        Find the best tutor matches for a student.
+        Returns tutors sorted by compatibility score (highest first), ties going to the tutor
+        with more weekly overlap in availability.
+        """
+        compiled = CompiledStudent.compile(student)
+
+        # Snapshot the candidates under the lock, since upsert/remove may run on other threads;
+        # compiled tutors are immutable, so scoring happens outside it
+        with self._lock:
+            candidate_ids = set()
+            for subject in compiled.subjects:
+                candidate_ids.update(self._by_subject.get(subject, ()))
+            candidates = [self._tutors[t] for t in candidate_ids if t in self._tutors]
+            roster_size = len(self._tutors)
+        candidates.sort(key=lambda t: t.position)
+
+        scored_tutors = []
+        for tutor in candidates:
+            score = score_compiled(compiled, tutor)
+            if score > 0:
+                scored_tutors.append((tutor.item, score, overlap_minutes(compiled.availability, tutor.availability)))
+
+        logger.debug("Student %s: %d candidate tutors, %d viable of %d",
+                     compiled.student_id, len(candidates), len(scored_tutors), roster_size)
+
+        return [tutor for tutor, score, overlap in sorted(scored_tutors, key=lambda x: (x[1], x[2]), reverse=True)]
+
+    def _upsert(self, tutor: dict):
+        tutor_id = tutor.get("tutor_id")
+        current = self._tutors.get(tutor_id)
+        position = current.position if current else self._next_position
+        if current is None:
+            self._next_position += 1
+        else:
+            self._unlink(current)
+
+        compiled = CompiledTutor.compile(tutor, position)
+        self._tutors[tutor_id] = compiled
+        for subject in compiled.subjects:
+            self._by_subject.setdefault(subject, set()).add(tutor_id)
+
+    def _remove(self, tutor_id: str):
+        current = self._tutors.pop(tutor_id, None)
+        if current is not None:
+            self._unlink(current)
+
+    def _unlink(self, compiled: CompiledTutor):
+        for subject in compiled.subjects:
+            tutor_ids = self._by_subject.get(subject)
+            if tutor_ids is not None:
+                tutor_ids.discard(compiled.tutor_id)
+                if not tutor_ids:
+                    del self._by_subject[subject]
+
+
+# Process-wide index shared by the student service and the match endpoint
+tutor_index = TutorIndex()
@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+from typing import Callable, List
+import logging
+
+from services.metrics import metrics
+from services.tutor_index import TutorIndex, tutor_index
+
+logger = logging.getLogger(__name__)
+
+# Seconds before the roster is re-read from the Tutors table
+TUTOR_ROSTER_TTL = float(os.getenv("TUTOR_ROSTER_TTL", "300"))
+
+
+class TutorRoster:
+    """
+    In-process cache of the Tutors table, kept as a compiled TutorIndex.
+
+    The roster is re-read after TUTOR_ROSTER_TTL seconds or after invalidate(); tutor
+    writes in this process go straight into the index via upsert(), so a profile save
+    normally reads the cached roster instead of scanning the table.
+
+    Every upsert bumps a generation. A scan that started before an upsert may not contain
+    that tutor, so after syncing it the tutors upserted since the scan's generation are
+    applied again instead of being dropped until the next reload. Writes made by other
+    processes are only seen on the next reload.
+    """
+
+    def __init__(self, index: TutorIndex, ttl: float = TUTOR_ROSTER_TTL):
+        self._index = index
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        # Guards the generation and the upserts not yet covered by a scan
+        self._writes_lock = threading.Lock()
+        self._generation = 0
+        self._written = {}  # tutor_id -> (generation of the upsert, tutor)
+
+    def get_index(self, load: Callable[[], List[dict]], refresh: bool = False) -> TutorIndex:
+        """The cached roster, calling `load` for a full tutor list when it is missing or expired"""
+        if not refresh and self._is_fresh():
+            metrics.increment("tutor_roster_hits")
+            return self._index
+
+        with self._lock:
+            # Another request may have reloaded the roster while we waited
+            if not refresh and self._is_fresh():
+                metrics.increment("tutor_roster_hits")
+                return self._index
+
+            metrics.increment("tutor_roster_misses")
+            started = time.monotonic()
+            with self._writes_lock:
+                generation = self._generation
+            tutors = load()
+            with self._writes_lock:
+                self._index.sync(tutors)
+                # Upserted while the scan ran: the scan may hold an older copy or none at all
+                for written_at, tutor in self._written.values():
+                    if written_at > generation:
+                        self._index.upsert(tutor)
+                self._written = {tutor_id: write for tutor_id, write in self._written.items() if write[0] > generation}
+            self._loaded_at = time.monotonic()
+            logger.info("Loaded %d tutors in %.3fs", len(self._index), self._loaded_at - started)
+            return self._index
+
+    def get_tutors(self, load: Callable[[], List[dict]], refresh: bool = False) -> List[dict]:
+        return self.get_index(load, refresh).tutors()
+
+    def upsert(self, tutor: dict):
+        """Write-through for a tutor saved by this process"""
+        with self._writes_lock:
+            self._generation += 1
+            self._written[tutor['tutor_id']] = (self._generation, tutor)
+            self._index.upsert(tutor)
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def _is_fresh(self) -> bool:
+        loaded_at = self._loaded_at
+        return loaded_at is not None and time.monotonic() - loaded_at < self._ttl
+
+
+tutor_roster = TutorRoster(tutor_index)
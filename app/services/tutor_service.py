@@ -1,14 +1,25 @@
-import boto3
+from services.aws_clients import get_table
 from models.tutor_profile import TutorProfile
+from services.tutor_roster import tutor_roster
+from services.dynamo_executor import run_blocking
 
 class TutorService:
-    def __init__(self):
-        self.dynamodb = boto3.resource('dynamodb', region_name='us-west-2')
-        self.table = self.dynamodb.Table('Tutors')
+    @property
+    def table(self):
+        return get_table('Tutors')
 
     def get_tutor(self, tutor_id: str):
         response = self.table.get_item(Key={'tutor_id': tutor_id})
         return response.get('Item')
 
     def add_tutor(self, tutor: TutorProfile):
-        return self.table.put_item(Item=tutor.model_dump())
\ No newline at end of file
+        item = tutor.model_dump()
+        response = self.table.put_item(Item=item)
+        tutor_roster.upsert(item)
+        return response
+
+    async def get_tutor_async(self, tutor_id: str):
+        return await run_blocking(self.get_tutor, tutor_id)
+
+    async def add_tutor_async(self, tutor: TutorProfile):
+        return await run_blocking(self.add_tutor, tutor)
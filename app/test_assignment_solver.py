@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests for the capacity-aware tutor assignment solver
+"""
+import sys
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from services.assignment_solver import UNASSIGNED, reassign_neighborhood, solve_assignment
+from services.batch_matcher import score_matrix
+from services.dynamo_converter import convert_student_to_dynamo_format
+from sample_data import make_population
+
+
+def total_score(scores, assignment):
+    return sum(scores[i, j] for i, j in enumerate(assignment) if j != UNASSIGNED)
+
+
+def assert_feasible(scores, assignment, capacities):
+    for i, j in enumerate(assignment):
+        if j != UNASSIGNED:
+            assert scores[i, j] > 0
+    load = np.bincount(assignment[assignment != UNASSIGNED], minlength=scores.shape[1])
+    assert (load <= np.maximum(capacities, 0)).all()
+
+
+def reference_total(scores, capacities):
+    """Dense Hungarian over seat-expanded columns plus one "unassigned" column per student"""
+    columns = np.repeat(np.arange(scores.shape[1]), np.maximum(capacities, 0))
+    expanded = np.hstack((np.where(scores > 0, scores, 0)[:, columns], np.zeros((scores.shape[0],) * 2)))
+    rows, cols = linear_sum_assignment(expanded, maximize=True)
+    return expanded[rows, cols].sum()
+
+
+def test_solver_is_optimal_and_respects_capacity():
+    rng = np.random.default_rng(3)
+    for _ in range(20):
+        scores = rng.integers(0, 6, size=(12, 5)) * 5
+        scores[rng.random(scores.shape) < 0.4] = 0
+        capacities = rng.integers(0, 4, size=5)
+
+        assignment = solve_assignment(scores, capacities)
+
+        assert_feasible(scores, assignment, capacities)
+        assert total_score(scores, assignment) == reference_total(scores, capacities)
+
+
+def test_popular_tutor_is_not_piled_on():
+    scores = np.array([[30, 20], [30, 20], [30, 20]])
+    assignment = solve_assignment(scores, [1, 5])
+    assert sorted(assignment.tolist()) == [0, 1, 1]
+
+
+def test_neighborhood_update_keeps_assignment_feasible():
+    students, tutors = make_population(11, 150, 40)
+    students = [convert_student_to_dynamo_format(s) for s in students]
+    for tutor in tutors:
+        tutor["max_students"] = 2
+    capacities = np.full(len(tutors), 2)
+    scores = score_matrix(students, tutors)
+
+    assignment = solve_assignment(scores[:-1], capacities)
+    assignment = np.append(assignment, UNASSIGNED)
+
+    updated = reassign_neighborhood(students, tutors, assignment, changed_students=[len(students) - 1])
+
+    assert_feasible(scores, updated, capacities)
+    assert total_score(scores, updated) >= total_score(scores, assignment)
+
+
+if __name__ == "__main__":
+    test_solver_is_optimal_and_respects_capacity()
+    test_popular_tutor_is_not_piled_on()
+    test_neighborhood_update_keeps_assignment_feasible()
+    print("✅ Assignment solver tests passed")
+    sys.exit(0)
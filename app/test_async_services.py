@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Load test for the async DynamoDB layer: concurrent GET /api/students/{id} requests
+against moto with simulated DynamoDB latency must overlap instead of queueing
+behind each other on the event loop, with each worker thread on its own resource.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+
+import boto3
+import httpx
+from fastapi import FastAPI, Request
+from moto import mock_aws
+
+from controllers import student_controller
+from services import aws_clients
+from services.aws_clients import get_client, get_dynamodb, get_table, reset_clients
+from services.dynamo_executor import run_blocking
+
+DYNAMO_LATENCY = 0.1
+REQUESTS = 40
+
+
+def build_app():
+    app = FastAPI()
+    app.include_router(student_controller.router)
+
+    @app.middleware("http")
+    async def fake_auth(request: Request, call_next):
+        request.state.user_id = "tutor1"
+        request.state.user_role = "tutor"
+        return await call_next(request)
+
+    return app
+
+
+def create_students_table():
+    table = boto3.resource("dynamodb", region_name="us-west-2").create_table(
+        TableName="Students",
+        KeySchema=[{"AttributeName": "student_id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "student_id", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    with table.batch_writer() as batch:
+        for i in range(REQUESTS):
+            batch.put_item(Item={
+                "student_id": f"{i:08d}",
+                "display_name": f"Student {i}",
+                "primary_disability": "ADHD",
+                "preferred_subjects": ["Math"],
+                "accommodations_needed": [],
+                "availability": [],
+                "learning_preferences": {"format": "", "style": "", "modality": ""},
+                "additional_info": "",
+            })
+
+
+def add_latency(**kwargs):
+    # Runs on the calling thread, like the network round-trip it stands in for
+    time.sleep(DYNAMO_LATENCY)
+
+
+async def fire_requests(app):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(client.get(f"/api/students/{i:08d}") for i in range(REQUESTS)))
+        return time.perf_counter() - started, responses
+
+
+def test_concurrent_requests_do_not_block_event_loop():
+    with mock_aws():
+        reset_clients()
+        create_students_table()
+        # On the session, so it reaches the shared client that every worker thread's resource wraps
+        aws_clients._get_session().events.register("before-send.dynamodb.GetItem", add_latency)
+
+        elapsed, responses = asyncio.run(fire_requests(build_app()))
+
+    reset_clients()
+
+    assert all(r.status_code == 200 for r in responses)
+    assert {r.json()["student_id"] for r in responses} == {f"{i:08d}" for i in range(REQUESTS)}
+
+    serial = REQUESTS * DYNAMO_LATENCY
+    print(f"{REQUESTS} requests in {elapsed:.2f}s ({REQUESTS / elapsed:.0f} req/s), serial would be {serial:.2f}s")
+    assert elapsed < serial / 4
+
+
+def test_worker_threads_get_their_own_resource():
+    workers = 4
+    barrier = threading.Barrier(workers)
+
+    def resources():
+        # Every call waits for the others, so each runs on a different worker
+        barrier.wait(timeout=5)
+        return get_dynamodb(), get_dynamodb(), get_table("Students")
+
+    async def run():
+        return await asyncio.gather(*(run_blocking(resources) for _ in range(workers)))
+
+    with mock_aws():
+        reset_clients()
+        create_students_table()
+        results = asyncio.run(run())
+        client = get_client("dynamodb")
+    reset_clients()
+
+    assert all(first is second for first, second, _ in results)
+    assert len({id(first) for first, _, _ in results}) == workers
+    assert all(first.meta.client is client and table.meta.client is client for first, _, table in results)
+
+
+if __name__ == "__main__":
+    test_concurrent_requests_do_not_block_event_loop()
+    test_worker_threads_get_their_own_resource()
+    print("✅ Async services load test passed")
+    sys.exit(0)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for the ASGI auth middleware: request.state is filled for routes, public and
+non-API paths need no token, and streamed responses pass through chunk by chunk.
+"""
+import asyncio
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from jose import jwt
+
+from controllers import auth_controller
+from middleware import BearerAuthMiddleware
+from services.jwks_store import jwks_store
+from services.token_cache import token_cache
+from test_jwks_store import KEYS, FakeJwksEndpoint
+
+
+def make_app():
+    app = FastAPI()
+    app.include_router(auth_controller.router)
+    app.add_middleware(BearerAuthMiddleware)
+
+    @app.get("/api/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"data: {i} {time.perf_counter()}\n\n"
+                await asyncio.sleep(0.1)
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    @app.get("/index.html")
+    async def static_page(request: Request):
+        return {"has_user": hasattr(request.state, "user_id")}
+
+    return app
+
+
+async def body_arrivals(app, path, token):
+    """Times at which the app sends each body message, straight off the ASGI interface"""
+    scope = {"type": "http", "http_version": "1.1", "method": "GET", "path": path, "raw_path": path.encode(),
+             "root_path": "", "scheme": "http", "query_string": b"", "server": ("test", 80),
+             "client": ("test", 1234), "headers": [(b"authorization", f"Bearer {token}".encode())]}
+    arrivals = []
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        # The client stays connected until the response is done
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            arrivals.append(time.perf_counter())
+
+    await app(scope, receive, send)
+    return arrivals
+
+
+def test_state_public_paths_and_streaming():
+    token = jwt.encode({"username": "tutor1", "cognito:groups": ["tutor"], "exp": int(time.time()) + 3600},
+                       KEYS["k1"][0], algorithm="RS256", headers={"kid": "k1"})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def run():
+        transport = httpx.ASGITransport(app=make_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            me = await client.get("/api/auth/me", headers=headers)
+            missing = await client.get("/api/auth/me")
+            static = await client.get("/index.html")
+            preflight = await client.options("/api/auth/me")
+        return me, missing, static, preflight, await body_arrivals(transport.app, "/api/stream", token)
+
+    saved_fetch = jwks_store._fetch
+    jwks_store.clear()
+    token_cache.clear()
+    jwks_store._fetch = FakeJwksEndpoint(["k1"])
+    try:
+        me, missing, static, preflight, arrivals = asyncio.run(run())
+    finally:
+        jwks_store._fetch = saved_fetch
+        jwks_store.clear()
+        token_cache.clear()
+
+    assert me.json() == {"user_id": "tutor1", "role": "tutor"}
+    assert missing.status_code == 401 and missing.json() == {"detail": "Authorization header is missing."}
+    assert static.json() == {"has_user": False}
+    assert preflight.status_code != 401
+    # Chunks arrive as they are produced, not in one buffered body
+    assert len(arrivals) >= 2 and arrivals[-1] - arrivals[0] > 0.1
+
+
+if __name__ == "__main__":
+    test_state_public_paths_and_streaming()
+    print("✅ Auth middleware tests passed")
+    sys.exit(0)
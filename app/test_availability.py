@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for availability overlap: touching slots, the end of the week, empty availability,
+DynamoDB-format slots and the overlap-minutes tie-break between equally scored tutors.
+"""
+import sys
+
+from services.dynamo_converter import convert_student_to_dynamo_format
+from services.student_tutor_matcher import (availability_overlap_minutes, has_availability_overlap,
+                                            match_student_to_tutor)
+
+
+def person(*slots, **fields):
+    return {"availability": [{"day": day, "start_time": start, "end_time": end} for day, start, end in slots],
+            **fields}
+
+
+def test_touching_slots_do_not_overlap():
+    student = person(("Monday", "09:00", "10:00"))
+    tutor = person(("Monday", "10:00", "11:00"))
+    assert not has_availability_overlap(student, tutor)
+    assert availability_overlap_minutes(student, tutor) == 0
+
+    tutor = person(("Monday", "09:59", "11:00"))
+    assert has_availability_overlap(student, tutor)
+    assert availability_overlap_minutes(student, tutor) == 1
+
+
+def test_end_of_week():
+    late_sunday = person(("Sunday", "23:00", "24:00"))
+    assert availability_overlap_minutes(late_sunday, person(("Sunday", "22:30", "24:00"))) == 60
+    # The week does not wrap: Sunday night and Monday morning are a week apart
+    assert not has_availability_overlap(late_sunday, person(("Monday", "00:00", "01:00")))
+    # Slots cannot run past midnight, so one that tries is ignored
+    assert not has_availability_overlap(person(("Sunday", "23:00", "01:00")), person(("Sunday", "00:00", "24:00")))
+
+
+def test_empty_availability():
+    tutor = person(("Monday", "09:00", "17:00"))
+    assert not has_availability_overlap(person(), tutor)
+    assert not has_availability_overlap({}, tutor)
+    assert availability_overlap_minutes(person(), person()) == 0
+
+
+def test_overlap_across_formats_and_merged_slots():
+    student = person(("Tuesday", "09:00", "10:00"), ("Tuesday", "09:30", "11:00"), ("Friday", "14:00", "15:00"),
+                     student_id="00000001", display_name="Student 1", primary_disability="ADHD",
+                     accommodations_needed=[], preferred_subjects=["Math"],
+                     learning_preferences={"format": "1-on-1", "modality": "Online", "style": "Visual"})
+    tutor = person(("Tuesday", "10:00", "12:00"), ("Friday", "13:00", "14:30"))
+    assert availability_overlap_minutes(student, tutor) == 90
+    assert availability_overlap_minutes(convert_student_to_dynamo_format(student), tutor) == 90
+
+
+def test_equal_scores_go_to_more_overlap():
+    student = person(("Wednesday", "09:00", "12:00"), student_id="00000001", preferred_subjects=["Math"])
+    tutors = [
+        {**person(("Wednesday", "11:00", "12:00")), "tutor_id": "short", "subjects": ["Math"]},
+        {**person(("Wednesday", "09:00", "12:00")), "tutor_id": "long", "subjects": ["Math"]},
+        {**person(("Wednesday", "12:00", "13:00")), "tutor_id": "touching", "subjects": ["Math"]},
+    ]
+    assert [tutor["tutor_id"] for tutor in match_student_to_tutor(student, tutors)] == ["long", "short"]
+
+
+if __name__ == "__main__":
+    test_touching_slots_do_not_overlap()
+    test_end_of_week()
+    test_empty_availability()
+    test_overlap_across_formats_and_merged_slots()
+    test_equal_scores_go_to_more_overlap()
+    print("✅ Availability tests passed")
+    sys.exit(0)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Parity tests for the vectorized batch matcher against the scalar scorer
+"""
+import sys
+
+from models import StudentProfile
+from models.availability import availability_mask
+from sample_data import make_population
+from services.batch_matcher import best_matches, score_matrix
+from services.dynamo_converter import convert_student_to_dynamo_format
+from services.student_tutor_matcher import calculate_compatibility_score, match_student_to_tutor
+
+
+def test_score_matrix_matches_scalar_scorer():
+    for seed in range(3):
+        students, tutors = make_population(seed, 60, 150)
+        # The scorer sees both formats: DynamoDB students from match_student and plain ones from get_item
+        students = [convert_student_to_dynamo_format(s) for s in students[:30]] + students[30:]
+
+        scores = score_matrix(students, tutors)
+
+        for i, student in enumerate(students):
+            for j, tutor in enumerate(tutors):
+                assert scores[i, j] == calculate_compatibility_score(student, tutor), (seed, i, j)
+
+
+def test_best_matches_agree_with_match_student_to_tutor():
+    students, tutors = make_population(42, 80, 200)
+    students = [convert_student_to_dynamo_format(s) for s in students]
+
+    for student, best in zip(students, best_matches(students, tutors)):
+        matched = match_student_to_tutor(student, tutors)
+        assert best == (matched[0] if matched else None)
+
+
+def test_precomputed_intervals_match_slots():
+    students, tutors = make_population(5, 40, 10)
+    for student in students:
+        saved = StudentProfile(**student).model_dump()
+        assert availability_mask(saved) == availability_mask(student)
+        assert availability_mask(convert_student_to_dynamo_format(saved)) == availability_mask(student)
+
+
+def test_empty_population():
+    students, tutors = make_population(7, 5, 5)
+    assert score_matrix([], tutors).shape == (0, 5)
+    assert score_matrix(students, []).shape == (5, 0)
+    assert best_matches(students, []) == [None] * 5
+
+
+if __name__ == "__main__":
+    test_score_matrix_matches_scalar_scorer()
+    test_best_matches_agree_with_match_student_to_tutor()
+    test_precomputed_intervals_match_slots()
+    test_empty_population()
+    print("✅ Batch matcher parity tests passed")
+    sys.exit(0)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Tests for the Bedrock gateway: bounded concurrency, fast 429s when saturated,
+per-user caps and 504s on slow calls, without tying up the event loop.
+"""
+import asyncio
+import sys
+import threading
+import time
+
+from fastapi import HTTPException
+
+from services.bedrock_gateway import BedrockGateway
+from services.bedrock_service import build_retrieve_and_generate_request, stream_answer
+from services.fake_bedrock import FakeBedrockAgentRuntime
+
+
+class SlowCall:
+    """Blocking call that records how many copies run at once"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+
+    def __call__(self, value=None):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.seconds)
+        with self.lock:
+            self.running -= 1
+        return value
+
+
+async def gather_statuses(calls):
+    results = await asyncio.gather(*calls, return_exceptions=True)
+    return [r.status_code if isinstance(r, HTTPException) else 200 for r in results]
+
+
+def test_concurrency_is_bounded():
+    gateway = BedrockGateway(max_concurrency=3, max_queue=20, max_per_user=5, timeout=5)
+    slow = SlowCall(0.05)
+
+    async def run():
+        return await gather_statuses(gateway.call(f"user{i}", slow, i) for i in range(12))
+
+    statuses = asyncio.run(run())
+    assert statuses == [200] * 12
+    assert slow.peak == 3
+    assert gateway.stats()["running"] == gateway.stats()["waiting"] == 0
+
+
+def test_full_queue_is_rejected_with_429():
+    gateway = BedrockGateway(max_concurrency=2, max_queue=3, max_per_user=10, timeout=5)
+    slow = SlowCall(0.1)
+
+    async def run():
+        started = time.perf_counter()
+        tasks = [asyncio.ensure_future(gateway.call(f"user{i}", slow)) for i in range(10)]
+        await asyncio.sleep(0)
+        statuses = await gather_statuses(tasks)
+        return statuses, time.perf_counter() - started
+
+    statuses, elapsed = asyncio.run(run())
+    # 2 running + 3 queued are served, the rest are turned away without waiting
+    assert statuses.count(200) == 5
+    assert statuses.count(429) == 5
+    assert elapsed < 0.5
+
+
+def test_per_user_cap():
+    gateway = BedrockGateway(max_concurrency=8, max_queue=8, max_per_user=2, timeout=5)
+    slow = SlowCall(0.05)
+
+    async def run():
+        busy_user = [gateway.call("tutor1", slow) for _ in range(4)]
+        others = [gateway.call(f"user{i}", slow) for i in range(3)]
+        return await gather_statuses(busy_user + others)
+
+    assert asyncio.run(run()) == [200, 200, 429, 429, 200, 200, 200]
+
+
+def test_slow_call_times_out_with_504_and_loop_stays_responsive():
+    gateway = BedrockGateway(max_concurrency=1, max_queue=5, max_per_user=5, timeout=0.1)
+    slow = SlowCall(0.3)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        tick_task = asyncio.ensure_future(ticker())
+        statuses = await gather_statuses([gateway.call("tutor1", slow), gateway.call("tutor2", slow)])
+        tick_task.cancel()
+        return statuses, ticks
+
+    statuses, ticks = asyncio.run(run())
+    # The first call runs too long; the second never gets the slot in time
+    assert statuses == [504, 504]
+    assert ticks >= 5
+
+
+def test_timed_out_call_keeps_its_slot_until_its_thread_returns():
+    gateway = BedrockGateway(max_concurrency=1, max_queue=5, max_per_user=5, timeout=0.1)
+    slow = SlowCall(0.3)
+
+    async def run():
+        timed_out = await gather_statuses([gateway.call("tutor1", slow)])
+        held = gateway.stats()["running"]
+        # The next call waits for the abandoned thread instead of running beside it
+        gateway.timeout = 2
+        started = time.perf_counter()
+        served = await gather_statuses([gateway.call("tutor2", slow)])
+        return timed_out + served, held, time.perf_counter() - started
+
+    statuses, held, elapsed = asyncio.run(run())
+    assert statuses == [504, 200]
+    assert held == 1
+    assert slow.peak == 1
+    assert elapsed >= 0.4
+    assert gateway.stats()["running"] == 0
+
+
+def test_stream_holds_a_slot_until_finished():
+    gateway = BedrockGateway(max_concurrency=1, max_queue=0, max_per_user=5, timeout=5)
+    bedrock = FakeBedrockAgentRuntime(chunk_delay=0.005)
+    params = build_retrieve_and_generate_request("hi", "Answer: $search_results$")
+
+    async def run():
+        events = gateway.stream("student1", stream_answer(bedrock, params, "test_chat"))
+        first = await events.__anext__()
+        # Slot is taken and the queue is empty, so another caller is rejected
+        try:
+            gateway.check_admission("student2")
+            rejected = False
+        except HTTPException as e:
+            rejected = e.status_code == 429
+        rest = [event async for event in events]
+        return first, rest, rejected
+
+    first, rest, rejected = asyncio.run(run())
+    assert "session_id" in first
+    assert "".join(event["text"] for event in rest) == bedrock.answer
+    assert rejected
+    assert gateway.stats()["running"] == 0
+
+
+if __name__ == "__main__":
+    test_concurrency_is_bounded()
+    test_full_queue_is_rejected_with_429()
+    test_per_user_cap()
+    test_slow_call_times_out_with_504_and_loop_stays_responsive()
+    test_timed_out_call_keeps_its_slot_until_its_thread_returns()
+    test_stream_holds_a_slot_until_finished()
+    print("✅ Bedrock gateway tests passed")
+    sys.exit(0)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Streaming chat endpoint tests against moto and the fake Bedrock stand-in: the SSE
+stream must carry the same answer as the non-streaming endpoint and record time to
+first token.
+"""
+import json
+import os
+import sys
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+
+import boto3
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from moto import mock_aws
+
+from controllers import student_chatbot_controller
+from dependencies import get_bedrock_agent_runtime
+from services.aws_clients import reset_clients
+from services.fake_bedrock import FAKE_ANSWER, FakeBedrockAgentRuntime
+from services.metrics import metrics
+
+STUDENT_ID = "00000001"
+
+
+def build_app(bedrock):
+    app = FastAPI()
+    app.include_router(student_chatbot_controller.router)
+    app.dependency_overrides[get_bedrock_agent_runtime] = lambda: bedrock
+
+    @app.middleware("http")
+    async def fake_auth(request: Request, call_next):
+        request.state.user_id = STUDENT_ID
+        request.state.user_role = "student"
+        return await call_next(request)
+
+    return app
+
+
+def create_student():
+    table = boto3.resource("dynamodb", region_name="us-west-2").create_table(
+        TableName="Students",
+        KeySchema=[{"AttributeName": "student_id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "student_id", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table.put_item(Item={
+        "student_id": STUDENT_ID,
+        "display_name": "Student 1",
+        "primary_disability": "ADHD",
+        "preferred_subjects": ["Math"],
+        "accommodations_needed": ["Extra time"],
+        "availability": [],
+        "learning_preferences": {"format": "1-on-1", "style": "Visual", "modality": "Online"},
+        "additional_info": "",
+    })
+
+
+def parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_matches_blocking_response():
+    bedrock = FakeBedrockAgentRuntime(first_token_delay=0.02)
+    with mock_aws():
+        reset_clients()
+        create_student()
+        client = TestClient(build_app(bedrock))
+        payload = {"message": "How do I prepare for exams?", "session_id": "session-1"}
+
+        blocking = client.post(f"/api/student-chat/{STUDENT_ID}/chatbot", json=payload)
+        streamed = client.post(f"/api/student-chat/{STUDENT_ID}/chatbot/stream", json=payload)
+    reset_clients()
+
+    assert blocking.status_code == 200
+    assert streamed.status_code == 200
+    assert streamed.headers["content-type"].startswith("text/event-stream")
+
+    events = parse_sse(streamed.text)
+    assert events[0] == ("session", {"session_id": "session-1"})
+    assert events[-1] == ("done", {})
+    tokens = [data["text"] for name, data in events if name == "token"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == blocking.json()["response"] == FAKE_ANSWER
+
+    # Both endpoints send Bedrock the same request
+    assert bedrock.requests[0] == bedrock.requests[1]
+
+    ttft = metrics.snapshot()["observations"]["student_chat_ttft_seconds"]
+    assert ttft["count"] >= 1 and ttft["max"] >= 0.02
+
+
+def test_stream_reports_bedrock_failure_as_error_event():
+    class FailingBedrock(FakeBedrockAgentRuntime):
+        def retrieve_and_generate_stream(self, **request_params):
+            raise RuntimeError("throttled")
+
+    with mock_aws():
+        reset_clients()
+        create_student()
+        client = TestClient(build_app(FailingBedrock()))
+        response = client.post(f"/api/student-chat/{STUDENT_ID}/chatbot/stream", json={"message": "Hi"})
+        missing = client.post("/api/student-chat/someone-else/chatbot/stream", json={"message": "Hi"})
+    reset_clients()
+
+    assert response.status_code == 200
+    assert parse_sse(response.text) == [("error", {"detail": "Failed to generate response"})]
+    # Access checks still happen before the stream starts
+    assert missing.status_code == 403
+
+
+if __name__ == "__main__":
+    test_stream_matches_blocking_response()
+    test_stream_reports_bedrock_failure_as_error_event()
+    print("✅ Chat streaming tests passed")
+    sys.exit(0)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests for the scan helpers against moto, with more items than fit in one page: every
+LastEvaluatedKey is followed, parallel segments return each item once, a closed stream
+stops its workers, and cursors round-trip while tampered ones are a 400.
+"""
+import base64
+import json
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+
+import boto3
+from fastapi.testclient import TestClient
+from moto import mock_aws
+
+from services.aws_clients import reset_clients
+from services.dynamo_scan import decode_cursor, encode_cursor, scan_all, scan_items, scan_page, scan_pages
+from test_async_services import build_app
+
+ITEMS = 230
+PAGE_SIZE = 25
+
+
+def create_students():
+    table = boto3.resource("dynamodb", region_name="us-west-2").create_table(
+        TableName="Students",
+        KeySchema=[{"AttributeName": "student_id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "student_id", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    with table.batch_writer() as batch:
+        for i in range(ITEMS):
+            batch.put_item(Item={"student_id": f"{i:08d}", "display_name": f"Student {i}", "grade": i % 12})
+    return table
+
+
+def expected_ids():
+    return {f"{i:08d}" for i in range(ITEMS)}
+
+
+def test_scan_pages_follows_last_evaluated_key():
+    with mock_aws():
+        reset_clients()
+        table = create_students()
+        pages = list(scan_pages(table, projection=["student_id"], page_size=PAGE_SIZE))
+    reset_clients()
+
+    assert len(pages) >= ITEMS // PAGE_SIZE
+    assert all(last_key for _, last_key in pages[:-1]) and pages[-1][1] is None
+    ids = [item["student_id"] for items, _ in pages for item in items]
+    assert len(ids) == ITEMS and set(ids) == expected_ids()
+    assert set(pages[0][0][0]) == {"student_id"}
+
+
+def test_parallel_segments_return_each_item_once():
+    with mock_aws():
+        reset_clients()
+        table = create_students()
+        serial = scan_all(table, segments=1)
+        parallel = list(scan_items(table, segments=4, page_size=PAGE_SIZE))
+    reset_clients()
+
+    assert len(serial) == ITEMS
+    assert sorted(item["student_id"] for item in parallel) == sorted(expected_ids())
+    # Numbers come back as plain Python values, not DynamoDB attribute maps
+    assert {item["grade"] for item in parallel} == set(range(12))
+
+
+def test_closing_the_stream_stops_the_workers():
+    with mock_aws():
+        reset_clients()
+        table = create_students()
+        stream = scan_items(table, segments=4, page_size=5)
+        first = [next(stream) for _ in range(3)]
+        started = time.perf_counter()
+        stream.close()
+        elapsed = time.perf_counter() - started
+    reset_clients()
+
+    assert len(first) == 3
+    assert elapsed < 5
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith("dynamo-scan")]
+
+
+def test_cursor_round_trip():
+    with mock_aws():
+        reset_clients()
+        table = create_students()
+        seen, cursor, pages = [], None, 0
+        while True:
+            items, cursor = scan_page(table, 40, cursor)
+            seen.extend(item["student_id"] for item in items)
+            pages += 1
+            if cursor is None:
+                break
+            assert decode_cursor(cursor) == {"student_id": items[-1]["student_id"]}
+    reset_clients()
+
+    assert pages >= ITEMS // 40
+    assert len(seen) == ITEMS and set(seen) == expected_ids()
+    assert encode_cursor(None) is None and decode_cursor(None) is None
+
+
+def tampered(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+def test_tampered_cursor_is_a_400():
+    with mock_aws():
+        reset_clients()
+        create_students()
+        client = TestClient(build_app())
+        first = client.get("/api/students/", params={"limit": 10})
+        statuses = [client.get("/api/students/", params={"limit": 10, "cursor": cursor}).status_code
+                    for cursor in ["not base64!", tampered([1, 2]), tampered({"student_id": "x"}),
+                                   tampered({"student_id": {"Z": 1}})]]
+    reset_clients()
+
+    assert first.status_code == 200 and len(first.json()["items"]) == 10 and first.json()["next_cursor"]
+    assert statuses == [400] * 4
+
+
+if __name__ == "__main__":
+    test_scan_pages_follows_last_evaluated_key()
+    test_parallel_segments_return_each_item_once()
+    test_closing_the_stream_stops_the_workers()
+    test_cursor_round_trip()
+    test_tampered_cursor_is_a_400()
+    print("✅ DynamoDB scan tests passed")
+    sys.exit(0)
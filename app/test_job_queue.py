@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for the background job queue: deduplication per key, retries with backoff,
+per-key serialization and failure reporting.
+"""
+import asyncio
+import sys
+
+from services.job_queue import FAILED, SUCCEEDED, JobQueue
+
+
+def test_pending_jobs_are_deduplicated_per_key():
+    queue = JobQueue(workers=2, backoff=0.01)
+    calls = []
+
+    async def handler(student_id):
+        calls.append(student_id)
+        await asyncio.sleep(0.01)
+        return {"student_id": student_id}
+
+    queue.register("plan", handler)
+
+    async def run():
+        jobs = [queue.enqueue("plan", "s1", "s1") for _ in range(5)]
+        other = queue.enqueue("plan", "s2", "s2")
+        await queue.join()
+        return jobs, other
+
+    jobs, other = asyncio.run(run())
+    assert len({job.job_id for job in jobs}) == 1
+    assert other.job_id != jobs[0].job_id
+    assert sorted(calls) == ["s1", "s2"]
+    assert queue.get(jobs[0].job_id).status == SUCCEEDED
+    assert queue.get(jobs[0].job_id).result == {"student_id": "s1"}
+
+
+def test_same_key_never_runs_concurrently():
+    queue = JobQueue(workers=4, backoff=0.01)
+    running, peak, calls = set(), [0], []
+
+    async def handler(key):
+        running.add(key)
+        peak[0] = max(peak[0], len(running))
+        calls.append(key)
+        await asyncio.sleep(0.02)
+        running.discard(key)
+
+    queue.register("match", handler)
+
+    async def run():
+        first = queue.enqueue("match", "s1", "s1")
+        await asyncio.sleep(0.005)
+        # The first job is running: a new one is queued behind it instead of joining it
+        second = queue.enqueue("match", "s1", "s1")
+        joined = queue.enqueue("match", "s1", "s1", join_running=True)
+        await queue.join()
+        return first, second, joined
+
+    first, second, joined = asyncio.run(run())
+    assert second.job_id != first.job_id
+    assert joined.job_id == second.job_id
+    assert calls == ["s1", "s1"]
+    assert peak[0] == 1
+
+
+def test_failures_are_retried_with_backoff():
+    queue = JobQueue(workers=1, max_attempts=3, backoff=0.01)
+    attempts = []
+
+    async def flaky(key):
+        attempts.append(asyncio.get_running_loop().time())
+        if len(attempts) < 3:
+            raise RuntimeError("throttled")
+        return "done"
+
+    async def broken(key):
+        raise ValueError("bad input")
+
+    queue.register("flaky", flaky)
+    queue.register("broken", broken)
+
+    async def run():
+        ok = queue.enqueue("flaky", "s1", "s1")
+        failed = queue.enqueue("broken", "s1", "s1")
+        await queue.join()
+        return ok, failed
+
+    ok, failed = asyncio.run(run())
+    assert queue.get(ok.job_id).status == SUCCEEDED
+    assert queue.get(ok.job_id).attempts == 3
+    # Second retry waits twice as long as the first
+    assert attempts[2] - attempts[1] >= attempts[1] - attempts[0] >= 0.01
+
+    job = queue.get(failed.job_id)
+    assert job.status == FAILED and job.attempts == 3
+    assert job.error == "ValueError: bad input"
+    assert "args" not in job.to_dict()
+
+
+if __name__ == "__main__":
+    test_pending_jobs_are_deduplicated_per_key()
+    test_same_key_never_runs_concurrently()
+    test_failures_are_retried_with_backoff()
+    print("✅ Job queue tests passed")
+    sys.exit(0)
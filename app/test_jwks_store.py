@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Tests for the process-wide JWKS store: one fetch for concurrent requests, refresh ahead
+of expiry without blocking, refresh on a rotated kid, and cached keys surviving a failed
+refresh. Keys are generated locally, so nothing talks to Cognito.
+"""
+import asyncio
+import sys
+import time
+
+from jose import jwk, jwt
+from jose.exceptions import JWTError
+
+from sample_data import make_signing_key
+from services import jwks_store as jwks_module
+from services.jwks_store import JwksStore
+from services.jwt_service import JwtService
+
+KEYS = {kid: make_signing_key(kid) for kid in ("k1", "k2")}
+
+
+class FakeJwksEndpoint:
+    def __init__(self, kids, delay=0.0):
+        self.kids = list(kids)
+        self.delay = delay
+        self.calls = 0
+        self.fail = False
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise OSError("JWKS endpoint unreachable")
+        return [KEYS[kid][1] for kid in self.kids]
+
+
+def test_concurrent_requests_share_one_fetch():
+    endpoint = FakeJwksEndpoint(["k1"], delay=0.05)
+    store = JwksStore(fetch=endpoint)
+
+    async def run():
+        return await asyncio.gather(*(store.get_key("k1") for _ in range(20)))
+
+    keys = asyncio.run(run())
+    assert endpoint.calls == 1
+    assert all(key is keys[0] for key in keys)
+    assert isinstance(keys[0], jwk.Key)
+
+
+def test_refresh_ahead_does_not_block_requests():
+    endpoint = FakeJwksEndpoint(["k1"], delay=0.2)
+    store = JwksStore(fetch=endpoint, ttl=10, refresh_ahead=5, min_refresh_interval=0)
+
+    async def run():
+        await store.get_key("k1")
+        # Inside the refresh-ahead window: served from memory while a fetch starts
+        store._fetched_at -= 6
+        started = time.perf_counter()
+        await store.get_key("k1")
+        elapsed = time.perf_counter() - started
+        await store._refresh_task
+        return elapsed
+
+    elapsed = asyncio.run(run())
+    assert elapsed < 0.1
+    assert endpoint.calls == 2
+    assert store.stats()["age_seconds"] < 1
+
+
+def test_unknown_kid_refreshes_at_most_once_per_interval():
+    endpoint = FakeJwksEndpoint(["k1"])
+    store = JwksStore(fetch=endpoint, min_refresh_interval=60)
+
+    async def run():
+        await store.get_key("k1")
+        store._attempted_at -= 61
+        # The pool rotated to k2
+        endpoint.kids = ["k1", "k2"]
+        rotated = await store.get_key("k2")
+
+        # Made-up kids are rejected without another fetch
+        for _ in range(5):
+            try:
+                await store.get_key("forged")
+                assert False, "expected JWTError"
+            except JWTError:
+                pass
+        return rotated
+
+    assert asyncio.run(run()).to_dict()["n"] == KEYS["k2"][1]["n"]
+    assert endpoint.calls == 2
+
+
+def test_failed_refresh_keeps_cached_keys():
+    endpoint = FakeJwksEndpoint(["k1"])
+    store = JwksStore(fetch=endpoint, ttl=10, min_refresh_interval=0)
+
+    async def run():
+        await store.get_key("k1")
+        store._fetched_at -= 11
+        endpoint.fail = True
+        return await store.get_key("k1")
+
+    assert asyncio.run(run()) is not None
+    assert endpoint.calls == 2
+
+
+def test_access_tokens_verify_against_the_shared_store():
+    endpoint = FakeJwksEndpoint(["k1", "k2"])
+    saved = jwks_module.jwks_store._fetch
+    jwks_module.jwks_store.clear()
+    jwks_module.jwks_store._fetch = endpoint
+    try:
+        token = jwt.encode({"username": "00000001", "exp": int(time.time()) + 3600}, KEYS["k2"][0],
+                           algorithm="RS256", headers={"kid": "k2"})
+
+        async def run():
+            # A fresh JwtService per request, as the middleware does, still reuses the keys
+            return [await JwtService().decode_access_token(token) for _ in range(3)]
+
+        claims = asyncio.run(run())
+    finally:
+        jwks_module.jwks_store._fetch = saved
+        jwks_module.jwks_store.clear()
+
+    assert [c["username"] for c in claims] == ["00000001"] * 3
+    assert endpoint.calls == 1
+
+
+if __name__ == "__main__":
+    test_concurrent_requests_share_one_fetch()
+    test_refresh_ahead_does_not_block_requests()
+    test_unknown_kid_refreshes_at_most_once_per_interval()
+    test_failed_refresh_keeps_cached_keys()
+    test_access_tokens_verify_against_the_shared_store()
+    print("✅ JWKS store tests passed")
+    sys.exit(0)
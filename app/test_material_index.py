@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-student BM25 passage index: relevant passages rank first, files are
+added and removed incrementally, and searches catch up with files changed elsewhere.
+"""
+import sys
+
+from services.material_index import MaterialIndex, PassageIndex, split_passages
+
+PHOTOSYNTHESIS = "Photosynthesis turns light, water and carbon dioxide into glucose and oxygen inside chloroplasts."
+CELLS = "Mitochondria release energy from glucose during cellular respiration."
+ALGEBRA = "To solve a linear equation, isolate the variable by doing the same operation on both sides."
+
+
+def test_split_passages_overlap_and_cover_all_words():
+    words = [f"w{i}" for i in range(200)]
+    passages = split_passages(" ".join(words), passage_words=80)
+    assert all(len(passage.split()) <= 80 for passage in passages)
+    assert set(" ".join(passages).split()) == set(words)
+    assert passages[1].split()[0] == "w60"
+    assert split_passages("") == []
+    assert split_passages("one two", passage_words=80) == ["one two"]
+
+
+def test_most_relevant_passage_ranks_first():
+    index = PassageIndex()
+    index.add_file("bio", PHOTOSYNTHESIS)
+    index.add_file("cells", CELLS)
+    index.add_file("math", ALGEBRA)
+
+    results = index.search("Where does photosynthesis happen and what does it make?")
+    assert results[0]["file_id"] == "bio"
+    assert {result["file_id"] for result in index.search("glucose")} == {"cells", "bio"}
+    assert index.search("linear equation")[0]["file_id"] == "math"
+    assert index.search("the of and") == []
+
+
+def test_files_are_added_and_removed_incrementally():
+    index = PassageIndex()
+    index.add_file("bio", PHOTOSYNTHESIS)
+    index.add_file("math", ALGEBRA)
+    index.remove_file("bio")
+
+    assert index.file_ids() == {"math"}
+    assert index.search("photosynthesis") == []
+    assert len(index) == 1
+    index.add_file("bio", PHOTOSYNTHESIS)
+    assert index.search("photosynthesis")[0]["file_id"] == "bio"
+
+
+def test_search_syncs_with_manifests_and_reads_only_missing_files():
+    texts = {"bio": PHOTOSYNTHESIS, "math": ALGEBRA}
+    reads = []
+
+    def read_file(manifest):
+        reads.append(manifest["file_id"])
+        return texts[manifest["file_id"]]
+
+    index = MaterialIndex(max_students=1)
+    results = index.search("s1", "photosynthesis", [{"file_id": "bio"}], read_file)
+    assert results[0]["file_id"] == "bio"
+
+    # Uploaded here: written through, so the next search reads nothing
+    index.add_file("s1", "math", ALGEBRA)
+    assert index.search("s1", "equation", [{"file_id": "bio"}, {"file_id": "math"}], read_file)[0]["file_id"] == "math"
+    assert reads == ["bio"]
+
+    # Deleted elsewhere: dropped when the manifests no longer list it
+    assert index.search("s1", "photosynthesis", [{"file_id": "math"}], read_file) == []
+
+    # Least recently used students are evicted and rebuilt on their next search
+    index.search("s2", "equation", [], read_file)
+    assert index.stats() == {"students": 1, "passages": 0}
+    index.search("s1", "equation", [{"file_id": "math"}], read_file)
+    assert reads == ["bio", "math"]
+
+
+if __name__ == "__main__":
+    test_split_passages_overlap_and_cover_all_words()
+    test_most_relevant_passage_ranks_first()
+    test_files_are_added_and_removed_incrementally()
+    test_search_syncs_with_manifests_and_reads_only_missing_files()
+    print("✅ Material index tests passed")
+    sys.exit(0)
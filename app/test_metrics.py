@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for the metrics export: labelled series and histogram buckets in the Prometheus
+format, request latency labelled by route template, stage timing, and /metrics served
+only when enabled and with the scrape token.
+"""
+import asyncio
+import sys
+
+import httpx
+from fastapi import FastAPI
+
+from controllers import metrics_controller
+from middleware import RequestMetricsMiddleware
+from services.metrics import Metrics, metrics
+from services.tracing import stage
+
+
+def test_prometheus_format():
+    registry = Metrics(buckets=(0.1, 1.0))
+    registry.increment("response_cache_hits", 3)
+    registry.increment("response_cache_misses")
+    registry.increment("bedrock_input_tokens", 120, route="tutor_chat")
+    registry.observe("stage_seconds", 0.05, stage="auth")
+    registry.observe("stage_seconds", 0.5, stage="auth")
+    registry.observe("stage_seconds", 5.0, stage="auth")
+
+    lines = registry.prometheus().splitlines()
+
+    assert "# TYPE response_cache_hits_total counter" in lines
+    assert "response_cache_hits_total 3" in lines
+    assert 'bedrock_input_tokens_total{route="tutor_chat"} 120' in lines
+    assert 'cache_hit_ratio{cache="response_cache"} 0.750000' in lines
+    assert "# TYPE stage_seconds histogram" in lines
+    # Buckets are cumulative and +Inf equals the count
+    assert 'stage_seconds_bucket{stage="auth",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="auth",le="1.0"} 2' in lines
+    assert 'stage_seconds_bucket{stage="auth",le="+Inf"} 3' in lines
+    assert 'stage_seconds_count{stage="auth"} 3' in lines
+    assert registry.get("bedrock_input_tokens", route="tutor_chat") == 120
+
+
+def enable_metrics(token=""):
+    saved = metrics_controller.METRICS_ENABLED, metrics_controller.METRICS_TOKEN
+    metrics_controller.METRICS_ENABLED, metrics_controller.METRICS_TOKEN = True, token
+    return saved
+
+
+def test_route_labels_and_stages():
+    saved = enable_metrics()
+    app = FastAPI()
+    app.include_router(metrics_controller.router)
+    app.add_middleware(RequestMetricsMiddleware)
+
+    @app.get("/api/chat/{student_id}/chat")
+    async def chat(student_id: str):
+        with stage("test_stage"):
+            await asyncio.sleep(0.01)
+        return {"student_id": student_id}
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for student_id in ("s1", "s2"):
+                await client.get(f"/api/chat/{student_id}/chat")
+            await client.get("/nowhere")
+            return await client.get("/metrics")
+
+    try:
+        response = asyncio.run(run())
+    finally:
+        metrics_controller.METRICS_ENABLED, metrics_controller.METRICS_TOKEN = saved
+    text = response.text
+
+    assert response.headers["content-type"].startswith("text/plain")
+    # One series for the template, not one per student
+    assert 'http_request_seconds_count{method="GET",route="/api/chat/{student_id}/chat",status="200"} 2' in text
+    assert 'route="/api/chat/s1/chat"' not in text
+    assert 'http_request_seconds_count{method="GET",route="unmatched",status="404"} 1' in text
+
+    timing = metrics.snapshot()["observations"]['stage_seconds{stage="test_stage"}']
+    assert timing["count"] == 2 and timing["mean"] >= 0.01
+
+
+def test_metrics_endpoint_needs_enabling_and_the_token():
+    app = FastAPI()
+    app.include_router(metrics_controller.router)
+
+    async def scrape(**headers):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/metrics", headers=headers)
+
+    saved = enable_metrics(token="scrape-secret")
+    try:
+        metrics_controller.METRICS_ENABLED = False
+        disabled = asyncio.run(scrape(Authorization="Bearer scrape-secret"))
+        metrics_controller.METRICS_ENABLED = True
+        statuses = [asyncio.run(scrape(**headers)).status_code
+                    for headers in [{}, {"Authorization": "Bearer wrong"},
+                                    {"Authorization": "Bearer scrape-secret"}]]
+    finally:
+        metrics_controller.METRICS_ENABLED, metrics_controller.METRICS_TOKEN = saved
+
+    assert disabled.status_code == 404
+    assert statuses == [401, 401, 200]
+
+
+if __name__ == "__main__":
+    test_prometheus_format()
+    test_route_labels_and_stages()
+    test_metrics_endpoint_needs_enabling_and_the_token()
+    print("✅ Metrics tests passed")
+    sys.exit(0)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for the prompt compiler: compiled templates render like str.format, material is
+cut at word boundaries to the room left, and chat prompts stay within their token budget
+with the examples closest to the question.
+"""
+import sys
+
+from controllers.chat_controller import EXAMPLE_BLOCKS, build_tutor_chat_prompt
+from controllers.student_chatbot_controller import build_chatbot_prompt
+from services.prompt_compiler import CompiledPrompt, PromptBudget, estimate_tokens, rank_by_overlap, truncate_to_tokens
+from services.study_plan_service import build_prompt
+
+STUDENT = {
+    "primary_disability": "Dyslexia", "accommodations_needed": ["Extra time", "Audio books"],
+    "learning_preferences": {"format": "1-on-1", "style": "Auditory", "modality": "Online"},
+}
+TUTOR = {"tutoring_style": "Patient", "subjects": ["Biology"], "accommodation_skills": ["Dyslexia"]}
+
+
+def test_compiled_template_matches_format():
+    template = "Hello {name}, you study {subject}.\n{name}!"
+    compiled = CompiledPrompt(template)
+    assert compiled.render(name="Ana", subject="Math") == template.format(name="Ana", subject="Math")
+    assert compiled.slots == ["name", "subject", "name"]
+    assert compiled.fixed_tokens == estimate_tokens("Hello , you study .\n!")
+
+
+def test_truncation_and_budget():
+    text = "photosynthesis happens in the chloroplasts of plant cells"
+    assert truncate_to_tokens(text, 100) == text
+    cut = truncate_to_tokens(text, 8)
+    assert cut == "photosynthesis happens in the..." and estimate_tokens(cut) <= 8
+    assert truncate_to_tokens(text, 0) == ""
+
+    budget = PromptBudget(10)
+    assert budget.take("x" * 40) and budget.remaining == 0
+    assert not budget.take("y")
+    assert PromptBudget(20).fit(text * 10, reserve=14).endswith("...")
+
+
+def test_tutor_prompt_stays_within_budget():
+    passages = [{"text": " ".join(["chloroplast"] * 120)} for _ in range(3)]
+    for budget in (600, 900, 1500):
+        prompt = build_tutor_chat_prompt(STUDENT, TUTOR, "How can I adapt reading for dyslexia?", "Biology",
+                                         passages=passages, token_budget=budget)
+        assert estimate_tokens(prompt) <= budget
+        assert "STUDENT: Dyslexia | Auditory | 1-on-1 | Extra time, Audio books" in prompt
+        assert "TUTOR: Patient | Biology | Dyslexia" in prompt
+        # Material is trimmed before the examples are dropped altogether
+        assert "MATERIAL:\n- chloroplast" in prompt and "<example>" in prompt
+        assert prompt.rstrip().endswith("Assistant:")
+
+    small = build_tutor_chat_prompt(STUDENT, None, "hi", "Biology", class_material="Cells divide. " * 500,
+                                    token_budget=600)
+    large = build_tutor_chat_prompt(STUDENT, None, "hi", "Biology", class_material="Cells divide. " * 500,
+                                    token_budget=1500)
+    assert small.count("Cells divide.") < large.count("Cells divide.")
+
+
+def test_examples_closest_to_the_question_come_first():
+    prompt = build_tutor_chat_prompt(STUDENT, TUTOR, "The student gets frustrated halfway, what should I do?",
+                                     "Biology")
+    assert "H: What should I do if the student gets frustrated halfway through?" in prompt
+    assert prompt.count("<example>") == 2
+    assert rank_by_overlap("", EXAMPLE_BLOCKS) == [block for _, block in EXAMPLE_BLOCKS]
+
+
+def test_chatbot_and_plan_prompts():
+    prompt = build_chatbot_prompt(STUDENT, "When is my next session?")
+    assert "- Accommodations: Extra time, Audio books\n$search_results$" in prompt
+    assert "{" not in prompt
+
+    plan_query = build_prompt(STUDENT, TUTOR, "Biology", "Mitosis " * 1000, token_budget=120)
+    assert estimate_tokens(plan_query) <= 120
+    assert "Material: Mitosis" in plan_query and plan_query.endswith("Be concise and specific.")
+
+
+if __name__ == "__main__":
+    test_compiled_template_matches_format()
+    test_truncation_and_budget()
+    test_tutor_prompt_stays_within_budget()
+    test_examples_closest_to_the_question_come_first()
+    test_chatbot_and_plan_prompts()
+    print("✅ Prompt compiler tests passed")
+    sys.exit(0)
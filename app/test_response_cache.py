@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Tests for the semantic response cache and its use in the tutor chat endpoint, also for
+students whose uploaded material puts question-specific passages into the prompt
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+
+import boto3
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from moto import mock_aws
+
+from controllers import chat_controller
+from controllers.chat_controller import ChatRequest, prepare_tutor_chat
+from dependencies import get_bedrock_agent_runtime
+from services.aws_clients import reset_clients
+from services.bedrock_service import build_retrieve_and_generate_request
+from models import StudentFile
+from services.fake_bedrock import FakeBedrockAgentRuntime
+from services.material_index import material_index
+from services.metrics import metrics
+from services.response_cache import ResponseCache, request_signature, response_cache
+from services.student_file_service import StudentFileService
+from services.student_service import StudentService
+from services.tutor_service import TutorService
+
+ADHD = {"primary_disability": "ADHD", "accommodations_needed": ["Extra time", "Frequent breaks"],
+        "learning_preferences": {"format": "1-on-1", "style": "Visual", "modality": "Online"}}
+DYSLEXIA = {"primary_disability": "Dyslexia", "accommodations_needed": ["Text-to-speech software"],
+            "learning_preferences": {"format": "1-on-1", "style": "Reading/Writing", "modality": "Online"}}
+
+
+def request(question, prompt="SUBJECT: Math\n$search_results$", session_id=None):
+    return build_retrieve_and_generate_request(question, prompt, session_id)
+
+
+def signature(student=ADHD, subject="Math", prompt="SUBJECT: Math\n$search_results$"):
+    return request_signature(request("", prompt), student, subject)
+
+
+def test_reworded_question_hits():
+    cache = ResponseCache()
+    cache.store(request("How do I keep an ADHD student focused?"), signature(), "Short segments and timers.")
+
+    assert cache.lookup(request("how can I keep my ADHD student focused"), signature()) == "Short segments and timers."
+    assert cache.lookup(request("How do I keep an ADHD student motivated?"), signature()) is None
+    assert cache.lookup(request("What accommodations help with exams?"), signature()) is None
+
+
+def test_profile_subject_and_session_are_part_of_the_key():
+    cache = ResponseCache()
+    cache.store(request("How do I keep the student focused?"), signature(), "Short segments and timers.")
+
+    # Same question for a student with a different profile, or about another subject, needs its own answer
+    assert cache.lookup(request("How do I keep the student focused?"), signature(DYSLEXIA)) is None
+    assert cache.lookup(request("How do I keep the student focused?"), signature(subject="Physics")) is None
+    # Follow-ups inside a Bedrock session are never served from or stored in the cache
+    assert cache.lookup(request("How do I keep the student focused?", session_id="s1"), signature()) is None
+    cache.store(request("And for homework?", session_id="s1"), signature(), "Checklists.")
+    assert len(cache) == 1
+
+
+def test_signature_ignores_the_prompt_text_and_normalizes_the_profile():
+    # Passages and examples in the prompt are picked per question; they do not split answers
+    assert signature(prompt="MATERIAL:\n- Plan each lesson\n$search_results$") == signature()
+    reordered = {**ADHD, "primary_disability": " adhd", "accommodations_needed": ["frequent breaks", "Extra time"]}
+    assert signature(reordered, subject="math ") == signature()
+
+
+def test_ttl_and_lru_eviction():
+    cache = ResponseCache(max_size=2, ttl=0.05)
+    cache.store(request("How do I keep the student focused?"), signature(), "focus")
+    time.sleep(0.06)
+    assert cache.lookup(request("How do I keep the student focused?"), signature()) is None
+    assert len(cache) == 0
+
+    cache = ResponseCache(max_size=2, ttl=60)
+    cache.store(request("How do I keep the student focused?"), signature(), "focus")
+    cache.store(request("What helps with reading assignments?"), signature(), "reading")
+    # Touch the first entry so the second is the least recently used
+    assert cache.lookup(request("How do I keep the student focused?"), signature()) == "focus"
+    cache.store(request("How should I structure exam preparation?"), signature(), "exams")
+
+    assert len(cache) == 2
+    assert cache.lookup(request("How do I keep the student focused?"), signature()) == "focus"
+    assert cache.lookup(request("What helps with reading assignments?"), signature()) is None
+
+
+def create_tables():
+    dynamodb = boto3.resource("dynamodb", region_name="us-west-2")
+    for name, key in [("Students", "student_id"), ("Tutors", "tutor_id"), ("StudentFiles", "student_id"),
+                      ("MaterialContents", "content_hash")]:
+        dynamodb.create_table(
+            TableName=name,
+            KeySchema=[{"AttributeName": key, "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": key, "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+    dynamodb.create_table(
+        TableName="StudentFileChunks",
+        KeySchema=[{"AttributeName": "file_id", "KeyType": "HASH"}, {"AttributeName": "chunk", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "file_id", "AttributeType": "S"},
+                              {"AttributeName": "chunk", "AttributeType": "N"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    for i in range(2):
+        dynamodb.Table("Students").put_item(Item={
+            "student_id": f"0000000{i}",
+            "display_name": f"Student {i}",
+            "primary_disability": "ADHD",
+            "preferred_subjects": ["Math"],
+            "accommodations_needed": ["Extra time"],
+            "availability": [],
+            "learning_preferences": {"format": "1-on-1", "style": "Visual", "modality": "Online"},
+            "additional_info": "",
+        })
+
+
+def build_app(bedrock):
+    app = FastAPI()
+    app.include_router(chat_controller.router)
+    app.dependency_overrides[get_bedrock_agent_runtime] = lambda: bedrock
+
+    @app.middleware("http")
+    async def fake_auth(request: Request, call_next):
+        request.state.user_id = "tutor1"
+        request.state.user_role = "tutor"
+        return await call_next(request)
+
+    return app
+
+
+def prompt_of(request_params):
+    return (request_params["retrieveAndGenerateConfiguration"]["knowledgeBaseConfiguration"]
+            ["generationConfiguration"]["promptTemplate"]["textPromptTemplate"])
+
+
+def test_chat_endpoint_answers_repeats_from_cache():
+    bedrock = FakeBedrockAgentRuntime(first_token_delay=0.05)
+    response_cache.clear()
+    hits_before = metrics.get("response_cache_hits")
+    with mock_aws():
+        reset_clients()
+        create_tables()
+        client = TestClient(build_app(bedrock))
+        first = client.post("/api/chat/00000000/chat", json={"message": "How do I keep an ADHD student focused?"})
+        # Another student with the same profile, asked slightly differently
+        started = time.perf_counter()
+        second = client.post("/api/chat/00000001/chat", json={"message": "How can I keep my ADHD student focused?"})
+        elapsed = time.perf_counter() - started
+        in_session = client.post("/api/chat/00000001/chat",
+                                 json={"message": "How can I keep my ADHD student focused?", "session_id": "s1"})
+    reset_clients()
+    response_cache.clear()
+
+    assert first.status_code == second.status_code == in_session.status_code == 200
+    assert second.json()["response"] == first.json()["response"]
+    assert elapsed < 0.05
+    assert len(bedrock.requests) == 2
+    assert metrics.get("response_cache_hits") == hits_before + 1
+
+
+def test_rewordings_hit_for_a_student_with_material():
+    bedrock = FakeBedrockAgentRuntime()
+    questions = ["How do I keep an ADHD student focused during the lesson?",
+                 "How can I keep my ADHD student focused during lessons?"]
+    response_cache.clear()
+    material_index.clear()
+    with mock_aws():
+        reset_clients()
+        create_tables()
+        # Long enough for several passages: one wording matches the first half, the other the second
+        material = ("Plan each lesson around one goal and a visible timer. " * 10 +
+                    "Short lessons with movement breaks keep attention up. " * 10)
+        StudentFileService().save_file(StudentFile(student_id="00000000", filename="plan.txt",
+                                                   content_type="text/plain", content=material,
+                                                   size_bytes=len(material)))
+        client = TestClient(build_app(bedrock))
+        answers = [client.post("/api/chat/00000000/chat", json={"message": question}) for question in questions]
+        # What each wording would have sent to Bedrock
+        prompts = [prompt_of(prepare_tutor_chat("00000000", ChatRequest(message=question), "tutor1",
+                                                StudentService(), TutorService(), StudentFileService())[0])
+                   for question in questions]
+    reset_clients()
+    response_cache.clear()
+    material_index.clear()
+
+    assert "MATERIAL:" in prompts[0] and prompts[0] != prompts[1]
+    assert [answer.status_code for answer in answers] == [200, 200]
+    assert answers[1].json()["response"] == answers[0].json()["response"]
+    assert len(bedrock.requests) == 1
+
+
+if __name__ == "__main__":
+    test_reworded_question_hits()
+    test_profile_subject_and_session_are_part_of_the_key()
+    test_signature_ignores_the_prompt_text_and_normalizes_the_profile()
+    test_ttl_and_lru_eviction()
+    test_chat_endpoint_answers_repeats_from_cache()
+    test_rewordings_hit_for_a_student_with_material()
+    print("✅ Response cache tests passed")
+    sys.exit(0)
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Tests for chunked material storage: large files round-trip through compressed chunks,
+manifests stay small, students keep several files, deleted files leave no chunks behind
+(also for items from before several files, and as 404/409 from the API), concurrent uploads
+neither exceed the file limit nor overwrite each other, identical uploads are extracted and
+stored once, and chat prompts carry the passages that match the question.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import sys
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+
+import boto3
+from fastapi import FastAPI, Request, UploadFile
+from fastapi.testclient import TestClient
+from moto import mock_aws
+from starlette.datastructures import Headers
+
+from controllers import file_controller
+from controllers.chat_controller import ChatRequest, prepare_tutor_chat
+from controllers.file_controller import save_upload
+from models import StudentFile
+from services import student_file_service
+from services.aws_clients import reset_clients
+from services.material_index import material_index
+from services.student_file_service import MATERIAL_EXCERPT_CHARS, StudentFileService, split_text
+from services.student_service import StudentService
+from services.tutor_service import TutorService
+
+
+def create_tables():
+    dynamodb = boto3.resource("dynamodb", region_name="us-west-2")
+    for name, key in [("Students", "student_id"), ("Tutors", "tutor_id"), ("StudentFiles", "student_id")]:
+        dynamodb.create_table(
+            TableName=name,
+            KeySchema=[{"AttributeName": key, "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": key, "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+    dynamodb.create_table(
+        TableName="StudentFileChunks",
+        KeySchema=[{"AttributeName": "file_id", "KeyType": "HASH"}, {"AttributeName": "chunk", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "file_id", "AttributeType": "S"},
+                              {"AttributeName": "chunk", "AttributeType": "N"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    dynamodb.create_table(
+        TableName="MaterialContents",
+        KeySchema=[{"AttributeName": "content_hash", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "content_hash", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    return dynamodb
+
+
+def course_pack(size):
+    # Mixed ASCII and multi-byte text, so chunk boundaries land inside characters
+    line = "Kapitel 3: Größen, Einheiten und Newtons zweites Gesetz — F = m·a. 力学の基礎。\n"
+    return (line * (size // len(line) + 1))[:size]
+
+
+def test_split_text_keeps_characters_whole():
+    text = course_pack(5000)
+    pieces = split_text(text, chunk_bytes=97)
+    assert all(len(piece) <= 97 for piece in pieces)
+    assert "".join(piece.decode("utf-8") for piece in pieces) == text
+    assert split_text("") == []
+
+
+def test_large_file_round_trips_through_chunks():
+    text = course_pack(1_500_000)
+    with mock_aws():
+        reset_clients()
+        dynamodb = create_tables()
+        service = StudentFileService()
+        service.save_file(StudentFile(student_id="00000001", filename="pack.pdf", content_type="application/pdf",
+                                      content=text, size_bytes=2_000_000))
+
+        manifest = service.get_file("00000001")
+        raw_item = dynamodb.Table("StudentFiles").get_item(Key={"student_id": "00000001"})["Item"]
+        content = service.get_content("00000001")
+        chunk_items = dynamodb.Table("StudentFileChunks").scan()["Items"]
+    reset_clients()
+
+    assert content == text
+    assert "content" not in raw_item
+    assert manifest["excerpt"] == text[:MATERIAL_EXCERPT_CHARS]
+    assert manifest["text_bytes"] == len(text.encode("utf-8"))
+    assert manifest["chunk_count"] == len(chunk_items) > 1
+    assert all(len(item["data"].value) < 400 * 1024 for item in chunk_items)
+
+
+def test_uploads_add_files_and_deleting_removes_chunks():
+    with mock_aws():
+        reset_clients()
+        dynamodb = create_tables()
+        service = StudentFileService()
+        first, second = [
+            service.save_file(StudentFile(student_id="00000001", filename=name, content_type="text/plain",
+                                          content=course_pack(size), size_bytes=size))
+            for name, size in [("first.pdf", 700_000), ("second.txt", 1000)]
+        ]
+        files = service.list_files("00000001")
+        latest = service.get_file("00000001")
+        first_content = service.get_content("00000001", first["file_id"])
+
+        service.delete_file("00000001", first["file_id"])
+        chunk_items = dynamodb.Table("StudentFileChunks").scan()["Items"]
+        remaining = service.list_files("00000001")
+    reset_clients()
+
+    assert [manifest["filename"] for manifest in files] == ["first.pdf", "second.txt"]
+    assert latest["file_id"] == second["file_id"]
+    assert first_content == course_pack(700_000)
+    assert [manifest["file_id"] for manifest in remaining] == [second["file_id"]]
+    assert {item["file_id"] for item in chunk_items} == {second["file_id"]}
+
+
+def test_single_file_items_are_kept_when_a_second_file_arrives():
+    with mock_aws():
+        reset_clients()
+        dynamodb = create_tables()
+        # Stored before chunking, and as a lone manifest before students had several files
+        dynamodb.Table("StudentFiles").put_item(Item={
+            "student_id": "00000001", "filename": "notes.txt", "content_type": "text/plain",
+            "content": "Momentum is conserved in collisions.", "size_bytes": 36})
+        service = StudentFileService()
+        service.save_file(StudentFile(student_id="00000001", filename="pack.txt", content_type="text/plain",
+                                      content="Energy is conserved too.", size_bytes=24))
+        files = service.list_files("00000001")
+        contents = [service.get_content("00000001", manifest["file_id"]) for manifest in files]
+    reset_clients()
+
+    assert [manifest["filename"] for manifest in files] == ["notes.txt", "pack.txt"]
+    assert contents == ["Momentum is conserved in collisions.", "Energy is conserved too."]
+
+
+def build_app():
+    app = FastAPI()
+    app.include_router(file_controller.router)
+
+    @app.middleware("http")
+    async def fake_auth(request: Request, call_next):
+        request.state.user_id = "00000001"
+        request.state.user_role = "student"
+        return await call_next(request)
+
+    return app
+
+
+def test_deleting_single_file_items_and_api_errors():
+    saved_limit = student_file_service.MATERIAL_MAX_FILES
+    student_file_service.MATERIAL_MAX_FILES = 1
+    try:
+        with mock_aws():
+            reset_clients()
+            dynamodb = create_tables()
+            service = StudentFileService()
+            # Stored as a lone manifest, with the item itself as the manifest, before students had several files
+            manifest = service._write_file(StudentFile(student_id="00000001", filename="notes.txt",
+                                                       content_type="text/plain", content="Momentum is conserved.",
+                                                       size_bytes=22))
+            dynamodb.Table("StudentFiles").put_item(Item=manifest)
+
+            with TestClient(build_app()) as client:
+                listed = client.get("/api/file/").json()
+                full = client.post("/api/file/upload", files={"file": ("more.txt", b"Energy too.", "text/plain")})
+                missing = client.delete("/api/file/nope")
+                deleted = client.delete(f"/api/file/{manifest['file_id']}")
+                again = client.delete(f"/api/file/{manifest['file_id']}")
+
+            item = dynamodb.Table("StudentFiles").get_item(Key={"student_id": "00000001"}).get("Item")
+            chunk_items = dynamodb.Table("StudentFileChunks").scan()["Items"]
+        reset_clients()
+    finally:
+        student_file_service.MATERIAL_MAX_FILES = saved_limit
+
+    assert [entry["file_id"] for entry in listed] == [manifest["file_id"]]
+    assert full.status_code == 409 and "At most 1 files" in full.json()["detail"]
+    assert missing.status_code == 404
+    assert deleted.status_code == 200
+    assert again.status_code == 404
+    assert item is None and chunk_items == []
+
+
+class StaleRoomCheck(StudentFileService):
+    """Checks for room against an item read before another upload landed"""
+
+    def __init__(self, item, existing):
+        self.stale = item, existing
+
+    def _check_room(self, student_id: str):
+        return self.stale
+
+
+def save_text(service, filename, text):
+    return service.save_file(StudentFile(student_id="00000001", filename=filename, content_type="text/plain",
+                                         content=text, size_bytes=len(text)))
+
+
+def test_concurrent_uploads_cannot_overfill_or_overwrite():
+    saved_limit = student_file_service.MATERIAL_MAX_FILES
+    student_file_service.MATERIAL_MAX_FILES = 1
+    try:
+        with mock_aws():
+            reset_clients()
+            dynamodb = create_tables()
+            service = StudentFileService()
+            save_text(service, "first.txt", "Momentum is conserved.")
+            try:
+                save_text(StaleRoomCheck(None, []), "second.txt", "Energy too.")
+                overfilled = False
+            except student_file_service.StudentFileConflict:
+                overfilled = True
+            full_files = service.list_files("00000001")
+            # Rejected uploads take no reference on shared text and leave no chunks of their own
+            try:
+                stale = StaleRoomCheck(None, [])
+                stale.save_file(StudentFile(student_id="00000001", filename="shared.txt", content_type="text/plain",
+                                            content="Forces come in pairs.", size_bytes=21), content_hash="abc")
+            except student_file_service.StudentFileConflict:
+                pass
+            contents = dynamodb.Table("MaterialContents").scan()["Items"]
+            full_chunks = {item["file_id"] for item in dynamodb.Table("StudentFileChunks").scan()["Items"]}
+        reset_clients()
+    finally:
+        student_file_service.MATERIAL_MAX_FILES = saved_limit
+
+    with mock_aws():
+        reset_clients()
+        dynamodb = create_tables()
+        dynamodb.Table("StudentFiles").put_item(Item={
+            "student_id": "00000001", "filename": "notes.txt", "content_type": "text/plain",
+            "content": "Momentum is conserved in collisions.", "size_bytes": 36})
+        service = StudentFileService()
+        # Both uploads read the item from before multiple files; the first one migrates it
+        stale = StaleRoomCheck(service._read_item("00000001"), service.list_files("00000001"))
+        save_text(service, "pack.txt", "Energy is conserved too.")
+        try:
+            save_text(stale, "other.txt", "Forces come in pairs.")
+            overwritten = False
+        except student_file_service.StudentFileConflict:
+            overwritten = True
+        migrated_files = service.list_files("00000001")
+        migrated_chunks = {item["file_id"] for item in dynamodb.Table("StudentFileChunks").scan()["Items"]}
+    reset_clients()
+
+    assert overfilled and [manifest["filename"] for manifest in full_files] == ["first.txt"]
+    assert full_chunks == {full_files[0]["file_id"]} and contents == []
+    assert overwritten and [manifest["filename"] for manifest in migrated_files] == ["notes.txt", "pack.txt"]
+    assert migrated_chunks == {manifest["file_id"] for manifest in migrated_files}
+
+
+def test_identical_uploads_are_extracted_and_stored_once():
+    data = course_pack(700_000).encode("utf-8")
+    extractions = []
+
+    async def extract():
+        extractions.append(1)
+        return data.decode("utf-8")
+
+    async def upload(service, student_id, filename):
+        file = UploadFile(io.BytesIO(data), filename=filename, size=len(data),
+                          headers=Headers({"content-type": "text/plain"}))
+        return await save_upload(service, student_id, file, hashlib.sha256(data).hexdigest(), extract)
+
+    with mock_aws():
+        reset_clients()
+        dynamodb = create_tables()
+        service = StudentFileService()
+        manifests = [asyncio.run(upload(service, student_id, f"syllabus-{student_id}.txt"))
+                     for student_id in ("00000001", "00000002", "00000003")]
+        chunk_ids = {item["file_id"] for item in dynamodb.Table("StudentFileChunks").scan()["Items"]}
+        contents = dynamodb.Table("MaterialContents").scan()["Items"]
+        texts = [service.get_content(manifest["student_id"]) for manifest in manifests]
+
+        # The shared text outlives all but the last reference
+        for manifest in manifests[:2]:
+            service.delete_file(manifest["student_id"], manifest["file_id"])
+        last_text = service.get_content("00000003")
+        service.delete_file("00000003", manifests[2]["file_id"])
+        left_chunks = dynamodb.Table("StudentFileChunks").scan()["Items"]
+        left_contents = dynamodb.Table("MaterialContents").scan()["Items"]
+    reset_clients()
+
+    assert len(extractions) == 1
+    assert len({manifest["file_id"] for manifest in manifests}) == 3
+    assert [manifest["filename"] for manifest in manifests] == [
+        "syllabus-00000001.txt", "syllabus-00000002.txt", "syllabus-00000003.txt"]
+    assert chunk_ids == {manifests[0]["chunks_id"]}
+    assert len(contents) == 1 and contents[0]["ref_count"] == 3
+    assert texts == [data.decode("utf-8")] * 3 and last_text == texts[0]
+    assert left_chunks == [] and left_contents == []
+
+
+def test_chat_prompt_uses_matching_passages_and_reads_legacy_items():
+    student = {
+        "student_id": "00000001", "display_name": "Student 1", "primary_disability": "ADHD",
+        "preferred_subjects": ["Physics"], "accommodations_needed": ["Extra time"], "availability": [],
+        "learning_preferences": {"format": "1-on-1", "style": "Visual", "modality": "Online"},
+        "additional_info": "",
+    }
+    with mock_aws():
+        reset_clients()
+        dynamodb = create_tables()
+        dynamodb.Table("Students").put_item(Item=student)
+        dynamodb.Table("Students").put_item(Item={**student, "student_id": "00000002"})
+        material_index.clear()
+        files = StudentFileService()
+        files.save_file(StudentFile(student_id="00000001", filename="pack.pdf", content_type="application/pdf",
+                                    content=course_pack(900_000), size_bytes=900_000))
+        files.save_file(StudentFile(student_id="00000001", filename="waves.txt", content_type="text/plain",
+                                    content="Waves carry energy. Frequency times wavelength gives the speed.",
+                                    size_bytes=64))
+        # Written before chunking: the whole text on the item
+        dynamodb.Table("StudentFiles").put_item(Item={
+            "student_id": "00000002", "filename": "notes.txt", "content_type": "text/plain",
+            "content": "Momentum is conserved in collisions.", "size_bytes": 36})
+
+        prompts = [
+            prepare_tutor_chat(student_id, ChatRequest(message=question), "tutor1",
+                               StudentService(), TutorService(), files)[0]
+            ["retrieveAndGenerateConfiguration"]["knowledgeBaseConfiguration"]["generationConfiguration"]
+            ["promptTemplate"]["textPromptTemplate"]
+            for student_id, question in [("00000001", "How do I explain the wavelength and frequency?"),
+                                         ("00000002", "How do I explain F = ma?")]
+        ]
+        legacy_content = files.get_content("00000002")
+    reset_clients()
+
+    assert "MATERIAL:\n- Waves carry energy. Frequency times wavelength gives the speed.\n" in prompts[0]
+    assert "Kapitel" not in prompts[0]
+    assert "MATERIAL: Momentum is conserved in collisions...." in prompts[1]
+    assert legacy_content == "Momentum is conserved in collisions."
+
+
+if __name__ == "__main__":
+    test_split_text_keeps_characters_whole()
+    test_large_file_round_trips_through_chunks()
+    test_uploads_add_files_and_deleting_removes_chunks()
+    test_single_file_items_are_kept_when_a_second_file_arrives()
+    test_deleting_single_file_items_and_api_errors()
+    test_concurrent_uploads_cannot_overfill_or_overwrite()
+    test_identical_uploads_are_extracted_and_stored_once()
+    test_chat_prompt_uses_matching_passages_and_reads_legacy_items()
+    print("✅ Student file storage tests passed")
+    sys.exit(0)
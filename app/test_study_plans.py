@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Tests for persisted study plans: generated once per set of inputs by a background job,
+served from the StudyPlans table afterwards and regenerated when the profile or material changes.
+Also the matching that precedes them, which must write only the tutor fields (one student
+or a whole re-match) and answer 404, not 500, when no tutor fits.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+
+import boto3
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from moto import mock_aws
+
+import dependencies
+from controllers import chat_controller, job_controller
+from services.aws_clients import get_dynamodb, reset_clients
+from models.student_profile import StudentProfile
+from sample_data import STUDY_PLAN
+from services.fake_bedrock import FakeBedrockAgentRuntime
+from services.student_service import StudentService
+from services.tutor_roster import tutor_roster
+from services.study_plan_service import StudyPlanService
+from test_async_services import build_app
+
+STUDENT = {
+    "student_id": "00000001",
+    "display_name": "Student 1",
+    "primary_disability": "ADHD",
+    "preferred_subjects": ["Math"],
+    "accommodations_needed": ["Extra time"],
+    "availability": [],
+    "learning_preferences": {"format": "1-on-1", "style": "Visual", "modality": "Online"},
+    "additional_info": "",
+    "tutor_id": "t0000001",
+}
+
+TUTOR = {
+    "tutor_id": "t0000001",
+    "display_name": "Tutor 1",
+    "tutoring_style": "Visual",
+    "subjects": ["Math"],
+    "accommodation_skills": ["Extra time"],
+}
+
+
+def create_tables():
+    dynamodb = boto3.resource("dynamodb", region_name="us-west-2")
+    for name, key in [("Students", "student_id"), ("Tutors", "tutor_id"),
+                      ("StudentFiles", "student_id"), ("StudyPlans", "student_id")]:
+        dynamodb.create_table(
+            TableName=name,
+            KeySchema=[{"AttributeName": key, "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": key, "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+    dynamodb.Table("Students").put_item(Item=STUDENT)
+    dynamodb.Table("Tutors").put_item(Item=TUTOR)
+
+
+def test_plan_is_generated_once_and_refreshed_on_change():
+    bedrock = FakeBedrockAgentRuntime(answer=json.dumps(STUDY_PLAN))
+    with mock_aws():
+        reset_clients()
+        create_tables()
+        service = StudyPlanService()
+
+        async def run():
+            before = await service.get_cached_plan_async("00000001")
+            refreshed = await service.refresh_plan_async("00000001", bedrock)
+            again = await service.refresh_plan_async("00000001", bedrock)
+            cached = await service.get_cached_plan_async("00000001")
+
+            # Availability does not feed the plan, so saving it keeps the stored one
+            get_dynamodb().Table("Students").put_item(Item={**STUDENT, "availability": [
+                {"day": "Monday", "start_time": "09:00", "end_time": "10:00"}]})
+            after_availability = await service.refresh_plan_async("00000001", bedrock)
+
+            # New material does
+            get_dynamodb().Table("StudentFiles").put_item(Item={
+                "student_id": "00000001", "filename": "notes.txt", "content_type": "text/plain",
+                "content": "Newton's second law", "size_bytes": 19})
+            stale = await service.get_cached_plan_async("00000001")
+            after_material = await service.refresh_plan_async("00000001", bedrock)
+            return before, refreshed, again, cached, after_availability, stale, after_material
+
+        before, refreshed, again, cached, after_availability, stale, after_material = asyncio.run(run())
+        saved = service.get_saved_plan("00000001")
+    reset_clients()
+
+    assert before is None and stale is None
+    assert cached == STUDY_PLAN
+    assert (refreshed, again, after_availability, after_material) == (True, False, False, True)
+    assert len(bedrock.requests) == 2
+    assert json.loads(saved["plan"]) == STUDY_PLAN
+
+    # The template carries the real profile, and the question the real tutor and material
+    request = bedrock.requests[-1]
+    template = request["retrieveAndGenerateConfiguration"]["knowledgeBaseConfiguration"][
+        "generationConfiguration"]["promptTemplate"]["textPromptTemplate"]
+    assert "ADHD | Visual | 1-on-1 | Extra time" in template and "{disability}" not in template
+    assert "Tutor: Visual | Math | Extra time" in request["input"]["text"]
+    assert "Material: Newton's second law" in request["input"]["text"]
+
+
+def wait_for_job(client, job_id):
+    for _ in range(200):
+        job = client.get(f"/api/jobs/{job_id}").json()
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_summary_endpoint_generates_in_background():
+    bedrock = FakeBedrockAgentRuntime(answer=json.dumps(STUDY_PLAN), first_token_delay=0.3)
+    app = FastAPI()
+    app.include_router(chat_controller.router)
+    app.include_router(job_controller.router)
+
+    @app.middleware("http")
+    async def fake_auth(request: Request, call_next):
+        request.state.user_id = "00000001"
+        request.state.user_role = "student"
+        return await call_next(request)
+
+    # Jobs run outside the request, so they get Bedrock from the dependencies module
+    saved_fake = dependencies.BEDROCK_FAKE, dependencies.fake_bedrock
+    dependencies.BEDROCK_FAKE, dependencies.fake_bedrock = True, bedrock
+    try:
+        with mock_aws():
+            reset_clients()
+            create_tables()
+            with TestClient(app) as client:
+                # Also builds the AWS clients, so the timed request below measures only the endpoint
+                missing = client.get("/api/chat/00000404/summary")
+                started = time.perf_counter()
+                pending = [client.get("/api/chat/00000001/summary")]
+                elapsed = time.perf_counter() - started
+                pending += [client.get("/api/chat/00000001/summary") for _ in range(2)]
+                job = wait_for_job(client, pending[0].json()["job_id"])
+                ready = client.get("/api/chat/00000001/summary")
+            reset_clients()
+    finally:
+        dependencies.BEDROCK_FAKE, dependencies.fake_bedrock = saved_fake
+
+    # The endpoint answers at once; repeated page loads share the one job
+    assert [r.status_code for r in pending] == [202, 202, 202]
+    assert len({r.json()["job_id"] for r in pending}) == 1
+    assert elapsed < 0.3
+    assert job["status"] == "succeeded"
+    assert ready.status_code == 200 and ready.json() == STUDY_PLAN
+    assert len(bedrock.requests) == 1
+    assert missing.status_code == 404
+
+
+def test_match_writes_only_the_tutor_fields():
+    monday = [{"day": "Monday", "start_time": "09:00", "end_time": "10:00"}]
+    unmatched = {**STUDENT, "tutor_id": "none", "availability": monday}
+    with mock_aws():
+        reset_clients()
+        create_tables()
+        get_dynamodb().Table("Tutors").put_item(Item={**TUTOR, "availability": monday})
+        tutor_roster.invalidate()
+        students = get_dynamodb().Table("Students")
+        students.put_item(Item=unmatched)
+        service = StudentService()
+
+        # The match runs on a copy read before the student edited their profile
+        stale = StudentProfile(**unmatched)
+        students.update_item(Key={"student_id": "00000001"}, UpdateExpression="SET additional_info = :info",
+                             ExpressionAttributeValues={":info": "Prefers mornings"})
+        result = service.match_student(stale)
+        saved = service.get_student("00000001")
+
+        students.delete_item(Key={"student_id": "00000001"})
+        try:
+            service.match_student(StudentProfile(**unmatched))
+            deleted_raised = False
+        except LookupError:
+            deleted_raised = True
+        leftover = service.get_student("00000001")
+    reset_clients()
+    tutor_roster.invalidate()
+
+    assert result == {"tutor_id": "t0000001", "tutor_name": "Tutor 1"}
+    assert saved["tutor_id"] == "t0000001" and saved["tutor_name"] == "Tutor 1"
+    assert saved["additional_info"] == "Prefers mornings"
+    assert deleted_raised and leftover is None
+
+
+class EditedWhileMatching(StudentService):
+    """Saves a profile edit right after the endpoint has read the student"""
+
+    async def get_student_async(self, student_id: str):
+        student = await super().get_student_async(student_id)
+        self.table.update_item(Key={"student_id": student_id}, UpdateExpression="SET additional_info = :info",
+                               ExpressionAttributeValues={":info": "Prefers mornings"})
+        return student
+
+
+def test_match_endpoint_keeps_edits_made_during_the_match():
+    monday = [{"day": "Monday", "start_time": "09:00", "end_time": "10:00"}]
+    with mock_aws():
+        reset_clients()
+        create_tables()
+        get_dynamodb().Table("Tutors").put_item(Item={**TUTOR, "availability": monday})
+        tutor_roster.invalidate()
+        get_dynamodb().Table("Students").put_item(Item={**STUDENT, "tutor_id": "none", "availability": monday})
+        app = build_app()
+        app.dependency_overrides[dependencies.get_student_service] = EditedWhileMatching
+        response = TestClient(app).post("/api/students/00000001/match")
+        saved = StudentService().get_student("00000001")
+    reset_clients()
+    tutor_roster.invalidate()
+
+    assert response.status_code == 200 and response.json()["tutor"]["tutor_id"] == "t0000001"
+    assert saved["tutor_id"] == "t0000001" and saved["tutor_name"] == "Tutor 1"
+    assert saved["additional_info"] == "Prefers mornings"
+
+
+class EditedWhileRematching(StudentService):
+    """Edits one scanned student and deletes another before the re-match writes"""
+
+    def get_tutor_index(self, refresh: bool = False):
+        self.table.update_item(Key={"student_id": "00000001"}, UpdateExpression="SET additional_info = :info",
+                               ExpressionAttributeValues={":info": "Prefers mornings"})
+        self.table.delete_item(Key={"student_id": "00000002"})
+        return super().get_tutor_index(refresh)
+
+
+def test_rematch_keeps_edits_made_during_the_rematch():
+    monday = [{"day": "Monday", "start_time": "09:00", "end_time": "10:00"}]
+    with mock_aws():
+        reset_clients()
+        create_tables()
+        get_dynamodb().Table("Tutors").put_item(Item={**TUTOR, "availability": monday})
+        students = get_dynamodb().Table("Students")
+        for student_id in ["00000001", "00000002"]:
+            students.put_item(Item={**STUDENT, "student_id": student_id, "tutor_id": "none", "availability": monday})
+        result = EditedWhileRematching().rematch_all(mode="greedy")
+        saved = StudentService().get_student("00000001")
+        deleted = StudentService().get_student("00000002")
+    reset_clients()
+    tutor_roster.invalidate()
+
+    assert result["students"] == 2 and result["updated"] == 1
+    assert saved["tutor_id"] == "t0000001" and saved["tutor_name"] == "Tutor 1"
+    assert saved["additional_info"] == "Prefers mornings"
+    assert deleted is None
+
+
+def test_match_endpoint_is_a_404_when_no_tutor_fits():
+    unmatched = {**STUDENT, "tutor_id": "none",
+                 "availability": [{"day": "Monday", "start_time": "09:00", "end_time": "10:00"}]}
+    with mock_aws():
+        reset_clients()
+        create_tables()
+        # The only tutor teaches the right subject but is never free when the student is
+        get_dynamodb().Table("Tutors").put_item(
+            Item={**TUTOR, "availability": [{"day": "Tuesday", "start_time": "09:00", "end_time": "10:00"}]})
+        tutor_roster.invalidate()
+        get_dynamodb().Table("Students").put_item(Item=unmatched)
+        client = TestClient(build_app())
+        response = client.post("/api/students/00000001/match")
+        missing = client.post("/api/students/00000002/match")
+        saved = StudentService().get_student("00000001")
+    reset_clients()
+    tutor_roster.invalidate()
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "No suitable tutor matches found"
+    assert missing.status_code == 404 and missing.json()["detail"] == "Student not found"
+    assert saved["tutor_id"] == "none"
+
+
+if __name__ == "__main__":
+    test_plan_is_generated_once_and_refreshed_on_change()
+    test_summary_endpoint_generates_in_background()
+    test_match_writes_only_the_tutor_fields()
+    test_match_endpoint_keeps_edits_made_during_the_match()
+    test_rematch_keeps_edits_made_during_the_rematch()
+    test_match_endpoint_is_a_404_when_no_tutor_fits()
+    print("✅ Study plan tests passed")
+    sys.exit(0)
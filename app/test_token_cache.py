@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for the verified-token cache: repeated tokens skip signature checks, entries
+expire with the token, the cache stays bounded and the middleware still rejects
+tokens it has not verified.
+"""
+import sys
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from jose import jwt
+
+import services.jwt_service as jwt_service
+from middleware import BearerAuthMiddleware
+from services.jwks_store import jwks_store
+from services.metrics import metrics
+from services.token_cache import TokenCache, token_cache
+from test_jwks_store import KEYS, FakeJwksEndpoint
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_at_exp_and_stay_bounded():
+    clock = Clock()
+    cache = TokenCache(max_size=2, clock=clock)
+    cache.put("a", {"username": "a", "exp": 1010})
+    cache.put("b", {"username": "b", "exp": 2000})
+    cache.put("no-exp", {"username": "c"})
+
+    assert cache.get("a") == {"username": "a", "exp": 1010}
+    clock.now = 1010
+    assert cache.get("a") is None
+    assert cache.get("no-exp") is None
+
+    cache.put("c", {"username": "c", "exp": 2000})
+    cache.put("d", {"username": "d", "exp": 2000})
+    assert len(cache) == 2
+    assert cache.get("b") is None and cache.get("d") is not None
+
+
+def sign(claims, kid="k1"):
+    return jwt.encode(claims, KEYS[kid][0], algorithm="RS256", headers={"kid": kid})
+
+
+def test_middleware_verifies_each_token_once():
+    app = FastAPI()
+    app.add_middleware(BearerAuthMiddleware)
+
+    @app.get("/api/whoami")
+    async def whoami(request: Request):
+        return {"user_id": request.state.user_id, "role": request.state.user_role}
+
+    decodes = []
+    real_decode = jwt_service.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        decodes.append(1)
+        return real_decode(*args, **kwargs)
+
+    exp = int(time.time()) + 3600
+    student = sign({"username": "00000001", "exp": exp})
+    tutor = sign({"username": "tutor1", "cognito:groups": ["tutor"], "exp": exp})
+    expired = sign({"username": "00000001", "exp": int(time.time()) - 10})
+
+    saved_fetch = jwks_store._fetch
+    jwks_store.clear()
+    token_cache.clear()
+    jwks_store._fetch = FakeJwksEndpoint(["k1"])
+    jwt_service.jwt.decode = counting_decode
+    hits_before = metrics.get("token_cache_hits")
+    try:
+        client = TestClient(app)
+        responses = [client.get("/api/whoami", headers={"Authorization": f"Bearer {token}"})
+                     for token in [student] * 5 + [tutor] * 3 + [expired] * 2]
+        forged = client.get("/api/whoami", headers={"Authorization": f"Bearer {student[:-4]}AAAA"})
+    finally:
+        jwt_service.jwt.decode = real_decode
+        jwks_store._fetch = saved_fetch
+        jwks_store.clear()
+        token_cache.clear()
+
+    assert [r.json() for r in responses[:5]] == [{"user_id": "00000001", "role": "student"}] * 5
+    assert [r.json() for r in responses[5:8]] == [{"user_id": "tutor1", "role": "tutor"}] * 3
+    assert [r.status_code for r in responses[8:]] == [401, 401]
+    assert forged.status_code == 401
+    # Two good tokens, each expired request and the forged one reach jwt.decode
+    assert len(decodes) == 5
+    assert metrics.get("token_cache_hits") - hits_before == 6
+    assert metrics.snapshot()["observations"]['stage_seconds{stage="auth"}']["count"] >= 11
+
+
+if __name__ == "__main__":
+    test_entries_expire_at_exp_and_stay_bounded()
+    test_middleware_verifies_each_token_once()
+    print("✅ Token cache tests passed")
+    sys.exit(0)
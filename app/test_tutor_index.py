@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests for the compiled tutor index: upsert, remove and sync change what match() returns,
+and matching stays consistent while the roster is written from another thread.
+"""
+import sys
+import threading
+
+from services.tutor_index import TutorIndex
+
+MONDAY_MORNING = [{"day": "Monday", "start_time": "09:00", "end_time": "11:00"}]
+
+STUDENT = {
+    "student_id": "00000001",
+    "primary_disability": "ADHD",
+    "preferred_subjects": ["Math"],
+    "accommodations_needed": ["Extra time"],
+    "availability": MONDAY_MORNING,
+    "learning_preferences": {"format": "1-on-1", "style": "Visual", "modality": "Online"},
+}
+
+
+def make_tutor(tutor_id, subjects=("Math",), skills=("Extra time",)):
+    return {"tutor_id": tutor_id, "subjects": list(subjects), "accommodation_skills": list(skills),
+            "availability": MONDAY_MORNING}
+
+
+def matched_ids(index):
+    return [tutor["tutor_id"] for tutor in index.match(STUDENT)]
+
+
+def test_roster_changes_between_matches():
+    index = TutorIndex([make_tutor("t1"), make_tutor("t2", skills=())])
+    assert matched_ids(index) == ["t1", "t2"]
+
+    # A changed subject moves the tutor out of the student's candidates
+    index.upsert(make_tutor("t1", subjects=("History",)))
+    assert matched_ids(index) == ["t2"]
+
+    index.upsert(make_tutor("t3"))
+    assert matched_ids(index) == ["t3", "t2"]
+
+    index.remove("t3")
+    assert matched_ids(index) == ["t2"]
+
+    # sync drops tutors missing from the roster and keeps first-seen order for the rest
+    index.sync([make_tutor("t2", skills=()), make_tutor("t1"), make_tutor("t4", skills=())])
+    assert matched_ids(index) == ["t1", "t2", "t4"]
+    assert [tutor["tutor_id"] for tutor in index.tutors()] == ["t1", "t2", "t4"]
+
+
+def test_match_while_roster_is_written():
+    index = TutorIndex([make_tutor(f"t{i}") for i in range(50)])
+    stop = threading.Event()
+    errors = []
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            index.remove(f"t{i % 50}")
+            index.upsert(make_tutor(f"t{i % 50}"))
+            i += 1
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(300):
+            try:
+                assert len(index.match(STUDENT)) >= 49
+                index.tutors()
+            except Exception as e:
+                errors.append(e)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert errors == []
+
+
+if __name__ == "__main__":
+    test_roster_changes_between_matches()
+    test_match_while_roster_is_written()
+    print("✅ Tutor index tests passed")
+    sys.exit(0)
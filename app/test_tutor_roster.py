@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-process tutor roster: reloaded after the TTL or invalidate(), loaded
+once for concurrent misses, and tutors saved in this process visible without a reload,
+also when the save lands while a reload is scanning.
+"""
+import sys
+import threading
+import time
+
+from services.metrics import metrics
+from services.tutor_index import TutorIndex
+from services.tutor_roster import TutorRoster
+
+
+class FakeTutorsTable:
+    def __init__(self, tutors, delay=0.0):
+        self.tutors = list(tutors)
+        self.delay = delay
+        self.scans = 0
+
+    def __call__(self):
+        self.scans += 1
+        time.sleep(self.delay)
+        return list(self.tutors)
+
+
+def tutor_ids(roster, load):
+    return [tutor["tutor_id"] for tutor in roster.get_tutors(load)]
+
+
+def test_reload_after_ttl_and_invalidate():
+    table = FakeTutorsTable([{"tutor_id": "t1"}])
+    roster = TutorRoster(TutorIndex(), ttl=0.2)
+    hits = metrics.get("tutor_roster_hits")
+
+    assert tutor_ids(roster, table) == ["t1"]
+    table.tutors.append({"tutor_id": "t2"})
+    # Still fresh: served from the cache without seeing the new tutor
+    assert tutor_ids(roster, table) == ["t1"]
+    assert table.scans == 1 and metrics.get("tutor_roster_hits") == hits + 1
+
+    time.sleep(0.25)
+    assert tutor_ids(roster, table) == ["t1", "t2"]
+    assert table.scans == 2
+
+    table.tutors.pop(0)
+    roster.invalidate()
+    assert tutor_ids(roster, table) == ["t2"]
+    assert table.scans == 3
+
+
+def test_concurrent_misses_scan_once():
+    table = FakeTutorsTable([{"tutor_id": f"t{i}"} for i in range(20)], delay=0.2)
+    roster = TutorRoster(TutorIndex(), ttl=60)
+    sizes = []
+
+    threads = [threading.Thread(target=lambda: sizes.append(len(roster.get_index(table)))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert table.scans == 1
+    assert sizes == [20] * 10
+
+
+def test_write_through_is_visible_without_a_scan():
+    table = FakeTutorsTable([{"tutor_id": "t1", "subjects": ["Math"]}])
+    roster = TutorRoster(TutorIndex(), ttl=60)
+    roster.get_index(table)
+
+    roster.upsert({"tutor_id": "t1", "subjects": ["Physics"]})
+    roster.upsert({"tutor_id": "t2", "subjects": ["Math"]})
+
+    tutors = roster.get_tutors(table)
+    assert table.scans == 1
+    assert tutors == [{"tutor_id": "t1", "subjects": ["Physics"]}, {"tutor_id": "t2", "subjects": ["Math"]}]
+
+
+def test_upsert_during_a_scan_is_not_dropped():
+    roster = TutorRoster(TutorIndex(), ttl=60)
+    table = FakeTutorsTable([{"tutor_id": "t1", "subjects": ["Math"]}])
+
+    def scan_racing_a_save():
+        # The scan reads the table, then a save lands before the scan result is applied
+        tutors = table()
+        roster.upsert({"tutor_id": "t1", "subjects": ["Physics"]})
+        roster.upsert({"tutor_id": "t2", "subjects": ["Math"]})
+        return tutors
+
+    assert roster.get_tutors(scan_racing_a_save, refresh=True) == [{"tutor_id": "t1", "subjects": ["Physics"]},
+                                                                   {"tutor_id": "t2", "subjects": ["Math"]}]
+    # A later scan that saw the writes replaces them as usual
+    table.tutors = [{"tutor_id": "t2", "subjects": ["Biology"]}]
+    assert roster.get_tutors(table, refresh=True) == [{"tutor_id": "t2", "subjects": ["Biology"]}]
+
+
+if __name__ == "__main__":
+    test_reload_after_ttl_and_invalidate()
+    test_concurrent_misses_scan_once()
+    test_write_through_is_visible_without_a_scan()
+    test_upsert_during_a_scan_is_not_dropped()
+    print("✅ Tutor roster tests passed")
+    sys.exit(0)
@@ -5,7 +5,7 @@ import { LoginScreen } from "@/components/login-screen"
 import { StudentView } from "@/components/student-view"
 import { TutorView } from "@/components/tutor-view"
 import { RegistrationSuccessModal } from "@/components/registration-success-modal"
-import { fetchWithApi, setAccessToken } from "@/lib/fetchWithToken"
+import { fetchWithApi, setAccessToken, waitForJob } from "@/lib/fetchWithToken"
 import { API_BASE } from "@/lib/constants"
 
 export type UserRole = "student" | "tutor" | null
@@ -81,8 +81,16 @@ export default function Home() {
         throw new Error('Registration failed');
       }
 
-      const matchResult = await response.json();
+      let matchResult = await response.json();
       console.log('Registration API response:', matchResult);
+
+      // Tutor matching runs in the background; wait for it to pick a tutor
+      if (matchResult.job_id && (!matchResult.tutor_id || matchResult.tutor_id === "none")) {
+        const job = await waitForJob(API_BASE, matchResult.job_id);
+        if (job.status === "succeeded" && job.result) {
+          matchResult = { ...matchResult, ...job.result };
+        }
+      }
       
       // Update student data with tutor match info
       const updatedStudentData = {
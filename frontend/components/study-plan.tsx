@@ -3,7 +3,7 @@ import { Badge } from "@/components/ui/badge"
 import type { Student } from "@/app/page"
 import { BookOpen, Clock, Target, Lightbulb } from "lucide-react"
 import { useEffect, useState } from "react"
-import { fetchWithApi } from "@/lib/fetchWithToken"
+import { fetchWithApi, waitForJob } from "@/lib/fetchWithToken"
 import { API_BASE } from "@/lib/constants"
 
 interface StudyPlanProps {
@@ -73,7 +73,18 @@ export function StudyPlan({ student }: StudyPlanProps) {
       }
 
       try {
-        const response = await fetchWithApi(`${API_BASE}/api/chat/${student.student_id}/summary`);
+        let response = await fetchWithApi(`${API_BASE}/api/chat/${student.student_id}/summary`);
+
+        // 202: the plan is being generated in the background
+        if (response.status === 202) {
+          const { job_id } = await response.json();
+          const job = await waitForJob(API_BASE, job_id);
+          if (job.status !== "succeeded") {
+            throw new Error(job.error || "Study plan generation failed");
+          }
+          response = await fetchWithApi(`${API_BASE}/api/chat/${student.student_id}/summary`);
+        }
+
         const json = await response.json();
 
         setStudyPlanData(json);
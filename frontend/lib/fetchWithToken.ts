@@ -14,3 +14,27 @@ export const fetchWithApi = async (url: string, options: RequestInit = {}) => {
   };
   return fetch(url, { ...options, headers });
 };
+
+export interface Job {
+  job_id: string;
+  status: "queued" | "running" | "retrying" | "succeeded" | "failed";
+  result: any;
+  error: string | null;
+}
+
+// Poll a background job from the API until it succeeds or fails
+export const waitForJob = async (apiBase: string, jobId: string, intervalMs = 1000, timeoutMs = 120000): Promise<Job> => {
+  const deadline = Date.now() + timeoutMs;
+  while (Date.now() < deadline) {
+    const response = await fetchWithApi(`${apiBase}/api/jobs/${jobId}`);
+    if (!response.ok) {
+      throw new Error(`Job ${jobId} could not be loaded`);
+    }
+    const job: Job = await response.json();
+    if (job.status === "succeeded" || job.status === "failed") {
+      return job;
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+  throw new Error(`Job ${jobId} did not finish in time`);
+};